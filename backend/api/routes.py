@@ -1,23 +1,62 @@
-from fastapi import APIRouter, UploadFile, File, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+import asyncio
+import json
+import numpy as np
 import os
 import re
-from core import pdf_loader, chunking
-from core.llm import llm_query
-from core.image_extractor import extract_images_from_pdf, PDF_IMAGE_HASHES
-from core.vector_store import collection, embedder, client
-from PIL import Image
-import imagehash
-from io import BytesIO
-from fastapi import Form, File, UploadFile
+import time
 import uuid
+from core.llm import allm_query, allm_stream
+from core.llm_backends import get_backend, list_backends
+from core.llm_client import LLMError
+from core.answer_cache import answer_cache
+from app.config import (
+    HYBRID_SEARCH, HYBRID_CANDIDATES, RRF_K, RERANK_CANDIDATES, IMAGE_CAPTIONS,
+    ASK_BATCH_MAX_QUESTIONS, ASK_BATCH_CONCURRENCY
+)
+from core.ingest import ingest_pdf, restore_from_cache, artifact_chunks
+from core import ingest_cache
+from core.embedding_cache import embedding_cache
+from core import model_registry
+from core.jobs import submit_job, get_job, queue_depth
+from core import metrics
+from core.metrics import span, StageTimer
+from core.documents import (
+    register_document,
+    get_document,
+    list_documents,
+    latest_document,
+    remove_document,
+    find_by_hash,
+)
+from core import hash_index
+from core.lexical_index import lexical_index, reciprocal_rank_fusion
+from core.rerank import select_context
+from core.grounding import score_answer
+from core.vector_store import (
+    collection,
+    encode,
+    encode_chunks,
+    encode_sentences,
+    chunker,
+    doc_filter,
+    delete_document_vectors,
+    has_document_vectors,
+)
+from core.image_extractor import image_phash, thumbnail
+from core.image_understanding import caption_images, caption_cache
+from fastapi import Form, File, UploadFile
 
 
 router = APIRouter()
 
-# Temporary storage for the currently uploaded PDF
-current_pdf_chunks = []  # List of dicts: [{"page": int, "text": str}]
-current_pdf_images = []
+PDF_DIR = "data/pdf"
+IMAGE_DIR = "data/images"
+IMAGE_BASE_URL = "http://localhost:8000/static/images"
+
+DOC_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
 
 def clear_folder(folder_path: str):
     """
@@ -35,190 +74,277 @@ def clear_folder(folder_path: str):
             print(f"⚠️ Failed to delete {file_path}: {e}")
 
 
-def extract_int(value, default=0):
+def image_url(path: str) -> str:
     """
-    Recursively extract first integer from any structure.
+    Public URL of an extracted image under data/images.
     """
-    if isinstance(value, int):
-        return value
-    if isinstance(value, (str, float)) and str(value).isdigit():
-        return int(value)
-    if isinstance(value, (list, tuple)):
-        for v in value:
-            found = extract_int(v, default)
-            if found != default:
-                return found
-    if isinstance(value, dict):
-        for v in value.values():
-            found = extract_int(v, default)
-            if found != default:
-                return found
-    return default
+    rel = os.path.relpath(path, IMAGE_DIR).replace(os.sep, "/")
+    return f"{IMAGE_BASE_URL}/{rel}"
 
 
-def extract_text(value):
+def parse_csv(value) -> list:
     """
-    Recursively extract and join text safely.
+    "a, b,c" -> ["a", "b", "c"]; empty -> []
     """
-    if isinstance(value, str):
-        return value
-    if isinstance(value, (list, tuple)):
-        return " ".join(extract_text(v) for v in value if extract_text(v))
-    if isinstance(value, dict):
-        return extract_text(value.get("text", ""))
-    return ""
-
+    if not value:
+        return []
+    return [d.strip() for d in value.split(",") if d.strip()]
 
-def process_pdf(path: str):
-    global current_pdf_chunks, current_pdf_images
 
+def parse_questions(value: str) -> list:
+    """
+    A JSON array of strings, or one question per line; blanks dropped.
+    """
     try:
-        # 🧹 Recreate collection
-        client.delete_collection("pdf_chunks")
-        global collection
-        collection = client.get_or_create_collection("pdf_chunks")
+        items = json.loads(value)
+    except ValueError:
+        items = None
+    if not isinstance(items, list):
+        items = value.splitlines()
+    return [str(q).strip() for q in items if str(q).strip()]
 
-        raw_pages = pdf_loader.extract_pdf(path)
-        all_chunks = []
 
-        for item in raw_pages:
-            page = extract_int(item)
-            text = extract_text(item)
+def previous_version(document: dict) -> dict:
+    """
+    What ingest_pdf needs to diff against the indexed version of a
+    document: page fingerprints, kept images and stored chunk ids.
+    """
+    doc_id = document["doc_id"]
+    return {
+        "page_hashes": document["page_hashes"],
+        "image_hashes": document.get("image_hashes", {}),
+        "chunk_ids": collection.get(where={"doc_id": doc_id}, include=[])["ids"]
+    }
 
-            if not text.strip():
-                continue
 
-            for chunk in chunking.chunk_text(text):
-                all_chunks.append({
-                    "page": page,
-                    "text": chunk
-                })
+def process_pdf(path: str, doc_id: str, filename: str, pdf_hash: str = None, progress=None,
+                include_chunks: bool = True):
+    """
+    Ingest one PDF as document `doc_id`. A previous version of the same
+    document is replaced; other documents are left untouched.
 
-        if not all_chunks:
-            print("⚠️ No chunks found")
-            return
+    A previous version indexed with page fingerprints is updated in
+    place: only new or changed chunks are embedded, stale ones deleted
+    and images of unchanged pages kept. Otherwise, when the ingest cache
+    already holds `pdf_hash`, cached chunks, embeddings and images are
+    reused instead of parsing and embedding.
 
-        texts = [c["text"] for c in all_chunks]
-        embeddings = embedder.encode(texts).tolist()
+    The result lists all chunks only with include_chunks (the /upload-pdf
+    response); otherwise "chunks" is their count.
+    """
+    lexical = lexical_index.writer(doc_id)
+    artifacts = None
+    try:
+        image_dir = os.path.join(IMAGE_DIR, doc_id)
 
-        ids = [str(uuid.uuid4()) for _ in texts]
-        metadatas = [{"page": c["page"]} for c in all_chunks]
+        previous = get_document(doc_id)
+        incremental = bool(
+            previous and previous.get("page_hashes") and has_document_vectors(doc_id)
+        )
 
-        collection.add(
-            documents=texts,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
+        cached = None
+
+        if not incremental:
+            # 🧹 Drop the previous version of this document only
+            delete_document_vectors(doc_id)
+            clear_folder(image_dir)
+            cached = ingest_cache.load_entry(pdf_hash) if pdf_hash else None
+
+        if cached:
+            # ♻️ Seen these bytes before: no parsing, no embedding
+            result = restore_from_cache(
+                cached, doc_id, collection,
+                output_dir=image_dir, progress=progress, lexical=lexical
+            )
+        else:
+            # 📄 Single pass over the PDF: text, chunks, images, embeddings
+            # (🔁 for a revised document, only what changed is embedded)
+            result = ingest_pdf(
+                path, doc_id, collection, encode_chunks,
+                output_dir=image_dir, progress=progress, chunker=chunker(),
+                previous=previous_version(previous) if incremental else None,
+                captioner=caption_images if IMAGE_CAPTIONS else None,
+                lexical=lexical
+            )
+            artifacts = result["artifacts"]
+            if incremental:
+                print(f"🔁 Incremental update: {result['diff']}")
+
+        chunks = (
+            artifact_chunks(result["artifacts"], doc_id) if include_chunks
+            else result["chunk_count"]
         )
+        if artifacts:
+            # 💾 Streamed artifacts become the cache entry for these bytes
+            if pdf_hash:
+                ingest_cache.publish_entry(pdf_hash, artifacts, result["images"])
+            else:
+                ingest_cache.discard(artifacts)
+            artifacts = None
+
+        if not result["chunk_count"]:
+            print("⚠️ No chunks found")
 
-        # 🖼️ Images
-        images = extract_images_from_pdf(path)
-        image_urls = [
-            f"http://localhost:8000/static/images/{os.path.basename(img)}"
-            for img in images
-        ]
+        image_urls = [image_url(img) for img in result["images"]]
+
+        answer_cache.invalidate_document(doc_id)
+        hash_index.save_document_index(doc_id, result["image_hashes"])
+        lexical.commit()
+        collection.save()
+
+        register_document(
+            doc_id,
+            filename=filename,
+            pdf_path=path,
+            content_hash=pdf_hash,
+            pages=result["pages"],
+            page_hashes=result.get("page_hashes"),
+            chunks=result["chunk_count"],
+            images=image_urls,
+            image_hashes=result["image_hashes"]
+        )
 
-        current_pdf_chunks = all_chunks
-        current_pdf_images = image_urls
+        print(f"✅ PDF processed successfully ({doc_id})")
+        print(f"📦 Vector chunks stored: {result['chunk_count']}")
+        print(f"🖼️ Images extracted: {len(image_urls)} {result.get('image_stats', {})}")
+        if result.get("caption_stats"):
+            print(f"🏷️ Captions: {result['caption_stats']}")
+        print(f"⏱️ Stage timings (ms): {result['timings']}")
 
-        print("✅ PDF processed successfully")
-        print(f"📦 Vector chunks stored: {len(all_chunks)}")
-        print(f"🖼️ Images extracted: {len(image_urls)}")
+        return {
+            "doc_id": doc_id,
+            "cached": bool(cached),
+            "diff": result.get("diff"),
+            "chunks": chunks,
+            "images": image_urls,
+            "timings": result["timings"]
+        }
 
     except Exception as e:
+        lexical.discard()
+        ingest_cache.discard(artifacts)
         print(f"❌ Error processing PDF: {e}")
-      
-
-def tokenize(text: str) -> set:
-    """Basic tokenizer for overlap scoring."""
-    return set(re.findall(r"\b\w+\b", text.lower()))
+        raise
 
 
-def calculate_confidence(answer: str, chunks: list) -> float:
+def ingest_job(path: str, doc_id: str, filename: str, pdf_hash: str = None, progress=None):
     """
-    Confidence based on:
-    1. Grounding strength (max overlap)
-    2. Evidence coverage (how many chunks support it)
-    Returns value between 0.0 and 1.0
+    Background variant of process_pdf that keeps the job result small.
     """
+    return process_pdf(path, doc_id, filename, pdf_hash, progress=progress, include_chunks=False)
 
-    if not answer or answer.strip().lower() == "answer not found in the document.":
-        return 0.0
-
-    answer_tokens = tokenize(answer)
-    if not answer_tokens:
-        return 0.0
-
-    overlap_ratios = []
-
-    for c in chunks:
-        chunk_text = c.get("text", "")
-        if not chunk_text:
-            continue
-
-        chunk_tokens = tokenize(chunk_text)
-        if not chunk_tokens:
-            continue
 
-        overlap = answer_tokens.intersection(chunk_tokens)
-        overlap_ratio = len(overlap) / len(answer_tokens)
-
-        overlap_ratios.append(overlap_ratio)
-
-    if not overlap_ratios:
-        return 0.0
-
-    # 1️⃣ Grounding strength (best supporting chunk)
-    grounding_strength = max(overlap_ratios)
+def find_indexed_copy(pdf_hash: str, doc_id: str = None):
+    """
+    Registry entry of an already indexed document with the same bytes,
+    if it can be served as-is for this upload.
+    """
+    existing = find_by_hash(pdf_hash)
+    if not existing:
+        return None
+    if doc_id and doc_id != existing["doc_id"]:
+        return None
+    if not has_document_vectors(existing["doc_id"]):
+        return None
+    return existing
 
-    # 2️⃣ Evidence coverage (how many chunks meaningfully support)
-    supporting_chunks = sum(1 for r in overlap_ratios if r >= 0.15)
-    coverage = min(supporting_chunks / 5, 1.0)  # cap after 5 chunks
 
-    # 3️⃣ Final confidence (weighted)
-    confidence = (
-        0.6 * grounding_strength +
-        0.4 * coverage
+def document_chunks(doc_id: str) -> list:
+    """
+    Stored chunks of one document, in page order.
+    """
+    results = collection.get(
+        where={"doc_id": doc_id},
+        include=["documents", "metadatas"]
     )
 
-    return round(min(confidence, 1.0), 2)
+    chunks = [
+        {"doc_id": doc_id, "page": meta.get("page", "Unknown"), "text": doc}
+        for doc, meta in zip(results["documents"], results["metadatas"])
+    ]
+    chunks.sort(key=lambda c: c["page"] if isinstance(c["page"], int) else 0)
+    return chunks
 
 
 @router.post("/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...)):
-    """
-    Upload a PDF, clear old data, process new PDF synchronously.
+async def upload_pdf(
+    file: UploadFile = File(...),
+    background: bool = Form(False),
+    doc_id: str | None = Form(None)
+):
     """
-    global current_pdf_chunks, current_pdf_images
+    Upload a PDF and add it to the corpus as a new document.
 
-    try:
-        # 📂 Define folders
-        pdf_dir = "data/pdf"
-        image_dir = "data/images"
+    Passing an existing doc_id replaces that document; every other
+    document stays indexed. Re-uploading bytes that are already indexed
+    returns the existing document without any processing.
 
-        os.makedirs(pdf_dir, exist_ok=True)
-        os.makedirs(image_dir, exist_ok=True)
+    With background=true the PDF is queued on the ingest worker pool and
+    a job id is returned right away; poll /jobs/{job_id} for progress.
+    Otherwise processing runs in a worker thread and the response waits
+    for it, without blocking the event loop.
+    """
+    try:
+        if doc_id and not DOC_ID_PATTERN.match(doc_id):
+            return JSONResponse(
+                status_code=400,
+                content={"error": "doc_id may only contain letters, digits, '-' and '_'."}
+            )
+
+        data = await file.read()
+        pdf_hash = ingest_cache.content_hash(data)
+
+        # ♻️ Identical PDF already indexed → reuse its Chroma entries
+        existing = find_indexed_copy(pdf_hash, doc_id)
+        if existing:
+            cached = ingest_cache.load_entry(pdf_hash)
+            return {
+                "status": "PDF already processed.",
+                "doc_id": existing["doc_id"],
+                "cached": True,
+                "chunks": (
+                    artifact_chunks(cached["dir"], existing["doc_id"]) if cached else []
+                ),
+                "images": existing.get("images", []),
+                "timings": {}
+            }
 
-        # 🧹 Clear old files
-        clear_folder(pdf_dir)
-        clear_folder(image_dir)
+        doc_id = doc_id or uuid.uuid4().hex[:12]
 
-        # 🧠 Clear memory
-        current_pdf_chunks = []
-        current_pdf_images = []
+        os.makedirs(PDF_DIR, exist_ok=True)
+        os.makedirs(IMAGE_DIR, exist_ok=True)
 
         # 💾 Save new PDF
-        pdf_path = os.path.join(pdf_dir, file.filename)
+        pdf_path = os.path.join(PDF_DIR, f"{doc_id}.pdf")
         with open(pdf_path, "wb") as f:
-            f.write(await file.read())
+            f.write(data)
 
         # ⚙️ Process PDF
-        process_pdf(pdf_path)
+        if background:
+            job = submit_job(
+                file.filename, ingest_job, pdf_path, doc_id, file.filename, pdf_hash
+            )
+            return JSONResponse(
+                status_code=202,
+                content={
+                    "status": "PDF queued for processing.",
+                    "job_id": job.id,
+                    "doc_id": doc_id
+                }
+            )
+
+        result = await run_in_threadpool(
+            process_pdf, pdf_path, doc_id, file.filename, pdf_hash
+        )
 
         return {
             "status": "PDF processed successfully.",
-            "chunks": current_pdf_chunks,
-            "images": current_pdf_images
+            "doc_id": doc_id,
+            "cached": result["cached"],
+            "diff": result["diff"],
+            "chunks": result["chunks"],
+            "images": result["images"],
+            "timings": result["timings"]
         }
 
     except Exception as e:
@@ -228,138 +354,522 @@ async def upload_pdf(file: UploadFile = File(...)):
         )
 
 
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Status and progress of a background ingestion job.
+    """
+    job = get_job(job_id)
+    if not job:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Unknown job: {job_id}"}
+        )
+    return job.to_dict()
+
+
 @router.get("/current-chunks")
-async def get_current_chunks():
+async def get_current_chunks(doc_id: str | None = None):
+    """
+    Returns the chunks of a document (the most recently processed one by
+    default) for verification.
     """
-    Returns the chunks of the currently processed PDF for verification.
+    if not doc_id:
+        latest = latest_document()
+        if not latest:
+            return {"status": "No PDF processed yet."}
+        doc_id = latest["doc_id"]
+
+    return {"doc_id": doc_id, "chunks": document_chunks(doc_id)}
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Hit/miss counters of the embedding and answer caches.
     """
-    global current_pdf_chunks
-    if not current_pdf_chunks:
-        return {"status": "No PDF processed yet."}
-    return {"chunks": current_pdf_chunks}
+    return {
+        "embeddings": embedding_cache.report(),
+        "answers": answer_cache.report(),
+        "lexical": lexical_index.report(),
+        "captions": caption_cache.report()
+    }
+
+
+CACHE_HITS = metrics.Gauge("syllabus_cache_hits", "Cache hits since start.", ["cache"])
+CACHE_LOOKUPS = metrics.Gauge("syllabus_cache_lookups", "Cache lookups since start.", ["cache"])
+CACHE_HIT_RATIO = metrics.Gauge("syllabus_cache_hit_ratio", "Cache hits / lookups.", ["cache"])
+INGEST_QUEUE_DEPTH = metrics.Gauge(
+    "syllabus_ingest_queue_depth", "Background ingest jobs queued or running."
+)
+
+
+@metrics.register_collector
+def collect_cache_metrics():
+    for name, report in (
+        ("embeddings", embedding_cache.report()),
+        ("answers", answer_cache.report()),
+        ("captions", caption_cache.report()),
+    ):
+        hits = sum(v for k, v in report.items() if k.endswith("hits"))
+        lookups = hits + report.get("misses", 0)
+        CACHE_HITS.set(hits, cache=name)
+        CACHE_LOOKUPS.set(lookups, cache=name)
+        CACHE_HIT_RATIO.set(round(hits / lookups, 4) if lookups else 0.0, cache=name)
+    INGEST_QUEUE_DEPTH.set(queue_depth())
+
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    Prometheus text format: span and request latency histograms, cache
+    hit ratios, LLM token counts and ingest queue depth.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
-def build_context(chunks, max_chars=4000):
+@router.get("/models")
+async def get_models(request: Request):
     """
-    Convert chunks into a single context string for LLM.
+    Model registry state plus startup import time and RSS.
     """
-    context = []
-    total = 0
+    return {
+        **model_registry.report(),
+        "import_seconds": getattr(request.app.state, "import_seconds", None),
+        "import_rss_mb": getattr(request.app.state, "import_rss_mb", None)
+    }
 
-    for c in chunks:
-        text = c.get("text", "").strip()
-        if not text:
-            continue
 
-        if total + len(text) > max_chars:
-            break
+@router.post("/warmup")
+async def warmup_models(models: str | None = Form(None)):
+    """
+    Load models now instead of on first use. `models` is an optional
+    comma-separated subset of registered names.
+    """
+    names = parse_csv(models) or None
+    try:
+        return await run_in_threadpool(model_registry.warmup, names)
+    except KeyError as e:
+        return JSONResponse(status_code=400, content={"error": str(e.args[0])})
+
+
+@router.get("/llm-backends")
+async def get_llm_backends():
+    """
+    Configured LLM backends with their settings and measured latency.
+    """
+    return {"backends": list_backends()}
+
 
-        context.append(f"[Page {c['page']}]\n{text}")
-        total += len(text)
+@router.get("/documents")
+async def get_documents():
+    """
+    All indexed documents.
+    """
+    return {
+        "documents": [
+            {k: v for k, v in d.items() if k != "image_hashes"}
+            for d in list_documents()
+        ]
+    }
 
-    return "\n\n".join(context)
 
+@router.get("/documents/{doc_id}")
+async def get_document_info(doc_id: str):
+    document = get_document(doc_id)
+    if not document:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Unknown document: {doc_id}"}
+        )
+    document.pop("image_hashes", None)
+    return document
 
-def is_image_from_pdf(uploaded_image_bytes: bytes, threshold=6):
+
+@router.delete("/documents/{doc_id}")
+async def delete_document(doc_id: str):
     """
-    Check if uploaded image belongs to current PDF
+    Remove a document's vectors, images, registry entry and cached parse.
     """
-    img = Image.open(BytesIO(uploaded_image_bytes)).convert("RGB")
-    uploaded_hash = imagehash.phash(img)
+    document = remove_document(doc_id)
+    if not document:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Unknown document: {doc_id}"}
+        )
 
-    for pdf_hash_str, meta in PDF_IMAGE_HASHES.items():
-        pdf_hash = imagehash.hex_to_hash(pdf_hash_str)
-        if abs(uploaded_hash - pdf_hash) <= threshold:
-            return True, meta
+    delete_document_vectors(doc_id)
+    collection.save()
+    clear_folder(os.path.join(IMAGE_DIR, doc_id))
+    answer_cache.invalidate_document(doc_id)
+    hash_index.drop_document_index(doc_id)
+    lexical_index.remove_document(doc_id)
 
-    return False, None
+    pdf_path = document.get("pdf_path")
+    if pdf_path and os.path.exists(pdf_path):
+        os.remove(pdf_path)
 
+    # 🧹 Cached parse of these bytes, unless another document shares them
+    content_hash = document.get("content_hash")
+    if content_hash and not find_by_hash(content_hash):
+        ingest_cache.drop_entry(content_hash)
 
-def retrieve_relevant_chunks(question: str, k: int = 5):
-    query_embedding = embedder.encode(question).tolist()
+    return {"status": "Document deleted.", "doc_id": doc_id}
 
-    results = collection.query(
-        query_embeddings=[query_embedding],
-        n_results=k
+
+def is_image_from_pdf(uploaded_image_bytes: bytes, threshold=6, doc_ids=None):
+    """
+    Check if uploaded image belongs to one of the given documents
+    (any indexed document when doc_ids is empty)
+    """
+    # Same thumbnail + pHash pipeline as ingest
+    uploaded_hash = image_phash(thumbnail(uploaded_image_bytes))
+
+    documents = (
+        [get_document(d) for d in doc_ids] if doc_ids else list_documents()
+    )
+    meta, _ = hash_index.match_image(
+        uploaded_hash, [d for d in documents if d], threshold
     )
+    return meta is not None, meta
 
-    if not results or not results.get("documents"):
-        return []
 
-    chunks = []
-    for doc, meta in zip(results["documents"][0], results["metadatas"][0]):
-        chunks.append({
-            "text": doc,
-            "page": meta.get("page", "Unknown")
-        })
+def page_label(chunk: dict) -> str:
+    """
+    "Page 3", or "Pages 3-4" for a chunk that spans a page break.
+    """
+    start, end = chunk["page"], chunk.get("page_end", chunk["page"])
+    return f"Page {start}" if end == start else f"Pages {start}-{end}"
 
-    return chunks
 
+def stored_chunk(chunk_id: str, doc: str, meta: dict, vector=None) -> dict:
+    return {
+        "id": chunk_id,
+        "text": doc,
+        "page": meta.get("page", "Unknown"),
+        "page_end": meta.get("page_end", meta.get("page", "Unknown")),
+        "char_start": meta.get("char_start"),
+        "char_end": meta.get("char_end"),
+        "tokens": meta.get("tokens"),
+        "doc_id": meta.get("doc_id"),
+        "vector": vector
+    }
 
 
-@router.post("/ask")
-async def ask_question(
-    question: str = Form(...),
-    image: UploadFile | None = File(None)
-):
+def lexical_backfill(doc_ids=None):
+    """
+    BM25-index documents ingested before the lexical index existed,
+    from the chunks already stored in Chroma. Runs once at startup.
+    """
+    targets = doc_ids or [d["doc_id"] for d in list_documents()]
+    for doc_id in targets:
+        if lexical_index.has_document(doc_id):
+            continue
+        stored = collection.get(where={"doc_id": doc_id}, include=["documents"])
+        lexical_index.add_document(doc_id, [
+            {"id": chunk_id, "text": doc}
+            for chunk_id, doc in zip(stored["ids"], stored["documents"])
+        ])
+
+
+def retrieve_batch(questions: list, query_vecs, k: int = 5, doc_ids=None,
+                   timings: dict = None) -> list:
+    """
+    Top-k chunks for each question, from one multi-query vector search.
+    With HYBRID_SEARCH, dense and lexical (BM25) candidates of each
+    question are merged by reciprocal rank fusion, and lexical-only hits
+    of all questions are fetched together. Per-stage latencies (ms) are
+    written into `timings` when given.
+    """
+    timer = StageTimer()
+
+    with timer.stage("dense"), span("vector_query"):
+        results = collection.query(
+            query_embeddings=np.asarray(query_vecs, dtype=np.float32),
+            n_results=max(k, HYBRID_CANDIDATES) if HYBRID_SEARCH else k,
+            where=doc_filter(doc_ids),
+            include=["documents", "metadatas", "embeddings"]
+        )
+
+    by_id = {}
+    dense = []
+    for i in range(len(questions)):
+        ranked = []
+        if results and results.get("documents"):
+            for chunk_id, doc, meta, vector in zip(
+                results["ids"][i], results["documents"][i],
+                results["metadatas"][i], results["embeddings"][i]
+            ):
+                by_id.setdefault(chunk_id, stored_chunk(chunk_id, doc, meta, vector))
+                ranked.append(chunk_id)
+        dense.append(ranked)
+    rankings = [ranked[:k] for ranked in dense]
+
+    if HYBRID_SEARCH:
+        with timer.stage("lexical"), span("bm25"):
+            lexical = [
+                [chunk_id for chunk_id, _ in lexical_index.search(q, HYBRID_CANDIDATES, doc_ids)]
+                for q in questions
+            ]
+
+        with timer.stage("fusion"):
+            rankings = [
+                reciprocal_rank_fusion([d, l], RRF_K)[:k]
+                for d, l in zip(dense, lexical)
+            ]
+
+            # Lexical-only hits: fetch their text and metadata
+            missing = sorted({c for ranked in rankings for c in ranked if c not in by_id})
+            if missing:
+                with span("vector_query"):
+                    fetched = collection.get(ids=missing, include=["documents", "metadatas", "embeddings"])
+                for chunk_id, doc, meta, vector in zip(
+                    fetched["ids"], fetched["documents"],
+                    fetched["metadatas"], fetched["embeddings"]
+                ):
+                    by_id[chunk_id] = stored_chunk(chunk_id, doc, meta, vector)
+
+    if timings is not None:
+        timings.update(timer.report())
+
+    return [
+        [dict(by_id[chunk_id]) for chunk_id in ranked if chunk_id in by_id]
+        for ranked in rankings
+    ]
+
+
+def retrieve_relevant_chunks(question: str, k: int = 5, doc_ids=None,
+                             query_vec=None, timings: dict = None):
+    """
+    Top-k chunks for one question (see retrieve_batch).
+    """
+    timer = StageTimer()
+
+    with timer.stage("embed"):
+        if query_vec is None:
+            query_vec = encode(question)
+
+    if timings is not None:
+        timings.update(timer.report())
+
+    return retrieve_batch([question], [query_vec], k, doc_ids, timings)[0]
+
+
+def document_versions(doc_ids) -> dict:
+    """
+    {doc_id: content_hash}; a re-ingested document gets a new version.
+    """
+    versions = {}
+    for doc_id in doc_ids:
+        document = get_document(doc_id) or {}
+        versions[doc_id] = document.get("content_hash") or str(document.get("updated_at"))
+    return versions
+
+
+def document_images(doc_ids) -> list:
+    images = []
+    for doc_id in doc_ids:
+        document = get_document(doc_id)
+        if document:
+            images.extend(document.get("images", []))
+    return images
+
+
+def prepare_answers(questions: list, selected: list, llm) -> list:
+    """
+    Cache lookups and retrieval shared by /ask, /ask-stream and
+    /ask-batch: every question is embedded in one pass and retrieved in
+    one multi-query vector search. Cached answers are only reused for
+    the same LLM backend/model.
+
+    Returns one state per question: {"response": cached response or
+    None, "chunks", "documents", "versions", "chunk_ids", "question_vec",
+    "timings"}
+    """
+    timer = StageTimer()
+    with timer.stage("embed"):
+        question_vecs = encode(list(questions))
+
+    states = [
+        {
+            "response": None,
+            "chunks": [],
+            "documents": [],
+            "versions": {},
+            "chunk_ids": [],
+            "question_vec": vec,
+            "timings": {}
+        }
+        for vec in question_vecs
+    ]
+
+    # ♻️ Near-duplicate question already answered (semantic mode)
+    pending = []
+    for i, state in enumerate(states):
+        state["response"] = answer_cache.get_similar(selected, state["question_vec"], llm.cache_name)
+        if state["response"] is None:
+            pending.append(i)
+
+    # 🔍 Vector search (single source of truth), all questions at once
+    retrieval = timer.report()
+    candidates = retrieve_batch(
+        [questions[i] for i in pending], [question_vecs[i] for i in pending],
+        k=RERANK_CANDIDATES, doc_ids=selected, timings=retrieval
+    ) if pending else []
+
+    batch_timings = dict(retrieval)
+    for i, found in zip(pending, candidates):
+        state = states[i]
+        state["timings"] = dict(retrieval)
+
+        # 🎯 Rerank, drop overlapping chunks, pack into the context budget
+        chunks = select_context(
+            questions[i], state["question_vec"], found, timings=state["timings"]
+        )
+        for stage in ("rerank", "pack"):
+            batch_timings[stage] = round(batch_timings.get(stage, 0.0) + state["timings"][stage], 2)
+        if not chunks:
+            continue
+
+        state["chunks"] = chunks
+        state["documents"] = sorted({c["doc_id"] for c in chunks if c.get("doc_id")})
+        state["versions"] = document_versions(state["documents"])
+        state["chunk_ids"] = [c["id"] for c in chunks]
+
+        # ♻️ Same question, same chunks, same document versions
+        state["response"] = answer_cache.get(
+            state["versions"], questions[i], state["chunk_ids"], llm.cache_name
+        )
+
+    if pending:
+        print(f"⏱️ Retrieval timings (ms, {len(questions)} question(s)): {batch_timings}")
+    return states
+
+
+def prepare_answer(question: str, selected: list, llm) -> dict:
+    """
+    prepare_answers for a single question.
+    """
+    return prepare_answers([question], selected, llm)[0]
+
+
+def finish_answer(question: str, selected: list, state: dict, answer: str, llm) -> dict:
+    """
+    Score an LLM answer, build the /ask response and cache it.
+    """
+    chunks = state["chunks"]
+    with span("confidence"):
+        grounding = score_answer(
+            answer, chunks, encode=encode_sentences,
+            term_sets=lexical_index.term_sets(state["chunk_ids"])
+        )
+    response = {
+        "answer": answer,
+        "confidence": grounding["confidence"],
+        "support": grounding["sentences"],
+        "sources": list({page_label(c) for c in chunks}),
+        "documents": state["documents"],
+        "images": document_images(state["documents"]),
+        "backend": llm.name
+    }
+
+    if not answer.startswith("❌"):
+        answer_cache.put(
+            selected, state["versions"], question, state["chunk_ids"], llm.cache_name,
+            response, question_vec=state["question_vec"]
+        )
+    return response
+
+
+NOT_FOUND_RESPONSE = {
+    "answer": "Answer not found in the document.",
+    "confidence": 0.0,
+    "images": [],
+    "sources": []
+}
+
+IMAGE_NOT_FROM_PDF_RESPONSE = {
+    "answer": "Uploaded image is not from the provided PDF.",
+    "confidence": 0.0,
+    "images": [],
+    "sources": []
+}
+
+
+def check_ask_request(selected: list, backend: str = None):
+    """
+    Shared /ask validation; returns an error response or None.
+    """
+    try:
+        get_backend(backend)
+    except KeyError as e:
+        return JSONResponse(status_code=400, content={"error": str(e.args[0])})
+
     if collection.count() == 0:
         return JSONResponse(
             status_code=400,
             content={"error": "No PDF vectors found. Upload PDF first."}
         )
 
+    unknown = [d for d in selected if not get_document(d)]
+    if unknown:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"Unknown document(s): {', '.join(unknown)}"}
+        )
+    return None
+
+
+@router.post("/ask")
+async def ask_question(
+    question: str = Form(...),
+    image: UploadFile | None = File(None),
+    doc_ids: str | None = Form(None),
+    backend: str | None = Form(None)
+):
+    """
+    Answer a question from the indexed documents. `doc_ids` is an
+    optional comma-separated list restricting the search; `backend`
+    picks an LLM backend from config.LLM_BACKENDS.
+    """
+    selected = parse_csv(doc_ids)
+    error = check_ask_request(selected, backend)
+    if error:
+        return error
+    llm = get_backend(backend)
+
     try:
         matched_image = None
 
         # 🖼️ Image validation
         if image:
             image_bytes = await image.read()
-            uploaded_img = Image.open(BytesIO(image_bytes)).convert("RGB")
-            uploaded_hash = imagehash.phash(uploaded_img)
-
-            from core.image_extractor import PDF_IMAGE_HASHES
-
-            for stored_hash, meta in PDF_IMAGE_HASHES.items():
-                pdf_hash = imagehash.hex_to_hash(stored_hash)
-                if abs(uploaded_hash - pdf_hash) <= 6:
-                    matched_image = meta
-                    break
+            _, matched_image = await run_in_threadpool(
+                is_image_from_pdf, image_bytes, doc_ids=selected
+            )
 
             if not matched_image:
-                return {
-                    "answer": "Uploaded image is not from the provided PDF.",
-                    "confidence": 0.0,
-                    "images": [],
-                    "sources": []
-                }
-
-        # 🔍 Vector search (single source of truth)
-        relevant_chunks = retrieve_relevant_chunks(question, k=5)
-
-        if not relevant_chunks:
-            return {
-                "answer": "Answer not found in the document.",
-                "confidence": 0.0,
-                "images": [],
-                "sources": []
+                return IMAGE_NOT_FROM_PDF_RESPONSE
+
+        # Embedding, retrieval and scoring are CPU-bound: keep them off
+        # the event loop
+        state = await run_in_threadpool(prepare_answer, question, selected, llm)
+
+        if state["response"] is not None:
+            response = {**state["response"], "cached": True}
+        elif not state["chunks"]:
+            return NOT_FOUND_RESPONSE
+        else:
+            # 🤖 LLM
+            answer = await allm_query(question, state["chunks"], backend=llm.name)
+            response = {
+                **await run_in_threadpool(finish_answer, question, selected, state, answer, llm),
+                "cached": False
             }
 
-        # 🤖 LLM
-        answer = llm_query(question, relevant_chunks)
-        confidence = calculate_confidence(answer, relevant_chunks)
-
-        response = {
-            "answer": answer,
-            "confidence": confidence,
-            "sources": list({f"Page {c['page']}" for c in relevant_chunks}),
-            "images": current_pdf_images
-        }
-
         # 🎯 If image matched → restrict images
         if matched_image:
-            response["images"] = [
-                f"http://localhost:8000/static/images/{os.path.basename(matched_image['path'])}"
-            ]
+            response["images"] = [image_url(matched_image["path"])]
 
         return response
 
@@ -368,3 +878,222 @@ async def ask_question(
             status_code=500,
             content={"error": str(e)}
         )
+
+
+def encode_event(event: dict, fmt: str) -> str:
+    data = json.dumps(event, ensure_ascii=False)
+    if fmt == "sse":
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+def canned_events(response: dict, fmt: str):
+    """
+    Stream events for a fixed answer (no sources, no LLM call).
+    """
+    yield encode_event({"type": "sources", "sources": [], "pages": [],
+                        "documents": [], "images": [], "cached": False}, fmt)
+    yield encode_event({"type": "token", "text": response["answer"]}, fmt)
+    yield encode_event({"type": "done", "answer": response["answer"],
+                        "confidence": response["confidence"]}, fmt)
+
+
+@router.post("/ask-stream")
+async def ask_question_stream(
+    question: str = Form(...),
+    image: UploadFile | None = File(None),
+    doc_ids: str | None = Form(None),
+    backend: str | None = Form(None),
+    format: str = Form("ndjson")
+):
+    """
+    Streaming /ask. Emits, in order:
+      {"type": "sources", "sources", "pages", "documents", "images", "cached"}
+      {"type": "token", "text"}  (repeated, as the LLM produces them)
+      {"type": "done", "answer", "confidence", "support"}
+    or {"type": "error", "error"} on failure. `format` is "ndjson"
+    (application/x-ndjson) or "sse" (text/event-stream).
+    """
+    fmt = "sse" if format == "sse" else "ndjson"
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+
+    selected = parse_csv(doc_ids)
+    error = check_ask_request(selected, backend)
+    if error:
+        return error
+    llm = get_backend(backend)
+
+    matched_image = None
+    if image:
+        image_bytes = await image.read()
+        _, matched_image = await run_in_threadpool(
+            is_image_from_pdf, image_bytes, doc_ids=selected
+        )
+
+    async def events():
+        try:
+            if image and not matched_image:
+                for event in canned_events(IMAGE_NOT_FROM_PDF_RESPONSE, fmt):
+                    yield event
+                return
+
+            state = await run_in_threadpool(prepare_answer, question, selected, llm)
+            cached = state["response"]
+
+            if cached is None and not state["chunks"]:
+                for event in canned_events(NOT_FOUND_RESPONSE, fmt):
+                    yield event
+                return
+
+            if cached is not None:
+                sources = cached["sources"]
+                documents = cached.get("documents", [])
+                images = cached["images"]
+            else:
+                sources = list({page_label(c) for c in state["chunks"]})
+                documents = state["documents"]
+                images = document_images(documents)
+
+            if matched_image:
+                images = [image_url(matched_image["path"])]
+
+            # 📚 Sources first, before the LLM says anything
+            yield encode_event({
+                "type": "sources",
+                "sources": sources,
+                "pages": sorted({c["page"] for c in state["chunks"]}, key=str),
+                "documents": documents,
+                "images": images,
+                "cached": cached is not None
+            }, fmt)
+
+            if cached is not None:
+                yield encode_event({"type": "token", "text": cached["answer"]}, fmt)
+                yield encode_event({"type": "done", "answer": cached["answer"],
+                                    "confidence": cached["confidence"],
+                                    "support": cached.get("support", [])}, fmt)
+                return
+
+            # 🤖 Tokens as they arrive
+            parts = []
+            async for text in allm_stream(question, state["chunks"], backend=llm.name):
+                parts.append(text)
+                yield encode_event({"type": "token", "text": text}, fmt)
+
+            answer = "".join(parts).strip()
+            response = await run_in_threadpool(
+                finish_answer, question, selected, state, answer, llm
+            )
+
+            # 🎯 Confidence trails the answer
+            yield encode_event({"type": "done", "answer": answer,
+                                "confidence": response["confidence"],
+                                "support": response["support"]}, fmt)
+
+        except LLMError as e:
+            yield encode_event({"type": "error", "error": e.detail}, fmt)
+        except Exception as e:
+            yield encode_event({"type": "error", "error": str(e)}, fmt)
+
+    return StreamingResponse(
+        events(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/ask-batch")
+async def ask_question_batch(
+    questions: str = Form(...),
+    doc_ids: str | None = Form(None),
+    backend: str | None = Form(None)
+):
+    """
+    Answer a question bank in one request. `questions` is a JSON array
+    of strings or one question per line (at most ASK_BATCH_MAX_QUESTIONS).
+    All questions are embedded in one pass and retrieved with one
+    multi-query vector search; LLM calls then run ASK_BATCH_CONCURRENCY
+    at a time. Streams NDJSON as answers complete (in completion order):
+      {"type": "answer", "index", "question", ...the /ask response}
+      {"type": "error", "index", "question", "error"}
+      {"type": "done", "questions", "answered", "cached", "errors", "seconds"}
+    """
+    question_list = parse_questions(questions)
+    if not question_list:
+        return JSONResponse(status_code=400, content={"error": "No questions given"})
+    if len(question_list) > ASK_BATCH_MAX_QUESTIONS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"At most {ASK_BATCH_MAX_QUESTIONS} questions per batch"}
+        )
+
+    selected = parse_csv(doc_ids)
+    error = check_ask_request(selected, backend)
+    if error:
+        return error
+    llm = get_backend(backend)
+
+    async def answer_one(index: int, state: dict, semaphore: asyncio.Semaphore):
+        question = question_list[index]
+        try:
+            if state["response"] is not None:
+                return index, {**state["response"], "cached": True}, None
+            if not state["chunks"]:
+                return index, {**NOT_FOUND_RESPONSE, "cached": False}, None
+
+            # 🤖 Bounded pool of LLM calls
+            async with semaphore:
+                answer = await allm_query(question, state["chunks"], backend=llm.name)
+            response = await run_in_threadpool(
+                finish_answer, question, selected, state, answer, llm
+            )
+            return index, {**response, "cached": False}, None
+        except Exception as e:
+            return index, None, getattr(e, "detail", None) or str(e)
+
+    async def events():
+        start = time.perf_counter()
+        counts = {"answered": 0, "cached": 0, "errors": 0}
+        tasks = []
+        try:
+            # 🔍 One embedding pass + one multi-query retrieval for all
+            states = await run_in_threadpool(prepare_answers, question_list, selected, llm)
+
+            semaphore = asyncio.Semaphore(ASK_BATCH_CONCURRENCY)
+            tasks = [
+                asyncio.ensure_future(answer_one(i, state, semaphore))
+                for i, state in enumerate(states)
+            ]
+
+            for next_done in asyncio.as_completed(tasks):
+                index, response, error = await next_done
+                if error is not None:
+                    counts["errors"] += 1
+                    yield encode_event({"type": "error", "index": index,
+                                        "question": question_list[index], "error": error}, "ndjson")
+                    continue
+
+                counts["answered"] += 1
+                counts["cached"] += int(response["cached"])
+                yield encode_event({"type": "answer", "index": index,
+                                    "question": question_list[index], **response}, "ndjson")
+
+            yield encode_event({
+                "type": "done",
+                "questions": len(question_list),
+                **counts,
+                "seconds": round(time.perf_counter() - start, 3)
+            }, "ndjson")
+
+        except Exception as e:
+            yield encode_event({"type": "error", "error": str(e)}, "ndjson")
+        finally:
+            # Client went away: stop LLM calls nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
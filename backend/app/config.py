@@ -1,7 +1,119 @@
 EMBEDDING_MODEL = "BAAI/bge-large-en-v1.5"
 LLM_MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
 
-CHUNK_SIZE = 500
-CHUNK_OVERLAP = 50
+CHUNK_SIZE = 256                   # tokens, capped at the embedder's max_seq_length
+CHUNK_OVERLAP = 32                 # tokens carried into the next chunk
 SIMILARITY_THRESHOLD = 0.55
 TOP_K = 4
+
+# Background ingestion
+INGEST_WORKERS = 1
+JOB_TTL = 3600                     # seconds a finished job stays queryable
+MAX_FINISHED_JOBS = 200            # older finished jobs are dropped beyond this
+
+# Ingest cache (content-addressed parse + embedding results)
+INGEST_CACHE_MAX_ENTRIES = 50      # least recently used PDFs are evicted beyond this
+
+# Answer cache
+ANSWER_CACHE_CAPACITY = 1000
+ANSWER_CACHE_TTL = 3600            # seconds
+ANSWER_CACHE_SEMANTIC = False      # reuse answers of near-duplicate questions
+ANSWER_CACHE_SIMILARITY = 0.95     # cosine threshold for semantic hits
+
+# LLM client
+LLM_TIMEOUT = 60                   # seconds per HTTP attempt
+LLM_DEADLINE = 90                  # seconds per question, retries included (at least one timeout)
+LLM_MAX_CONCURRENCY = 16           # default in-flight HTTP calls per backend
+LLM_MAX_CONNECTIONS = 32           # default pooled keep-alive connections per backend
+LLM_MAX_RETRIES = 3                # on 429 / 5xx / connection errors
+LLM_RETRY_BACKOFF = 0.5            # seconds, doubled per attempt
+
+# LLM backends (pick per request with `backend=<name>`)
+#   type: hf_router | openai | local
+#   timeout: seconds per attempt; deadline: seconds per question (optional)
+#   max_concurrency / max_connections: HTTP limits (default LLM_MAX_*)
+#   batch_size: concurrent local requests generated together
+LLM_DEFAULT_BACKEND = "hf-router"
+LLM_BACKENDS = {
+    "hf-router": {
+        "type": "hf_router",
+        "model": "meta-llama/Llama-3.1-8B-Instruct:fastest",
+        "timeout": 60,
+        "max_tokens": 300,
+        "temperature": 0.1,
+        "max_context_chunks": 20,
+        "max_concurrency": 16,
+    },
+    "openai": {
+        "type": "openai",
+        "model": "gpt-4o-mini",
+        "timeout": 60,
+        "max_tokens": 500,
+        "temperature": 0.2,
+        "max_context_chunks": 20,
+        "max_concurrency": 8,
+    },
+    "local-cpu": {
+        "type": "local",
+        "model": LLM_MODEL,
+        "timeout": 300,
+        "max_tokens": 400,
+        "temperature": 0.1,
+        "max_context_chunks": 8,
+        "batch_size": 4,
+    },
+}
+
+# Batch question answering (/ask-batch)
+ASK_BATCH_MAX_QUESTIONS = 200
+ASK_BATCH_CONCURRENCY = 8          # LLM calls in flight per batch
+
+# Model registry
+MODEL_RETRY_SECONDS = 60           # a failed model load is retried after this
+
+# Embedding engine
+EMBED_BATCH_SIZE = 64              # texts per forward pass
+EMBED_PROCESSES = 0                # >1 → multi-process CPU encoding
+EMBED_INSERT_BATCH = 256           # chunks per embed + Chroma insert round
+
+# Parallel page extraction
+INGEST_PROCESSES = 0               # >1 → shard pages over worker processes
+PARALLEL_MIN_PAGES = 32            # smaller PDFs stay single-process
+SHARDS_PER_PROCESS = 4             # page ranges per worker, for load balance
+
+# Image captioning at ingest (BLIP, CPU)
+IMAGE_CAPTIONS = False             # opt-in: BLIP-large runs inline in ingest on CPU
+CAPTION_BATCH_SIZE = 8             # images per generate() call
+CAPTION_MAX_TOKENS = 40
+
+# Hybrid retrieval (BM25 + dense, reciprocal rank fusion)
+HYBRID_SEARCH = True
+HYBRID_CANDIDATES = 20             # hits taken from each retriever
+RRF_K = 60
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Reranking and context packing
+RERANK_METHOD = "mmr"              # mmr | cross-encoder | none
+RERANK_CANDIDATES = 20             # hits over-fetched before reranking
+MMR_LAMBDA = 0.7                   # relevance vs. diversity
+CONTEXT_MAX_CHUNKS = 6
+CONTEXT_TOKEN_BUDGET = 1200        # chunk tokens sent to the LLM
+OVERLAP_DROP_RATIO = 0.5           # share of a chunk already covered by a better one
+
+# Answer grounding (confidence)
+GROUNDING_BUDGET_MS = 50           # sentence embeddings stop before this is exceeded
+GROUNDING_MAX_SENTENCES = 24
+GROUNDING_SEMANTIC_WEIGHT = 0.5    # cosine vs. term overlap in sentence support
+GROUNDING_SUPPORT_THRESHOLD = 0.35 # a sentence counts as supported from here
+
+# Vector store backend: chroma | numpy | faiss | quantized
+#   numpy: memory-mapped float32 matrix, exact search
+#   faiss: numpy rows behind a FAISS index_factory index (needs faiss-cpu)
+#   quantized: int8 / binary codes; keep_float also keeps the float32 rows
+#     to re-score top candidates (more disk than numpy, near-exact recall)
+VECTOR_STORE = "chroma"
+VECTOR_STORE_OPTIONS = {
+    "faiss": {"factory": "HNSW32", "nprobe": 16, "ef_search": 128},
+    "quantized": {"quantization": "int8", "keep_float": True, "rescore_factor": 4},
+}
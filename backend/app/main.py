@@ -1,8 +1,20 @@
+import time
+
+_import_start = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes import router
 from fastapi.staticfiles import StaticFiles
 
+from core.model_registry import current_rss_mb
+from core.metrics import TimingMiddleware
+
+# 📏 Startup cost, reported by /models
+IMPORT_SECONDS = round(time.perf_counter() - _import_start, 3)
+IMPORT_RSS_MB = current_rss_mb()
+print(f"🚀 Imports took {IMPORT_SECONDS}s, RSS {IMPORT_RSS_MB} MB")
+
 
 app = FastAPI(title="Multi-Modal Syllabus AI")
 
@@ -20,8 +32,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# ⏱️ Server-Timing header + request latency histogram
+app.add_middleware(TimingMiddleware)
+
 app.mount(
     "/static/images",
     StaticFiles(directory="data/images"),
@@ -29,6 +45,42 @@ app.mount(
 )
 
 app.include_router(router)
+app.state.import_seconds = IMPORT_SECONDS
+app.state.import_rss_mb = IMPORT_RSS_MB
+
+
+@app.on_event("startup")
+def backfill_lexical_index():
+    from app.config import HYBRID_SEARCH
+    from api.routes import lexical_backfill
+    if HYBRID_SEARCH:
+        lexical_backfill()
+
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    from core.llm_backends import close_backends
+    await close_backends()
+
+
+@app.on_event("shutdown")
+def stop_embedding_pool():
+    from core.vector_store import embedding_engine
+    from core.model_registry import is_loaded, EMBEDDER
+    if is_loaded(EMBEDDER):
+        embedding_engine.stop()
+
+
+@app.on_event("shutdown")
+def flush_embedding_cache():
+    from core.embedding_cache import embedding_cache
+    embedding_cache.flush()
+
+
+@app.on_event("shutdown")
+def stop_page_pool():
+    from core.parallel_ingest import shutdown_pool
+    shutdown_pool()
 
 if __name__ == "__main__":
     import uvicorn
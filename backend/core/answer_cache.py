@@ -0,0 +1,167 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.config import (
+    ANSWER_CACHE_CAPACITY,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_SEMANTIC,
+    ANSWER_CACHE_SIMILARITY,
+)
+from core.embedding_cache import normalize_text
+
+ALL_DOCUMENTS = "*"
+
+
+class AnswerCache:
+    """
+    TTL + capacity bounded cache of /ask responses.
+
+    Exact key: (document versions, normalized question, retrieved chunk
+    ids, model name). In semantic mode a question whose embedding is
+    within `threshold` cosine similarity of a cached question over the
+    same documents and model reuses that answer before retrieval runs.
+    """
+
+    def __init__(self, capacity: int = ANSWER_CACHE_CAPACITY, ttl: float = ANSWER_CACHE_TTL,
+                 semantic: bool = ANSWER_CACHE_SEMANTIC, threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.semantic = semantic
+        self.threshold = threshold
+
+        self._entries = OrderedDict()   # key -> entry
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "invalidations": 0}
+
+    # ---- keys ----
+    @staticmethod
+    def make_key(doc_versions: dict, question: str, chunk_ids, model: str) -> str:
+        versions = ",".join(f"{d}:{v}" for d, v in sorted(doc_versions.items()))
+        raw = "\x00".join([
+            versions,
+            normalize_text(question),
+            ",".join(chunk_ids),
+            model
+        ])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def scope_of(doc_ids) -> tuple:
+        return tuple(sorted(doc_ids)) if doc_ids else (ALL_DOCUMENTS,)
+
+    # ---- internals ----
+    def _expired(self, entry, now) -> bool:
+        return entry["expires"] <= now
+
+    def _evict(self, now):
+        for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+            del self._entries[key]
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    # ---- public API ----
+    def get(self, doc_versions: dict, question: str, chunk_ids, model: str):
+        key = self.make_key(doc_versions, question, chunk_ids, model)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry, now):
+                self._entries.pop(key, None)
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry["value"]
+
+    def get_similar(self, doc_ids, question_vec, model: str):
+        """
+        Semantic lookup; returns None unless semantic mode is on.
+        """
+        if not self.semantic:
+            return None
+
+        scope = self.scope_of(doc_ids)
+        now = time.time()
+
+        with self._lock:
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if e["scope"] == scope and e["model"] == model
+                and e["question_vec"] is not None and not self._expired(e, now)
+            ]
+            if not candidates:
+                return None
+
+            matrix = np.vstack([e["question_vec"] for _, e in candidates])
+            query = np.asarray(question_vec, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+            sims = matrix @ query / np.maximum(norms, 1e-12)
+
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            self.stats["semantic_hits"] += 1
+            return entry["value"]
+
+    def put(self, doc_ids, doc_versions: dict, question: str, chunk_ids, model: str,
+            value, question_vec=None):
+        key = self.make_key(doc_versions, question, chunk_ids, model)
+        now = time.time()
+
+        with self._lock:
+            self._entries[key] = {
+                "value": value,
+                "expires": now + self.ttl,
+                "scope": self.scope_of(doc_ids),
+                "doc_ids": set(doc_versions),
+                "model": model,
+                "question_vec": (
+                    np.asarray(question_vec, dtype=np.float32)
+                    if question_vec is not None else None
+                )
+            }
+            self._entries.move_to_end(key)
+            self._evict(now)
+
+    def invalidate_document(self, doc_id: str):
+        """
+        Drop every answer that used `doc_id` or searched the whole corpus.
+        """
+        with self._lock:
+            stale = [
+                k for k, e in self._entries.items()
+                if doc_id in e["doc_ids"]
+                or doc_id in e["scope"]
+                or e["scope"] == (ALL_DOCUMENTS,)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidations"] += len(stale)
+
+    def report(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+            hits = self.stats["hits"] + self.stats["semantic_hits"]
+            return {
+                **self.stats,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "semantic": self.semantic
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide cache
+answer_cache = AnswerCache()
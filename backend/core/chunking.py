@@ -1,9 +1,281 @@
-def chunk_text(text, size=500, overlap=50):
-    words = text.split()
-    chunks = []
+import re
 
-    for i in range(0, len(words), size - overlap):
-        chunk = " ".join(words[i:i + size])
-        chunks.append(chunk)
+from app.config import CHUNK_SIZE, CHUNK_OVERLAP
 
-    return chunks
+# -------------------------------
+# Structure-aware chunking
+# -------------------------------
+# Chunks are packed from whole PyMuPDF text blocks (paragraphs) up to a
+# token budget measured with the embedder's own tokenizer, so nothing
+# is silently truncated by the model. A heading always starts a new
+# chunk; a block that is too long on its own is split at sentence, then
+# word boundaries. Offsets refer to the document text, i.e. the page
+# texts joined by newlines.
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+WORD_BREAK = re.compile(r"\s+")
+_APPROX_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+HEADING_MAX_WORDS = 12
+
+
+def approx_token_counts(texts) -> list:
+    """
+    WordPiece-style estimate used when no tokenizer is available: one
+    token per word or punctuation mark, plus one per 6 extra characters
+    of long words.
+    """
+    return [
+        sum(1 + (len(tok) - 1) // 6 for tok in _APPROX_TOKEN.findall(text))
+        for text in texts
+    ]
+
+
+def tokenizer_counts(tokenizer):
+    """
+    Batched token counter around a Hugging Face tokenizer.
+    """
+    def count(texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]
+        return [len(i) for i in ids]
+    return count
+
+
+def is_heading(text: str) -> bool:
+    """
+    A short single-line block that does not read like a sentence.
+    """
+    text = text.strip()
+    if not text or "\n" in text or text[-1] in ".,;:":
+        return False
+    return len(text.split()) <= HEADING_MAX_WORDS and any(c.isalpha() for c in text)
+
+
+def _spans(text: str, start: int, end: int, pattern):
+    """
+    (start, end) pieces of text[start:end] between matches of `pattern`.
+    """
+    pos = start
+    for m in pattern.finditer(text, start, end):
+        if m.start() > pos:
+            yield pos, m.start()
+        pos = m.end()
+    if pos < end:
+        yield pos, end
+
+
+def _strip_bounds(text: str, start: int, end: int):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+class Chunker:
+    """
+    Token-budgeted chunker. `count_tokens(texts) -> [int]` must count
+    tokens the way the embedding model does; counts of adjacent pieces
+    are assumed to add up (true for WordPiece/BPE on whitespace splits).
+    """
+
+    def __init__(self, max_tokens: int = CHUNK_SIZE, overlap_tokens: int = CHUNK_OVERLAP,
+                 count_tokens=None):
+        self.max_tokens = max(1, max_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+        self.count_tokens = count_tokens or approx_token_counts
+
+    @classmethod
+    def for_model(cls, model, max_tokens: int = CHUNK_SIZE,
+                  overlap_tokens: int = CHUNK_OVERLAP):
+        """
+        Budget capped at the model's max_seq_length (minus [CLS]/[SEP]),
+        counted with its tokenizer when it exposes one.
+        """
+        limit = getattr(model, "max_seq_length", None)
+        if limit:
+            max_tokens = min(max_tokens, limit - 2)
+
+        tokenizer = getattr(model, "tokenizer", None)
+        count = tokenizer_counts(tokenizer) if tokenizer is not None else None
+        return cls(max_tokens, overlap_tokens, count)
+
+    def stream(self):
+        return ChunkStream(self)
+
+    def chunk_pages(self, pages):
+        """
+        Yield chunk dicts for an iterable of pages ({"page", "text",
+        "blocks"} as produced by pdf_loader.iter_pages). Only the
+        current chunk's pages are held in memory.
+        """
+        stream = self.stream()
+        for page in pages:
+            yield from stream.feed(page)
+        yield from stream.close()
+
+
+class ChunkStream:
+    """
+    Incremental state of one document: feed() pages in order, then
+    close(). Both are generators of chunk dicts:
+        {"page", "page_end", "char_start", "char_end", "tokens", "text"}
+    """
+
+    def __init__(self, chunker: Chunker):
+        self.chunker = chunker
+        self.offset = 0            # document offset of the next page
+        self.units = []            # (page, page_text, start, end, tokens, page_offset)
+        self.tokens = 0
+
+    # ---- units ----
+    def _blocks(self, page: dict):
+        """
+        (start, end) of each non-empty block inside the page text.
+        """
+        text = page["text"]
+        blocks = page.get("blocks")
+        if blocks is None:
+            spans = _spans(text, 0, len(text), PARAGRAPH_BREAK)
+        else:
+            spans, pos = [], 0
+            for block in blocks:
+                found = text.find(block, pos)
+                if found < 0:
+                    continue
+                spans.append((found, found + len(block)))
+                pos = found + len(block)
+
+        for start, end in spans:
+            start, end = _strip_bounds(text, start, end)
+            if end > start:
+                yield start, end
+
+    def _split(self, text: str, start: int, end: int, tokens: int):
+        """
+        Break one oversized span into pieces within the token budget,
+        at sentence boundaries first and word boundaries if needed.
+        Yields (start, end, tokens).
+        """
+        limit = self.chunker.max_tokens
+        if tokens <= limit:
+            yield start, end, tokens
+            return
+
+        for pattern in (SENTENCE_BREAK, WORD_BREAK):
+            pieces = list(_spans(text, start, end, pattern))
+            if len(pieces) > 1:
+                break
+        else:
+            yield start, end, tokens   # one unbreakable token run
+            return
+
+        counts = self.chunker.count_tokens(text[s:e] for s, e in pieces)
+        if pattern is SENTENCE_BREAK:
+            for (s, e), n in zip(pieces, counts):
+                yield from self._split(text, s, e, n)
+            return
+
+        # Words: pack greedily into windows of at most `limit` tokens
+        window_start, window_end, window_tokens = None, None, 0
+        for (s, e), n in zip(pieces, counts):
+            if window_start is not None and window_tokens + n > limit:
+                yield window_start, window_end, window_tokens
+                window_start, window_tokens = None, 0
+            if window_start is None:
+                window_start = s
+            window_end = e
+            window_tokens += n
+        if window_start is not None:
+            yield window_start, window_end, window_tokens
+
+    # ---- chunks ----
+    def _emit(self, keep_overlap: bool):
+        units = self.units
+        if not units:
+            return None
+
+        parts = []
+        run_page, run_text, run_start, run_end = units[0][0], units[0][1], units[0][2], units[0][3]
+        for page, page_text, start, end, _, _ in units[1:]:
+            if page == run_page:
+                run_end = end
+                continue
+            parts.append(run_text[run_start:run_end])
+            run_page, run_text, run_start, run_end = page, page_text, start, end
+        parts.append(run_text[run_start:run_end])
+
+        first, last = units[0], units[-1]
+        chunk = {
+            "page": first[0],
+            "page_end": last[0],
+            "char_start": first[5] + first[2],
+            "char_end": last[5] + last[3],
+            "tokens": self.tokens,
+            "text": "\n".join(parts)
+        }
+
+        # Carry trailing units into the next chunk as overlap, but always
+        # move forward by at least one unit
+        carried, carried_tokens = [], 0
+        if keep_overlap:
+            for unit in reversed(units[1:]):
+                if carried_tokens + unit[4] > self.chunker.overlap_tokens:
+                    break
+                carried.insert(0, unit)
+                carried_tokens += unit[4]
+
+        self.units = carried
+        self.tokens = carried_tokens
+        return chunk
+
+    def _add(self, unit, heading: bool):
+        limit = self.chunker.max_tokens
+        out = []
+
+        if heading and self.units:
+            out.append(self._emit(keep_overlap=False))
+
+        if self.tokens + unit[4] > limit and self.units:
+            out.append(self._emit(keep_overlap=True))
+            if self.tokens + unit[4] > limit:
+                self.units, self.tokens = [], 0
+
+        self.units.append(unit)
+        self.tokens += unit[4]
+        return out
+
+    def feed(self, page: dict):
+        text = page["text"]
+        offset = self.offset
+        self.offset += len(text) + 1
+
+        spans = list(self._blocks(page))
+        if not spans:
+            return
+
+        counts = self.chunker.count_tokens(text[s:e] for s, e in spans)
+        for (start, end), tokens in zip(spans, counts):
+            heading = is_heading(text[start:end])
+            for i, (s, e, n) in enumerate(self._split(text, start, end, tokens)):
+                unit = (page["page"], text, s, e, n, offset)
+                yield from self._add(unit, heading and i == 0)
+
+    def close(self):
+        chunk = self._emit(keep_overlap=False)
+        if chunk is not None:
+            yield chunk
+
+
+def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP,
+               count_tokens=None):
+    """
+    Yield chunk strings of at most `size` tokens for a plain text,
+    split on paragraph boundaries.
+    """
+    chunker = Chunker(size, overlap, count_tokens)
+    for chunk in chunker.chunk_pages([{"page": 1, "text": text}]):
+        yield chunk["text"]
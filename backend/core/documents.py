@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+import time
+
+# -------------------------------
+# Document registry
+# -------------------------------
+# doc_id -> {
+#     "doc_id", "filename", "pdf_path", "content_hash", "pages",
+#     "page_hashes": [page fingerprint, ...], "chunks",
+#     "images": [url, ...], "image_hashes": {hash: {"page", "path"}},
+#     "created_at", "updated_at"
+# }
+REGISTRY_PATH = "data/documents.json"
+
+_lock = threading.Lock()
+_documents = None
+
+
+def _load():
+    global _documents
+    if _documents is None:
+        if os.path.exists(REGISTRY_PATH):
+            with open(REGISTRY_PATH, "r", encoding="utf-8") as f:
+                _documents = json.load(f)
+        else:
+            _documents = {}
+    return _documents
+
+
+def _save():
+    os.makedirs(os.path.dirname(REGISTRY_PATH), exist_ok=True)
+    tmp_path = REGISTRY_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_documents, f)
+    os.replace(tmp_path, REGISTRY_PATH)
+
+
+def register_document(doc_id: str, **meta) -> dict:
+    """
+    Create or update a document entry and persist the registry.
+    """
+    with _lock:
+        docs = _load()
+        now = time.time()
+        entry = docs.get(doc_id, {"doc_id": doc_id, "created_at": now})
+        entry.update(meta)
+        entry["updated_at"] = now
+        docs[doc_id] = entry
+        _save()
+        return dict(entry)
+
+
+def get_document(doc_id: str):
+    with _lock:
+        entry = _load().get(doc_id)
+        return dict(entry) if entry else None
+
+
+def list_documents() -> list:
+    with _lock:
+        return sorted(
+            (dict(d) for d in _load().values()),
+            key=lambda d: d.get("updated_at", 0)
+        )
+
+
+def latest_document():
+    docs = list_documents()
+    return docs[-1] if docs else None
+
+
+def find_by_hash(content_hash: str):
+    """
+    Most recent document whose PDF bytes hash to `content_hash`.
+    """
+    matches = [
+        d for d in list_documents()
+        if d.get("content_hash") == content_hash
+    ]
+    return matches[-1] if matches else None
+
+
+def remove_document(doc_id: str):
+    with _lock:
+        entry = _load().pop(doc_id, None)
+        if entry is not None:
+            _save()
+        return entry
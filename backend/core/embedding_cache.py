@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# -------------------------------
+# Embedding cache
+# -------------------------------
+# Key: (model name, normalized text)
+# Tier 1: in-memory LRU of float32 vectors
+# Tier 2 (optional): on-disk memory-mapped float32 slab with an LRU
+#                    slot table, evicted by total size in bytes. Slot
+#                    assignments are appended to a journal; the full
+#                    table is only rewritten when the journal grows past
+#                    the tier's capacity and at shutdown.
+MEMORY_CAPACITY = 10_000          # vectors kept in RAM
+DISK_DIR = "data/cache/embeddings"
+DISK_MAX_BYTES = 256 * 1024 * 1024
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    raw = f"{model_name}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+class DiskTier:
+    """
+    Fixed-size memory-mapped float32 matrix. Each cached vector owns one
+    row; rows are recycled in LRU order once the byte budget is used up.
+
+    The slot table is index_<dim>.json (snapshot) plus journal_<dim>.log
+    ("<key> <row>" per assignment, replayed on open). Recency of reads
+    is not journaled, so after a restart eviction order falls back to
+    write order.
+    """
+
+    def __init__(self, directory: str, dim: int, max_bytes: int):
+        self.directory = directory
+        self.dim = dim
+        self.capacity = max(1, max_bytes // (dim * 4))
+        os.makedirs(directory, exist_ok=True)
+
+        self.matrix_path = os.path.join(directory, f"vectors_{dim}.f32")
+        self.index_path = os.path.join(directory, f"index_{dim}.json")
+        self.journal_path = os.path.join(directory, f"journal_{dim}.log")
+
+        size = self.capacity * dim * 4
+        reuse = (
+            os.path.exists(self.matrix_path)
+            and os.path.getsize(self.matrix_path) == size
+        )
+        self.matrix = np.memmap(
+            self.matrix_path, dtype=np.float32, mode="r+" if reuse else "w+",
+            shape=(self.capacity, dim)
+        )
+
+        self.slots = OrderedDict()     # key -> row, oldest first
+        self._journaled = 0            # journal lines since the last snapshot
+        if reuse:
+            self._load()
+        else:
+            for path in (self.index_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self._pending = []             # (key, row) not yet journaled
+
+    def _load(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.slots = OrderedDict(json.load(f)["slots"])
+
+        if os.path.exists(self.journal_path):
+            owners = {row: key for key, row in self.slots.items()}
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) != 2:
+                        continue            # torn write at the tail
+                    key, row = parts[0], int(parts[1])
+                    previous = owners.get(row)
+                    if previous is not None and previous != key:
+                        self.slots.pop(previous, None)
+                    self.slots.pop(key, None)
+                    self.slots[key] = row
+                    owners[row] = key
+                    self._journaled += 1
+
+    def get(self, key: str):
+        row = self.slots.get(key)
+        if row is None:
+            return None
+        self.slots.move_to_end(key)
+        return np.array(self.matrix[row])
+
+    def put(self, key: str, vector: np.ndarray):
+        if key in self.slots:
+            self.slots.move_to_end(key)
+            return
+
+        if len(self.slots) >= self.capacity:
+            _, row = self.slots.popitem(last=False)
+        else:
+            row = len(self.slots)
+
+        self.matrix[row] = vector
+        self.slots[key] = row
+        self._pending.append((key, row))
+
+    def flush(self):
+        """
+        Persist new rows and append their slot assignments to the journal
+        (a few bytes per vector); compact once the journal outgrows the
+        table.
+        """
+        if not self._pending:
+            return
+        self.matrix.flush()
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.writelines(f"{key} {row}\n" for key, row in self._pending)
+        self._journaled += len(self._pending)
+        self._pending = []
+
+        if self._journaled > self.capacity:
+            self.compact()
+
+    def compact(self):
+        """
+        Snapshot the slot table (in LRU order) and truncate the journal.
+        """
+        if self._pending:
+            self.flush()
+            return
+        self.matrix.flush()
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"capacity": self.capacity, "slots": list(self.slots.items())}, f)
+        os.replace(tmp_path, self.index_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journaled = 0
+
+    def nbytes(self) -> int:
+        return len(self.slots) * self.dim * 4
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache in front of an `encode(texts) -> matrix` function.
+    """
+
+    def __init__(self, memory_capacity: int = MEMORY_CAPACITY,
+                 disk_dir: str = None, disk_max_bytes: int = DISK_MAX_BYTES):
+        self.memory_capacity = memory_capacity
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory = OrderedDict()   # key -> vector
+        self._disk = {}                # dim -> DiskTier
+        self._lock = threading.Lock()
+
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        # Re-open disk tiers left by a previous process
+        if disk_dir and os.path.isdir(disk_dir):
+            for name in os.listdir(disk_dir):
+                if name.startswith("vectors_") and name.endswith(".f32"):
+                    dim = int(name[len("vectors_"):-len(".f32")])
+                    self._disk_tier(dim)
+
+    # ---- tiers ----
+    def _disk_tier(self, dim: int):
+        if not self.disk_dir:
+            return None
+        if dim not in self._disk:
+            self._disk[dim] = DiskTier(self.disk_dir, dim, self.disk_max_bytes)
+        return self._disk[dim]
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_capacity:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _lookup(self, key: str, remember: bool = True):
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            return vector
+
+        for tier in self._disk.values():
+            vector = tier.get(key)
+            if vector is not None:
+                if remember:
+                    self._remember(key, vector)
+                self.stats["disk_hits"] += 1
+                return vector
+
+        self.stats["misses"] += 1
+        return None
+
+    # ---- public API ----
+    def encode(self, encode_fn, model_name: str, texts, remember: bool = True):
+        """
+        Drop-in for encode_fn(texts) that only runs the transformer on
+        texts not seen before. Accepts a single string or a list; returns
+        a float32 vector or matrix accordingly.
+
+        With remember=False (bulk ingest) new vectors only go to the disk
+        tier, so a large document does not flush the in-memory LRU that
+        serves queries.
+        """
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        keys = [cache_key(model_name, t) for t in texts]
+        vectors = [None] * len(texts)
+        missing = {}                    # key -> first index needing it
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vectors[i] = self._lookup(key, remember)
+                if vectors[i] is None and key not in missing:
+                    missing[key] = i
+
+        if missing:
+            fresh = encode_fn([texts[i] for i in missing.values()])
+            fresh = np.asarray(fresh, dtype=np.float32)
+
+            fresh_by_key = dict(zip(missing, fresh))
+
+            with self._lock:
+                tier = self._disk_tier(fresh.shape[1])
+                for key, vector in fresh_by_key.items():
+                    if remember or tier is None:
+                        self._remember(key, vector)
+                    if tier is not None:
+                        tier.put(key, vector)
+                if tier is not None:
+                    tier.flush()
+
+            for i, key in enumerate(keys):
+                if vectors[i] is None:
+                    vectors[i] = fresh_by_key[key]
+
+        matrix = np.vstack(vectors).astype(np.float32, copy=False)
+        return matrix[0] if single else matrix
+
+    def report(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hit_ratio = (self.stats["hits"] + self.stats["disk_hits"]) / lookups if lookups else 0.0
+            return {
+                **self.stats,
+                "hit_ratio": round(hit_ratio, 4),
+                "memory_entries": len(self._memory),
+                "disk_entries": sum(len(t.slots) for t in self._disk.values()),
+                "disk_bytes": sum(t.nbytes() for t in self._disk.values())
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+
+    def flush(self):
+        """
+        Write a compact slot table for every disk tier (on shutdown).
+        """
+        with self._lock:
+            for tier in self._disk.values():
+                tier.compact()
+
+
+# Process-wide cache (disk tier on)
+embedding_cache = EmbeddingCache(disk_dir=DISK_DIR)
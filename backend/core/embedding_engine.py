@@ -0,0 +1,81 @@
+import threading
+
+import numpy as np
+
+from app.config import EMBED_BATCH_SIZE, EMBED_PROCESSES
+from core.embedding_cache import embedding_cache
+from core.metrics import span
+
+
+class EmbeddingEngine:
+    """
+    Cached, bounded-batch encoder around a SentenceTransformer.
+    `load_model()` returns the model; it is only called when a text
+    actually needs encoding, so cache hits never load the weights.
+
+    - at most `batch_size` texts go through the model per forward pass
+    - with processes > 1, uncached texts are spread over a pool of CPU
+      worker processes (started on first use)
+    - already-seen texts come from the embedding cache
+    """
+
+    def __init__(self, load_model, model_name: str, batch_size: int = EMBED_BATCH_SIZE,
+                 processes: int = EMBED_PROCESSES, cache=embedding_cache):
+        self.load_model = load_model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.processes = processes
+        self.cache = cache
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self.load_model()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self.model.start_multi_process_pool(
+                    target_devices=["cpu"] * self.processes
+                )
+            return self._pool
+
+    def _encode_uncached(self, texts: list) -> np.ndarray:
+        if self.processes > 1 and len(texts) > self.batch_size:
+            embeddings = self.model.encode_multi_process(
+                texts, self._get_pool(), batch_size=self.batch_size
+            )
+        else:
+            embeddings = self.model.encode(
+                texts, batch_size=self.batch_size, show_progress_bar=False
+            )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def encode(self, texts, remember: bool = True):
+        """
+        Same contract as model.encode: a string gives a vector, a list
+        gives a float32 matrix. remember=False keeps the vectors out of
+        the in-memory cache tier (see EmbeddingCache.encode).
+        """
+        with span("embed"):
+            if self.cache is None:
+                return self.encode_uncached(texts)
+            return self.cache.encode(self._encode_uncached, self.model_name, texts, remember)
+
+    def encode_uncached(self, texts):
+        """
+        encode() bypassing every cache tier, for one-off texts that
+        would only evict useful entries.
+        """
+        with span("embed"):
+            single = isinstance(texts, str)
+            matrix = self._encode_uncached([texts] if single else list(texts))
+            return matrix[0] if single else matrix
+
+    def stop(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self.model.stop_multi_process_pool(self._pool)
+                self._pool = None
@@ -1,7 +1,5 @@
-from sentence_transformers import SentenceTransformer
+from core.model_registry import get_model, EMBEDDER
 
-# model = SentenceTransformer("BAAI/bge-large-en-v1.5")
-model = SentenceTransformer("all-MiniLM-L6-v2")
 
 def embed(texts):
-    return model.encode(texts, normalize_embeddings=True)
+    return get_model(EMBEDDER).encode(texts, normalize_embeddings=True)
@@ -0,0 +1,193 @@
+import re
+import time
+
+import numpy as np
+
+from app.config import (
+    GROUNDING_BUDGET_MS,
+    GROUNDING_MAX_SENTENCES,
+    GROUNDING_SEMANTIC_WEIGHT,
+    GROUNDING_SUPPORT_THRESHOLD,
+)
+from core.lexical_index import tokenize
+
+# -------------------------------
+# Answer grounding
+# -------------------------------
+# Every answer sentence is scored against the context chunks it was
+# generated from:
+#   lexical   share of the sentence's terms found in the chunk (term
+#             sets come from the BM25 index, built at ingest)
+#   semantic  cosine of the sentence embedding with the chunk vector
+#             already returned by retrieval
+# Both are computed as one matrix product over all sentences x chunks.
+# Sentences are embedded in small batches, and only as many as the
+# latency budget allows, judged by the measured cost per sentence; the
+# rest keep lexical support only.
+NOT_FOUND_ANSWER = "answer not found in the document."
+ENCODE_BATCH = 4                   # sentences per encode() call
+
+_encode_cost = {"ms_per_sentence": None}   # moving average over calls
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+BULLET_PATTERN = re.compile(r"^\s*(?:[•\-*]|\d+[.)])\s*")
+
+
+def answer_sentences(answer: str, limit: int = GROUNDING_MAX_SENTENCES) -> list:
+    """
+    Sentences and bullet items of an answer that carry at least one term.
+    """
+    sentences = []
+    for part in SENTENCE_PATTERN.split(answer):
+        part = BULLET_PATTERN.sub("", part).strip()
+        if part and tokenize(part):
+            sentences.append(part)
+        if len(sentences) >= limit:
+            break
+    return sentences
+
+
+def lexical_overlap(sentence_terms: list, chunk_terms: list) -> np.ndarray:
+    """
+    [n_sentences, n_chunks] share of each sentence's distinct terms that
+    occur in each chunk, via term ids and binary incidence matrices.
+    """
+    vocab = {}
+    for terms in sentence_terms:
+        for term in terms:
+            vocab.setdefault(term, len(vocab))
+
+    sentences = np.zeros((len(sentence_terms), len(vocab)), dtype=np.float32)
+    for i, terms in enumerate(sentence_terms):
+        sentences[i, [vocab[t] for t in terms]] = 1.0
+
+    chunks = np.zeros((len(chunk_terms), len(vocab)), dtype=np.float32)
+    for j, terms in enumerate(chunk_terms):
+        ids = [vocab[t] for t in terms if t in vocab]
+        chunks[j, ids] = 1.0
+
+    sizes = sentences.sum(axis=1, keepdims=True)
+    return (sentences @ chunks.T) / np.maximum(sizes, 1.0)
+
+
+def semantic_similarity(sentence_vectors, chunk_vectors: list) -> np.ndarray:
+    """
+    [n_sentences, n_chunks] cosine similarity clipped at 0; chunks
+    without a vector score 0.
+    """
+    sentences = np.atleast_2d(np.asarray(sentence_vectors, dtype=np.float32))
+    sentences = sentences / (np.linalg.norm(sentences, axis=1, keepdims=True) + 1e-12)
+
+    dim = sentences.shape[1]
+    chunks = np.zeros((len(chunk_vectors), dim), dtype=np.float32)
+    for j, vector in enumerate(chunk_vectors):
+        if vector is not None and len(vector) == dim:
+            chunks[j] = vector
+    chunks = chunks / (np.linalg.norm(chunks, axis=1, keepdims=True) + 1e-12)
+
+    return np.clip(sentences @ chunks.T, 0.0, 1.0)
+
+
+def encode_within_budget(sentences: list, encode, deadline: float) -> list:
+    """
+    Embed a prefix of `sentences`, batch by batch; each batch is cut to
+    what the measured cost per sentence says still fits before
+    `deadline` (the first call ever probes with one sentence). Returns
+    the vectors of the encoded prefix.
+    """
+    vectors = []
+    while len(vectors) < len(sentences):
+        remaining_ms = (deadline - time.perf_counter()) * 1000
+        if remaining_ms <= 0:
+            break
+        cost = _encode_cost["ms_per_sentence"]
+        # Cost not measured yet: probe with a single sentence
+        size = 1 if cost is None else min(ENCODE_BATCH, int(remaining_ms / cost))
+        if size < 1:
+            break
+        batch = sentences[len(vectors):len(vectors) + size]
+
+        batch_start = time.perf_counter()
+        vectors.extend(np.atleast_2d(np.asarray(encode(batch), dtype=np.float32)))
+        measured = (time.perf_counter() - batch_start) * 1000 / len(batch)
+        _encode_cost["ms_per_sentence"] = (
+            measured if cost is None else 0.8 * cost + 0.2 * measured
+        )
+    return vectors
+
+
+def score_answer(answer: str, chunks: list, encode=None, term_sets: dict = None,
+                 budget_ms: float = GROUNDING_BUDGET_MS) -> dict:
+    """
+    Per-sentence support of `answer` by `chunks` (dicts with "id",
+    "text", "page" and optionally "vector").
+
+    `term_sets` ({chunk_id: terms}, LexicalIndex.term_sets) avoids
+    re-tokenizing chunks; missing ones are tokenized here. `encode`
+    embeds the answer sentences, as many as fit in `budget_ms`; support
+    of the others (all of them without `encode`) is lexical only.
+
+    Returns {"confidence": float, "sentences": [{"text", "support",
+             "lexical", "semantic", "chunk", "page"}], "semantic": bool,
+             "encoded": int, "ms": float}
+    """
+    start = time.perf_counter()
+    deadline = start + budget_ms / 1000
+    result = {"confidence": 0.0, "sentences": [], "semantic": False, "encoded": 0, "ms": 0.0}
+
+    if not answer or answer.strip().lower() == NOT_FOUND_ANSWER or not chunks:
+        return result
+
+    sentences = answer_sentences(answer)
+    if not sentences:
+        return result
+
+    # 1️⃣ Lexical overlap (precomputed chunk term sets)
+    term_sets = term_sets or {}
+    chunk_terms = [
+        term_sets.get(c.get("id")) or frozenset(tokenize(c.get("text", "")))
+        for c in chunks
+    ]
+    lexical = lexical_overlap([set(tokenize(s)) for s in sentences], chunk_terms)
+
+    # 2️⃣ Semantic similarity for the sentences the budget allows
+    semantic = None
+    encoded = 0
+    vectors = [c.get("vector") for c in chunks]
+    if encode and any(v is not None for v in vectors):
+        sentence_vectors = encode_within_budget(sentences, encode, deadline)
+        encoded = len(sentence_vectors)
+        if encoded:
+            semantic = semantic_similarity(sentence_vectors, vectors)
+
+    support = lexical.copy()
+    if semantic is not None:
+        weight = GROUNDING_SEMANTIC_WEIGHT
+        support[:encoded] = (1 - weight) * lexical[:encoded] + weight * semantic
+
+    # 3️⃣ Best supporting chunk per sentence
+    best = support.argmax(axis=1)
+    rows = np.arange(len(sentences))
+    best_support = support[rows, best]
+
+    result["sentences"] = [
+        {
+            "text": sentence,
+            "support": round(float(best_support[i]), 3),
+            "lexical": round(float(lexical[i, best[i]]), 3),
+            "semantic": round(float(semantic[i, best[i]]), 3) if i < encoded else None,
+            "chunk": chunks[best[i]].get("id"),
+            "page": chunks[best[i]].get("page")
+        }
+        for i, sentence in enumerate(sentences)
+    ]
+
+    # 🎯 Confidence: mean support, plus the share of supported sentences
+    supported = float(np.mean(best_support >= GROUNDING_SUPPORT_THRESHOLD))
+    confidence = 0.6 * float(best_support.mean()) + 0.4 * supported
+
+    result["confidence"] = round(min(confidence, 1.0), 2)
+    result["semantic"] = semantic is not None
+    result["encoded"] = encoded
+    result["ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
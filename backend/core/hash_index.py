@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+# -------------------------------
+# Packed pHash index
+# -------------------------------
+# 64-bit perceptual hashes live in one uint64 array; a query XORs it
+# against every entry and popcounts the result, so a lookup over
+# thousands of figures is a handful of vectorized NumPy operations.
+INDEX_DIR = "data/hash_index"
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hash_to_int(value) -> int:
+    """
+    imagehash.ImageHash, hex string or int -> int.
+    """
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(str(value), 16)
+
+
+def hamming_distances(hashes: np.ndarray, query: int) -> np.ndarray:
+    """
+    Hamming distance between `query` and every uint64 in `hashes`.
+    """
+    xor = np.bitwise_xor(hashes, np.uint64(query))
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor)
+    return _POPCOUNT[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class HashIndex:
+    """
+    Growable uint64 array of pHashes with one metadata dict per entry.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._hashes = np.zeros(capacity, dtype=np.uint64)
+        self.meta = []
+
+    def __len__(self):
+        return len(self.meta)
+
+    @property
+    def hashes(self) -> np.ndarray:
+        return self._hashes[:len(self.meta)]
+
+    def add(self, value, meta: dict = None):
+        n = len(self.meta)
+        if n == len(self._hashes):
+            grown = np.zeros(max(64, n * 2), dtype=np.uint64)
+            grown[:n] = self._hashes
+            self._hashes = grown
+
+        self._hashes[n] = np.uint64(hash_to_int(value))
+        self.meta.append(meta or {})
+
+    def nearest(self, value, max_distance: int):
+        """
+        (position, distance) of the closest entry within max_distance,
+        or None.
+        """
+        if not self.meta:
+            return None
+
+        distances = hamming_distances(self.hashes, hash_to_int(value))
+        best = int(np.argmin(distances))
+        if distances[best] > max_distance:
+            return None
+        return best, int(distances[best])
+
+    def search(self, value, max_distance: int) -> list:
+        """
+        [(meta, distance), ...] for every entry within max_distance,
+        closest first.
+        """
+        if not self.meta:
+            return []
+
+        distances = hamming_distances(self.hashes, hash_to_int(value))
+        hits = np.flatnonzero(distances <= max_distance)
+        hits = hits[np.argsort(distances[hits], kind="stable")]
+        return [(self.meta[i], int(distances[i])) for i in hits]
+
+    # ---- persistence ----
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            hashes=self.hashes,
+            meta=np.array(json.dumps(self.meta))
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            index = cls(capacity=max(64, len(data["hashes"])))
+            n = len(data["hashes"])
+            index._hashes[:n] = data["hashes"]
+            index.meta = json.loads(str(data["meta"]))
+        return index
+
+    @classmethod
+    def from_hashes(cls, image_hashes: dict, **extra):
+        """
+        Build from {hash_hex: meta} (the registry / tracker format).
+        """
+        index = cls(capacity=max(64, len(image_hashes)))
+        for h, meta in image_hashes.items():
+            index.add(h, {**meta, **extra, "hash": h})
+        return index
+
+
+# -------------------------------
+# Per-document indexes
+# -------------------------------
+_loaded = {}        # doc_id -> HashIndex
+_lock = threading.Lock()
+
+
+def _index_path(doc_id: str) -> str:
+    return os.path.join(INDEX_DIR, f"{doc_id}.npz")
+
+
+def save_document_index(doc_id: str, image_hashes: dict) -> HashIndex:
+    index = HashIndex.from_hashes(image_hashes, doc_id=doc_id)
+    index.save(_index_path(doc_id))
+    with _lock:
+        _loaded[doc_id] = index
+    return index
+
+
+def drop_document_index(doc_id: str):
+    with _lock:
+        _loaded.pop(doc_id, None)
+    path = _index_path(doc_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def document_index(doc_id: str, image_hashes: dict = None) -> HashIndex:
+    """
+    In-memory index of one document, loaded from disk on first use (or
+    built from `image_hashes` when no index file exists yet).
+    """
+    with _lock:
+        index = _loaded.get(doc_id)
+    if index is not None:
+        return index
+
+    path = _index_path(doc_id)
+    if os.path.exists(path):
+        index = HashIndex.load(path)
+        with _lock:
+            _loaded[doc_id] = index
+        return index
+
+    return save_document_index(doc_id, image_hashes or {})
+
+
+def match_image(value, documents: list, max_distance: int):
+    """
+    Closest image within max_distance across the given registry entries.
+    Returns (meta, distance) or (None, None).
+    """
+    best = (None, None)
+    for document in documents:
+        index = document_index(document["doc_id"], document.get("image_hashes"))
+        found = index.nearest(value, max_distance)
+        if found and (best[1] is None or found[1] < best[1]):
+            best = (index.meta[found[0]], found[1])
+    return best
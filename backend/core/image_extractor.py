@@ -1,104 +1,270 @@
-import fitz  # PyMuPDF
 import os
 from PIL import Image
-import imagehash
 from io import BytesIO
-import math
 
-# -------------------------------
-# Global trackers
-# -------------------------------
-SEEN_IMAGE_HASHES = {}     # hash -> count
-PAGE_IMAGE_COUNT = {}     # page -> count
-PDF_IMAGE_HASHES = {}     # hash -> metadata
+import numpy as np
+
+from core.hash_index import HashIndex
+from core.metrics import span
+
+# ---- Tunable thresholds ----
+HASH_DISTANCE_THRESHOLD = 5      # similarity threshold
+MIN_ENTROPY = 4.0                # logos usually < 3
+MAX_IMAGES_PER_PAGE = 3          # avoid noisy pages
+MIN_IMAGE_SIDE = 48              # px; icons, bullets, rules
+MIN_IMAGE_BYTES = 1024           # encoded stream size
+THUMBNAIL_SIZE = 128             # px; entropy + pHash work on this
+IMAGE_OUTPUT_DIR = "data/images"
 
 
 # -------------------------------
 # Utility: image entropy
 # -------------------------------
 def image_entropy(img: Image.Image) -> float:
-    histogram = img.histogram()
-    total = sum(histogram)
-    entropy = 0.0
+    histogram = np.asarray(img.histogram(), dtype=np.float64)
+    p = histogram[histogram > 0] / histogram.sum()
+    return float(-(p * np.log2(p)).sum())
+
+
+# -------------------------------
+# Utility: NumPy pHash
+# -------------------------------
+PHASH_SIZE = 8
+PHASH_HIGHFREQ = 4
+
+
+def _dct_rows(n: int, k: int) -> np.ndarray:
+    # First k rows of the (unnormalized) DCT-II matrix used by scipy's dct
+    x = np.arange(n)
+    return 2 * np.cos(np.pi * np.arange(k)[:, None] * (2 * x[None, :] + 1) / (2 * n))
 
-    for count in histogram:
-        if count == 0:
-            continue
-        p = count / total
-        entropy -= p * math.log2(p)
 
-    return entropy
+_DCT = _dct_rows(PHASH_SIZE * PHASH_HIGHFREQ, PHASH_SIZE)
+
+
+def image_phash(img: Image.Image) -> int:
+    """
+    64-bit perceptual hash, bit-for-bit the same as imagehash.phash
+    (as an int; f"{h:016x}" gives its hex form).
+    """
+    n = PHASH_SIZE * PHASH_HIGHFREQ
+    with span("image_hash"):
+        pixels = np.asarray(
+            img.convert("L").resize((n, n), Image.Resampling.LANCZOS),
+            dtype=np.float64
+        )
+        low = _DCT @ pixels @ _DCT.T
+        bits = (low > np.median(low)).flatten()
+        return int(np.packbits(bits).view(">u8")[0])
+
+
+def thumbnail(image_bytes: bytes) -> Image.Image:
+    """
+    Decode straight to a small RGB thumbnail. JPEGs are DCT-downscaled
+    while decoding, so large photos are never fully decompressed.
+    """
+    img = Image.open(BytesIO(image_bytes))
+    img.draft("RGB", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    img = img.convert("RGB")
+    img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    return img
+
+
+def stream_size(doc, xref: int):
+    """
+    Encoded size of an image stream from its /Length key, following an
+    indirect reference ("N 0 R"). Falls back to the raw stream's length;
+    None if the size cannot be determined.
+    """
+    kind, value = doc.xref_get_key(xref, "Length")
+    if kind == "int":
+        return int(value)
+    if kind == "xref":
+        try:
+            return int(doc.xref_object(int(value.split()[0])).strip())
+        except (ValueError, IndexError, RuntimeError):
+            pass
+    try:
+        return len(doc.xref_stream_raw(xref) or b"")
+    except RuntimeError:
+        return None
 
 
 # -------------------------------
-# Main extractor
+# Per-document trackers
 # -------------------------------
-def extract_images_from_pdf(pdf_path: str):
-    global PDF_IMAGE_HASHES, SEEN_IMAGE_HASHES, PAGE_IMAGE_COUNT
+class ImageTracker:
+    """
+    Dedup state for one PDF. A fresh tracker per ingest keeps
+    concurrent uploads from seeing each other's hashes.
+    """
 
-    PDF_IMAGE_HASHES.clear()
-    SEEN_IMAGE_HASHES.clear()
-    PAGE_IMAGE_COUNT.clear()
+    def __init__(self):
+        self.seen = HashIndex()   # kept hashes, meta {"count"}
+        self.page_counts = {}     # page -> count
+        self.pdf_hashes = {}      # hash str -> metadata
+        self.seen_xrefs = set()   # image objects already considered
+        self.stats = {"candidates": 0, "rejected_cheap": 0, "decoded": 0}
 
-    images = []
-    doc = fitz.open(pdf_path)
+    def keep_existing(self, page_index: int, entries: dict) -> list:
+        """
+        Register images kept by a previous ingest of an unchanged page
+        ({hash: {"page", "path"}}) as if they had just been saved, so
+        later pages dedup against them. Returns their paths.
+        """
+        paths = []
+        for img_hash, meta in entries.items():
+            self.seen.add(img_hash, {"count": 1})
+            self.pdf_hashes[img_hash] = dict(meta)
+            paths.append(meta["path"])
+        self.page_counts[page_index] = len(paths)
+        return paths
 
-    output_dir = "data/images"
-    os.makedirs(output_dir, exist_ok=True)
 
-    # ---- Tunable thresholds ----
-    HASH_DISTANCE_THRESHOLD = 5      # similarity threshold
-    MIN_ENTROPY = 4.0                # logos usually < 3
-    MAX_IMAGES_PER_PAGE = 3          # avoid noisy pages
+# -------------------------------
+# Per-page filter
+# -------------------------------
+def page_image_candidates(doc, page_index: int, image_list, seen_xrefs: set, stats: dict):
+    """
+    Lazily yield the images of one page that survive the per-image
+    filters: {"img_index", "xref", "ext", "bytes", "hash"}.
 
-    for page_index in range(len(doc)):
-        page = doc[page_index]
-        image_list = page.get_images(full=True)
-        PAGE_IMAGE_COUNT[page_index] = 0
+    Cheap checks run first, from metadata alone: an xref already seen on
+    an earlier page, pixel dimensions and encoded size. Only survivors
+    are extracted and decoded, and then only to a small thumbnail.
+    """
+    for img_index, img in enumerate(image_list):
+        xref, width, height = img[0], img[2], img[3]
+        stats["candidates"] += 1
 
-        for img_index, img in enumerate(image_list):
-            if PAGE_IMAGE_COUNT[page_index] >= MAX_IMAGES_PER_PAGE:
-                break
+        # ⚡ Metadata-only rejects (no extraction, no decoding)
+        if xref in seen_xrefs:
+            stats["rejected_cheap"] += 1
+            continue
+        seen_xrefs.add(xref)
+
+        if min(width, height) < MIN_IMAGE_SIDE:
+            stats["rejected_cheap"] += 1
+            continue
+        size = stream_size(doc, xref)
+        if size is not None and size < MIN_IMAGE_BYTES:
+            stats["rejected_cheap"] += 1
+            continue
 
-            xref = img[0]
-            base_image = doc.extract_image(xref)
-            image_bytes = base_image["image"]
-            image_ext = base_image["ext"]
+        base_image = doc.extract_image(xref)
+        image_bytes = base_image["image"]
 
-            pil_img = Image.open(BytesIO(image_bytes)).convert("RGB")
+        thumb = thumbnail(image_bytes)
+        stats["decoded"] += 1
 
-            # 🧠 Skip low-entropy images (logos, watermarks)
-            entropy = image_entropy(pil_img)
-            if entropy < MIN_ENTROPY:
-                continue
+        # 🧠 Skip low-entropy images (logos, watermarks)
+        if image_entropy(thumb) < MIN_ENTROPY:
+            continue
 
-            img_hash = imagehash.phash(pil_img)
+        yield {
+            "img_index": img_index,
+            "xref": xref,
+            "ext": base_image["ext"],
+            "bytes": image_bytes,
+            "hash": image_phash(thumb)
+        }
 
-            # 🔁 Duplicate detection
-            is_duplicate = False
-            for seen_hash in SEEN_IMAGE_HASHES:
-                if abs(img_hash - seen_hash) <= HASH_DISTANCE_THRESHOLD:
-                    SEEN_IMAGE_HASHES[seen_hash] += 1
-                    is_duplicate = True
-                    break
 
-            if is_duplicate:
-                continue
+def keep_page_images(page_index: int, candidates, tracker: ImageTracker,
+                     output_dir: str = IMAGE_OUTPUT_DIR):
+    """
+    Dedup one page's candidates against everything kept so far (in page
+    order), save the new ones and stop at MAX_IMAGES_PER_PAGE.
 
-            # ✅ Save image
-            image_path = f"{output_dir}/page{page_index+1}_{img_index}.{image_ext}"
+    A candidate carries either its "bytes", or the "path" of a file a
+    worker process already wrote (stage_page_images), which is moved
+    into place instead of being rewritten.
+    """
+    images = []
+    tracker.page_counts[page_index] = 0
+
+    for candidate in candidates:
+        img_hash = candidate["hash"]
+
+        # 🔁 Duplicate detection (vectorized Hamming search)
+        duplicate = tracker.seen.nearest(img_hash, HASH_DISTANCE_THRESHOLD)
+        if duplicate:
+            tracker.seen.meta[duplicate[0]]["count"] += 1
+            continue
+
+        # ✅ Save image
+        image_path = f"{output_dir}/page{page_index+1}_{candidate['img_index']}.{candidate['ext']}"
+        if "path" in candidate:
+            os.replace(candidate["path"], image_path)
+        else:
             with open(image_path, "wb") as f:
-                f.write(image_bytes)
+                f.write(candidate["bytes"])
+
+        images.append(image_path)
 
-            images.append(image_path)
+        # 🔑 Track hashes
+        tracker.seen.add(img_hash, {"count": 1})
+        tracker.page_counts[page_index] += 1
 
-            # 🔑 Track hashes
-            SEEN_IMAGE_HASHES[img_hash] = 1
-            PAGE_IMAGE_COUNT[page_index] += 1
+        tracker.pdf_hashes[f"{img_hash:016x}"] = {
+            "page": page_index + 1,
+            "path": image_path
+        }
 
-            PDF_IMAGE_HASHES[str(img_hash)] = {
-                "page": page_index + 1,
-                "path": image_path
-            }
+        if tracker.page_counts[page_index] >= MAX_IMAGES_PER_PAGE:
+            break
 
     return images
+
+
+def stage_page_images(doc, page_index: int, image_list, seen: HashIndex, seen_xrefs: set,
+                      stats: dict, stage_dir: str, earlier_xrefs=()) -> list:
+    """
+    Worker-process side of keep_page_images: candidates that are new
+    within this process (`seen`) are written to `stage_dir`, up to
+    MAX_IMAGES_PER_PAGE per page. Returns [{"img_index", "ext", "hash",
+    "path"}], so no image bytes travel back to the parent.
+
+    Candidates are produced lazily, so nothing past the cap is decoded.
+    Images whose xref also appears on a page of an earlier shard
+    (`earlier_xrefs`) may be dropped by the parent as duplicates, so
+    they are staged without counting towards the cap.
+    """
+    staged = []
+    counted = 0
+    for candidate in page_image_candidates(doc, page_index, image_list, seen_xrefs, stats):
+        if seen.nearest(candidate["hash"], HASH_DISTANCE_THRESHOLD):
+            continue
+        seen.add(candidate["hash"])
+
+        path = os.path.join(
+            stage_dir, f"page{page_index+1}_{candidate['img_index']}.{candidate['ext']}"
+        )
+        with open(path, "wb") as f:
+            f.write(candidate["bytes"])
+
+        staged.append({
+            "img_index": candidate["img_index"],
+            "ext": candidate["ext"],
+            "hash": candidate["hash"],
+            "path": path
+        })
+        if candidate["xref"] not in earlier_xrefs:
+            counted += 1
+            if counted >= MAX_IMAGES_PER_PAGE:
+                break
+
+    return staged
+
+
+def filter_page_images(doc, page_index: int, image_list, tracker: ImageTracker,
+                       output_dir: str = IMAGE_OUTPUT_DIR):
+    """
+    Filter the image candidates of one page and save the ones worth keeping.
+    `image_list` is the output of page.get_images(full=True). Candidates
+    are produced lazily, so nothing past the per-page cap is decoded.
+    """
+    candidates = page_image_candidates(
+        doc, page_index, image_list, tracker.seen_xrefs, tracker.stats
+    )
+    return keep_page_images(page_index, candidates, tracker, output_dir)
@@ -1,11 +1,133 @@
-from transformers import BlipProcessor, BlipForConditionalGeneration
+import json
+import os
+import threading
+
 from PIL import Image
 
-processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-large")
-model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-large")
+from app.config import CAPTION_BATCH_SIZE, CAPTION_MAX_TOKENS
+from core.model_registry import get_model, CAPTIONER, CAPTION_MODEL_NAME
+
+# -------------------------------
+# Caption cache
+# -------------------------------
+# (caption model, image pHash) -> caption, so a figure seen in any
+# earlier upload is never run through BLIP again.
+CAPTION_CACHE_PATH = "data/cache/captions.json"
+CAPTION_INPUT_SIZE = 768           # longest side fed to the processor
+
+
+class CaptionCache:
+    def __init__(self, path: str = CAPTION_CACHE_PATH):
+        self.path = path
+        self._captions = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _load(self):
+        if self._captions is None:
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._captions = json.load(f)
+            else:
+                self._captions = {}
+        return self._captions
+
+    @staticmethod
+    def key(image_hash: str) -> str:
+        return f"{CAPTION_MODEL_NAME}:{image_hash}"
+
+    def get(self, image_hash: str):
+        with self._lock:
+            caption = self._load().get(self.key(image_hash))
+            self.stats["hits" if caption is not None else "misses"] += 1
+            return caption
+
+    def put_many(self, captions: dict):
+        with self._lock:
+            entries = self._load()
+            entries.update({self.key(h): c for h, c in captions.items()})
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+
+    def report(self) -> dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._load())}
+
+
+caption_cache = CaptionCache()
+
+
+# -------------------------------
+# BLIP captioning
+# -------------------------------
+def load_image(image_path: str) -> Image.Image:
+    """
+    RGB image no larger than the captioner needs; JPEGs are downscaled
+    while decoding.
+    """
+    image = Image.open(image_path)
+    image.draft("RGB", (CAPTION_INPUT_SIZE, CAPTION_INPUT_SIZE))
+    image = image.convert("RGB")
+    image.thumbnail((CAPTION_INPUT_SIZE, CAPTION_INPUT_SIZE))
+    return image
+
+
+def generate_captions(images: list, max_new_tokens: int = CAPTION_MAX_TOKENS) -> list:
+    """
+    One batched BLIP forward pass over PIL images.
+    """
+    import torch
+
+    processor, model = get_model(CAPTIONER)
+    inputs = processor(images=images, return_tensors="pt")
+    with torch.inference_mode():
+        out = model.generate(**inputs, max_new_tokens=max_new_tokens)
+    return [processor.decode(o, skip_special_tokens=True).strip() for o in out]
+
 
 def describe_image(image_path):
-    image = Image.open(image_path).convert("RGB")
-    inputs = processor(image, return_tensors="pt")
-    out = model.generate(**inputs, max_new_tokens=150)
-    return processor.decode(out[0], skip_special_tokens=True)
+    return generate_captions([load_image(image_path)], max_new_tokens=150)[0]
+
+
+def caption_images(items, stats: dict = None, batch_size: int = CAPTION_BATCH_SIZE,
+                   cache: CaptionCache = caption_cache) -> dict:
+    """
+    Captions for [(image_hash, path), ...] as {image_hash: caption}.
+    Cached captions are reused; the rest go through BLIP `batch_size`
+    images at a time, so at most one batch of decoded images is held.
+    `stats` receives images / cached / generated counts.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("images", 0)
+    stats.setdefault("cached", 0)
+    stats.setdefault("generated", 0)
+
+    captions = {}
+    todo = []
+    for image_hash, path in items:
+        stats["images"] += 1
+        caption = cache.get(image_hash)
+        if caption is not None:
+            captions[image_hash] = caption
+            stats["cached"] += 1
+        else:
+            todo.append((image_hash, path))
+
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        images = [load_image(path) for _, path in batch]
+        try:
+            texts = generate_captions(images)
+        finally:
+            for image in images:
+                image.close()
+
+        fresh = {image_hash: text for (image_hash, _), text in zip(batch, texts) if text}
+        cache.put_many(fresh)
+        captions.update(fresh)
+        stats["generated"] += len(fresh)
+
+    return captions
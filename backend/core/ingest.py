@@ -0,0 +1,395 @@
+import hashlib
+import os
+
+import fitz
+import numpy as np
+
+from app.config import EMBED_INSERT_BATCH, INGEST_PROCESSES, PARALLEL_MIN_PAGES
+from core import chunking
+from core.pdf_loader import iter_pages
+from core.ingest_cache import EntryWriter, iter_chunks, restore_images
+from core.parallel_ingest import parallel_pages
+from core.metrics import span, StageTimer
+from core.image_extractor import (
+    filter_page_images,
+    keep_page_images,
+    ImageTracker,
+    IMAGE_OUTPUT_DIR,
+)
+
+
+def _no_progress(**_):
+    pass
+
+
+CHUNK_FIELDS = ("page", "page_end", "char_start", "char_end", "tokens", "kind", "image")
+
+
+def chunk_metadata(doc_id: str, chunk: dict) -> dict:
+    meta = {"doc_id": doc_id}
+    for field in CHUNK_FIELDS:
+        if chunk.get(field) is not None:
+            meta[field] = chunk[field]
+    return meta
+
+
+def chunk_id(doc_id: str, page, text: str) -> str:
+    """
+    Deterministic vector id: same document, page and text → same id.
+    """
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+    return f"{doc_id}:{page}:{digest}"
+
+
+def caption_chunk(meta: dict, caption: str, count_tokens) -> dict:
+    """
+    A figure caption as a chunk on the figure's page; "image" names the
+    saved file, so answers can point back at it.
+    """
+    text = f"Figure on page {meta['page']}: {caption}"
+    return {
+        "page": meta["page"],
+        "page_end": meta["page"],
+        "tokens": count_tokens([text])[0],
+        "kind": "caption",
+        "image": os.path.basename(meta["path"]),
+        "text": text
+    }
+
+
+class ChunkIds:
+    """
+    Assigns chunk_id()s for one document; a repeated (page, text) pair
+    gets a "-n" suffix so ids stay unique.
+    """
+
+    def __init__(self, doc_id: str):
+        self.doc_id = doc_id
+        self.seen = {}
+
+    def assign(self, chunk: dict) -> str:
+        base = chunk_id(self.doc_id, chunk["page"], chunk["text"])
+        n = self.seen.get(base, 0)
+        self.seen[base] = n + 1
+        chunk["id"] = base if n == 0 else f"{base}-{n}"
+        return chunk["id"]
+
+
+def add_batch(collection, doc_id: str, batch: list, embeddings):
+    """
+    Insert one batch of chunks (with their "id") into the vector store;
+    stores that need Python floats (Chroma) convert one batch at a time,
+    so that copy never spans the document.
+    """
+    collection.add(
+        documents=[c["text"] for c in batch],
+        embeddings=np.asarray(embeddings, dtype=np.float32),
+        metadatas=[chunk_metadata(doc_id, c) for c in batch],
+        ids=[c["id"] for c in batch]
+    )
+
+
+def remove_files(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def ingest_pdf(path: str, doc_id: str, collection, encode,
+               output_dir: str = IMAGE_OUTPUT_DIR, progress=None,
+               insert_batch: int = EMBED_INSERT_BATCH,
+               processes: int = INGEST_PROCESSES, chunker=None,
+               previous: dict = None, captioner=None, lexical=None):
+    """
+    Single-pass ingestion: open the PDF once and walk its pages, feeding
+    chunking and image filtering from the same page objects. Chunks are
+    embedded and inserted into Chroma `insert_batch` at a time while the
+    walk continues; chunk records, vectors and BM25 postings are streamed
+    to disk as they are produced, so memory stays flat however large the
+    document is.
+
+    With processes > 1 (and at least PARALLEL_MIN_PAGES pages), text and
+    image candidates are extracted by worker processes on page ranges;
+    results are merged in page order, so chunk order and image dedup are
+    the same as in the single-process walk.
+
+    `progress(**counters)` is called with pages_parsed, images_kept and
+    chunks_embedded as they advance.
+
+    `encode(texts)` returns the embedding matrix. Every vector is tagged
+    with `doc_id` in its Chroma metadata.
+
+    `chunker` (chunking.Chunker) should count tokens like the embedding
+    model; chunks may span pages and carry page/page_end and character
+    offsets.
+
+    `previous` = {"page_hashes": [...], "image_hashes": {...},
+    "chunk_ids": set} describes the version of `doc_id` already in the
+    store. Only chunks whose deterministic id is new get embedded and
+    inserted; ids that disappeared are deleted, and images of pages whose
+    fingerprint is unchanged are kept as they are.
+
+    `captioner([(image_hash, path), ...], stats) -> {image_hash: caption}`
+    (image_understanding.caption_images) turns the kept images into
+    caption chunks after the page walk. Caption ids depend only on page
+    and caption text, so an unchanged figure keeps its vector.
+
+    `lexical` (LexicalIndex.writer) receives every chunk; the caller
+    commits it.
+
+    Returns {"chunk_count": int, "artifacts": directory (ingest_cache
+             EntryWriter layout: chunks, embeddings, manifest),
+             "images": [...], "image_hashes": {...}, "image_stats": {...},
+             "caption_stats": {...}, "pages": int, "page_hashes": [...],
+             "diff": {...}, "timings": {...}}
+    """
+    progress = progress or _no_progress
+    chunker = chunker or chunking.Chunker()
+    chunks = chunker.stream()
+    ids = ChunkIds(doc_id)
+    timer = StageTimer()
+    writer = EntryWriter()
+    pending = []           # (row, chunk) to embed
+    kept = []              # (row, chunk id) whose vector is already stored
+    kept_ids = set()
+    counts = {"chunks": 0, "embedded": 0}
+    images = []
+    page_hashes = []
+    pages = 0
+
+    previous = previous or {}
+    old_hashes = previous.get("page_hashes") or []
+    old_ids = set(previous.get("chunk_ids") or ())
+    old_images = {}        # page -> {hash: meta}
+    for img_hash, meta in (previous.get("image_hashes") or {}).items():
+        old_images.setdefault(meta["page"], {})[img_hash] = meta
+    diff = {"chunks_added": 0, "chunks_kept": 0, "chunks_deleted": 0, "pages_changed": 0}
+    caption_stats = {}
+
+    os.makedirs(output_dir, exist_ok=True)
+    tracker = ImageTracker()
+
+    def flush():
+        if not pending:
+            return
+        batch = [c for _, c in pending]
+        with timer.stage("embed"):
+            batch_embeddings = encode([c["text"] for c in batch])
+        with timer.stage("vector_add"):
+            add_batch(collection, doc_id, batch, batch_embeddings)
+        writer.write_vectors([row for row, _ in pending], batch_embeddings)
+
+        counts["embedded"] += len(pending)
+        pending.clear()
+        progress(chunks_embedded=counts["embedded"])
+
+    def flush_kept():
+        # Vectors of unchanged chunks, copied from the store into the
+        # artifacts so they cover the whole document
+        if not kept:
+            return
+        with timer.stage("vector_fetch"):
+            stored = collection.get(ids=[i for _, i in kept], include=["embeddings"])
+            vectors = dict(zip(stored["ids"], stored["embeddings"]))
+            found = [(row, vectors[i]) for row, i in kept if i in vectors]
+            writer.write_vectors([row for row, _ in found], [v for _, v in found])
+        kept.clear()
+
+    def take(chunk):
+        chunk["doc_id"] = doc_id
+        row = writer.add_chunk(chunk)
+        counts["chunks"] += 1
+        chunk_id = ids.assign(chunk)
+        if lexical is not None:
+            lexical.add([chunk])
+        if chunk_id in old_ids:
+            diff["chunks_kept"] += 1
+            kept.append((row, chunk_id))
+            kept_ids.add(chunk_id)
+            if len(kept) >= insert_batch:
+                flush_kept()
+        else:
+            pending.append((row, chunk))
+
+    try:
+        with timer.stage("total"):
+            with timer.stage("open"), span("pdf_parse"):
+                doc = fitz.open(path)
+
+            with doc:
+                parallel = processes > 1 and len(doc) >= PARALLEL_MIN_PAGES
+                if parallel:
+                    walker = parallel_pages(
+                        path, len(doc), processes, tracker.stats, output_dir=output_dir
+                    )
+                else:
+                    walker = iter_pages(doc)
+
+                while True:
+                    with timer.stage("text_extract"), span("pdf_parse"):
+                        page = next(walker, None)
+                    if page is None:
+                        break
+                    pages += 1
+                    page_no = page["page"]
+                    page_hashes.append(page["fingerprint"])
+                    unchanged = (
+                        page_no <= len(old_hashes)
+                        and old_hashes[page_no - 1] == page["fingerprint"]
+                    )
+
+                    with timer.stage("chunk"):
+                        for chunk in chunks.feed(page):
+                            take(chunk)
+
+                    with timer.stage("image_filter"):
+                        if unchanged:
+                            kept_images = tracker.keep_existing(
+                                page_no - 1, old_images.get(page_no, {})
+                            )
+                        else:
+                            diff["pages_changed"] += 1
+                            remove_files(m["path"] for m in old_images.get(page_no, {}).values())
+                            if parallel:
+                                kept_images = keep_page_images(
+                                    page_no - 1, page["candidates"], tracker, output_dir
+                                )
+                            else:
+                                kept_images = filter_page_images(
+                                    doc, page_no - 1, page["images"], tracker, output_dir
+                                )
+                        images.extend(kept_images)
+
+                    progress(pages_parsed=pages, images_kept=len(images))
+
+                    if len(pending) >= insert_batch:
+                        flush()
+
+            with timer.stage("chunk"):
+                for chunk in chunks.close():
+                    take(chunk)
+
+            # 🖼️ Figures → searchable caption chunks
+            if captioner and tracker.pdf_hashes:
+                with timer.stage("caption"):
+                    try:
+                        captions = captioner(
+                            [(h, m["path"]) for h, m in tracker.pdf_hashes.items()],
+                            caption_stats
+                        )
+                    except Exception as e:
+                        print(f"⚠️ Image captioning skipped: {e}")
+                        captions = {}
+                for img_hash, meta in sorted(tracker.pdf_hashes.items(), key=lambda x: x[1]["page"]):
+                    if captions.get(img_hash):
+                        take(caption_chunk(meta, captions[img_hash], chunker.count_tokens))
+            flush()
+            flush_kept()
+
+            # 🧹 Drop what the new version no longer has
+            with timer.stage("vector_delete"):
+                stale = old_ids - kept_ids
+                if stale:
+                    collection.delete(ids=sorted(stale))
+                for page_no, entries in old_images.items():
+                    if page_no > pages:
+                        remove_files(m["path"] for m in entries.values())
+
+            artifacts = writer.finish(pages, page_hashes, images, tracker.pdf_hashes)
+    except Exception:
+        writer.discard()
+        raise
+
+    diff["chunks_added"] = counts["chunks"] - diff["chunks_kept"]
+    diff["chunks_deleted"] = len(stale)
+
+    timings = timer.report()
+    timings["processes"] = processes if parallel else 1
+    if counts["embedded"] and timer.timings.get("embed"):
+        timings["embed_chunks_per_sec"] = round(counts["embedded"] / timer.timings["embed"], 1)
+    if caption_stats.get("generated") and timer.timings.get("caption"):
+        timings["caption_images_per_sec"] = round(
+            caption_stats["generated"] / timer.timings["caption"], 2
+        )
+
+    return {
+        "chunk_count": counts["chunks"],
+        "artifacts": artifacts,
+        "images": images,
+        "image_hashes": tracker.pdf_hashes,
+        "image_stats": tracker.stats,
+        "caption_stats": caption_stats,
+        "pages": pages,
+        "page_hashes": page_hashes,
+        "diff": diff,
+        "timings": timings
+    }
+
+
+def restore_from_cache(entry: dict, doc_id: str, collection,
+                       output_dir: str = IMAGE_OUTPUT_DIR, progress=None,
+                       insert_batch: int = EMBED_INSERT_BATCH, lexical=None):
+    """
+    Re-create a document from an ingest cache entry: cached chunks and
+    embeddings go straight into Chroma (and `lexical`) `insert_batch` at
+    a time and cached images are copied, so nothing is parsed or
+    embedded.
+
+    Returns the same shape as ingest_pdf; "artifacts" is the entry itself.
+    """
+    progress = progress or _no_progress
+    timer = StageTimer()
+
+    def insert(batch, start):
+        add_batch(collection, doc_id, batch, entry["embeddings"][start:start + len(batch)])
+        if lexical is not None:
+            lexical.add(batch)
+
+    with timer.stage("total"):
+        ids = ChunkIds(doc_id)
+
+        with timer.stage("image_restore"):
+            images, image_hashes = restore_images(entry, output_dir)
+
+        with timer.stage("vector_add"):
+            batch, start = [], 0
+            for chunk in iter_chunks(entry["dir"]):
+                chunk["doc_id"] = doc_id
+                ids.assign(chunk)
+                batch.append(chunk)
+                if len(batch) >= insert_batch:
+                    insert(batch, start)
+                    start += len(batch)
+                    batch = []
+            if batch:
+                insert(batch, start)
+
+        progress(
+            pages_parsed=entry["pages"],
+            images_kept=len(images),
+            chunks_embedded=entry["chunks"]
+        )
+
+    return {
+        "chunk_count": entry["chunks"],
+        "artifacts": entry["dir"],
+        "images": images,
+        "image_hashes": image_hashes,
+        "pages": entry["pages"],
+        "page_hashes": entry.get("page_hashes"),
+        "timings": timer.report()
+    }
+
+
+def artifact_chunks(directory: str, doc_id: str) -> list:
+    """
+    All chunks of an ingest result or cache entry with "doc_id" and
+    "id", in document order (for responses that list them).
+    """
+    ids = ChunkIds(doc_id)
+    chunks = []
+    for chunk in iter_chunks(directory):
+        chunk["doc_id"] = doc_id
+        ids.assign(chunk)
+        chunks.append(chunk)
+    return chunks
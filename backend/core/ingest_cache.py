@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+from app.config import INGEST_CACHE_MAX_ENTRIES
+
+# -------------------------------
+# Content-addressed ingest cache
+# -------------------------------
+# data/cache/ingest/<sha256>/
+#     manifest.json   pages, page fingerprints, chunk count, vector
+#                     dimension, image hashes, image file names
+#     chunks.jsonl    one chunk per line, in document order
+#     embeddings.f32  float32 [n_chunks, dim], row i = chunk i
+#     images/         extracted image files
+# Ingest streams chunks and vectors into a staging directory batch by
+# batch (EntryWriter), which is then published as the entry, so no
+# document-sized list or matrix is ever held in memory.
+# The manifest's mtime is bumped on every hit; beyond
+# INGEST_CACHE_MAX_ENTRIES the least recently used entries are evicted.
+CACHE_DIR = "data/cache/ingest"
+STAGING_DIR = os.path.join(CACHE_DIR, ".staging")
+
+CHUNKS_FILE = "chunks.jsonl"
+VECTORS_FILE = "embeddings.f32"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _entry_dir(pdf_hash: str) -> str:
+    return os.path.join(CACHE_DIR, pdf_hash)
+
+
+def drop_entry(pdf_hash: str):
+    shutil.rmtree(_entry_dir(pdf_hash), ignore_errors=True)
+
+
+def evict(max_entries: int = INGEST_CACHE_MAX_ENTRIES, keep: str = None):
+    """
+    Remove the least recently used entries beyond `max_entries`.
+    """
+    if not os.path.isdir(CACHE_DIR):
+        return
+
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        manifest_path = os.path.join(CACHE_DIR, name, "manifest.json")
+        if name != keep and not name.startswith(".") and os.path.exists(manifest_path):
+            entries.append((os.path.getmtime(manifest_path), name))
+
+    entries.sort()
+    excess = len(entries) + (1 if keep else 0) - max_entries
+    for _, name in entries[:max(excess, 0)]:
+        print(f"🧹 Evicting ingest cache entry {name[:12]}")
+        drop_entry(name)
+
+
+class EntryWriter:
+    """
+    Writes one document's chunks and vectors to a staging directory as
+    ingest produces them. A chunk gets its row when it is added (document
+    order); its vector can be written later, e.g. once its batch is
+    embedded or, for a kept chunk, fetched back from the vector store.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.path.join(STAGING_DIR, uuid.uuid4().hex)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory)
+
+        self.rows = 0
+        self.dim = None
+        self._chunks = open(os.path.join(self.directory, CHUNKS_FILE), "w", encoding="utf-8")
+        self._vectors = None
+
+    def add_chunk(self, chunk: dict) -> int:
+        record = {k: v for k, v in chunk.items() if k not in ("doc_id", "id")}
+        self._chunks.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.rows += 1
+        return self.rows - 1
+
+    def write_vectors(self, rows: list, vectors):
+        if not len(rows):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self._vectors is None:
+            self.dim = int(vectors.shape[1])
+            self._vectors = open(os.path.join(self.directory, VECTORS_FILE), "w+b")
+
+        row_bytes = self.dim * 4
+        for row, vector in zip(rows, vectors):
+            self._vectors.seek(row * row_bytes)
+            self._vectors.write(vector.tobytes())
+
+    def _close(self):
+        self._chunks.close()
+        if self._vectors is not None:
+            self._vectors.truncate(self.rows * self.dim * 4)
+            self._vectors.close()
+
+    def finish(self, pages: int, page_hashes: list, images: list, image_hashes: dict) -> str:
+        """
+        Close the files and write the manifest; returns the directory.
+        """
+        self._close()
+        manifest = {
+            "pages": pages,
+            "page_hashes": page_hashes,
+            "chunks": self.rows,
+            "dim": self.dim,
+            "images": [os.path.basename(p) for p in images],
+            "image_hashes": {
+                h: {"page": meta["page"], "file": os.path.basename(meta["path"])}
+                for h, meta in image_hashes.items()
+            }
+        }
+        with open(os.path.join(self.directory, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        return self.directory
+
+    def discard(self):
+        if not self._chunks.closed:
+            self._close()
+        discard(self.directory)
+
+
+def discard(directory: str):
+    """
+    Remove a staging directory that will not be published.
+    """
+    if directory and os.path.abspath(directory).startswith(os.path.abspath(STAGING_DIR)):
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def publish_entry(pdf_hash: str, directory: str, images: list):
+    """
+    Turn a finished EntryWriter directory into the cache entry for
+    `pdf_hash`, together with copies of the extracted image files. An
+    entry already published for `pdf_hash` is never replaced.
+    """
+    os.makedirs(os.path.join(directory, "images"), exist_ok=True)
+    for path in images:
+        shutil.copy2(path, os.path.join(directory, "images", os.path.basename(path)))
+
+    # Publish atomically so readers never see a half-written entry.
+    # Renaming onto an existing entry fails: the same bytes were
+    # published concurrently, so that entry is kept and ours dropped.
+    entry_dir = _entry_dir(pdf_hash)
+    try:
+        os.rename(directory, entry_dir)
+    except OSError:
+        if os.path.isdir(entry_dir) and load_entry(pdf_hash) is not None:
+            discard(directory)
+        else:
+            # Entry of an older layout (never served): replace it
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(directory, entry_dir)
+    evict(keep=pdf_hash)
+
+
+def load_entry(pdf_hash: str):
+    """
+    Returns the cached manifest with "embeddings" (memory-mapped),
+    "dir" and "image_dir" added, or None on a miss.
+    """
+    entry_dir = _entry_dir(pdf_hash)
+    manifest_path = os.path.join(entry_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        entry = json.load(f)
+    if not isinstance(entry.get("chunks"), int) or (entry["chunks"] and not entry.get("dim")):
+        return None                 # older layout, or vectors never written
+    os.utime(manifest_path)
+
+    if entry["chunks"] and entry["dim"]:
+        entry["embeddings"] = np.memmap(
+            os.path.join(entry_dir, VECTORS_FILE), dtype=np.float32, mode="r",
+            shape=(entry["chunks"], entry["dim"])
+        )
+    else:
+        entry["embeddings"] = np.zeros((0, 0), dtype=np.float32)
+    entry["dir"] = entry_dir
+    entry["image_dir"] = os.path.join(entry_dir, "images")
+    return entry
+
+
+def iter_chunks(directory: str):
+    """
+    Chunks of an entry (or staging directory), one at a time, without
+    "doc_id" and "id".
+    """
+    with open(os.path.join(directory, CHUNKS_FILE), "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def restore_images(entry: dict, output_dir: str):
+    """
+    Copy cached image files into a document's image folder.
+    Returns (image_paths, {hash: {"page", "path"}}).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    paths = []
+    for name in entry["images"]:
+        dst = os.path.join(output_dir, name)
+        if not os.path.exists(dst):
+            shutil.copy2(os.path.join(entry["image_dir"], name), dst)
+        paths.append(dst)
+
+    image_hashes = {
+        h: {"page": meta["page"], "path": os.path.join(output_dir, meta["file"])}
+        for h, meta in entry["image_hashes"].items()
+    }
+    return paths, image_hashes
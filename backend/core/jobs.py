@@ -0,0 +1,112 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import INGEST_WORKERS, JOB_TTL, MAX_FINISHED_JOBS
+
+# -------------------------------
+# Worker pool + job registry
+# -------------------------------
+_executor = ThreadPoolExecutor(
+    max_workers=INGEST_WORKERS,
+    thread_name_prefix="ingest"
+)
+_lock = threading.Lock()
+
+JOBS = {}     # job_id -> IngestJob
+
+
+class IngestJob:
+    """
+    Status and progress of one background ingestion.
+    status: queued -> running -> done | failed
+    """
+
+    def __init__(self, filename: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = "queued"
+        self.progress = {
+            "pages_parsed": 0,
+            "chunks_embedded": 0,
+            "images_kept": 0
+        }
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def update(self, **progress):
+        with _lock:
+            self.progress.update(progress)
+
+    def to_dict(self) -> dict:
+        with _lock:
+            return {
+                "job_id": self.id,
+                "filename": self.filename,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at
+            }
+
+
+def _run(job: IngestJob, fn, args):
+    job.status = "running"
+    job.started_at = time.time()
+
+    try:
+        job.result = fn(*args, progress=job.update)
+        job.status = "done"
+    except Exception as e:
+        traceback.print_exc()
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        job.finished_at = time.time()
+
+
+def _evict_finished(now: float = None):
+    """
+    Drop finished jobs older than JOB_TTL, and the oldest ones beyond
+    MAX_FINISHED_JOBS. Caller holds _lock.
+    """
+    now = now or time.time()
+    finished = sorted(
+        (j for j in JOBS.values() if j.finished_at is not None),
+        key=lambda j: j.finished_at
+    )
+    excess = len(finished) - MAX_FINISHED_JOBS
+    for i, job in enumerate(finished):
+        if i < excess or now - job.finished_at > JOB_TTL:
+            del JOBS[job.id]
+
+
+def submit_job(filename: str, fn, *args) -> IngestJob:
+    """
+    Queue `fn(*args, progress=callback)` on the ingest worker pool.
+    """
+    job = IngestJob(filename)
+    with _lock:
+        _evict_finished()
+        JOBS[job.id] = job
+
+    _executor.submit(_run, job, fn, args)
+    return job
+
+
+def get_job(job_id: str):
+    with _lock:
+        _evict_finished()
+        return JOBS.get(job_id)
+
+
+def queue_depth() -> int:
+    return sum(1 for j in list(JOBS.values()) if j.status in ("queued", "running"))
@@ -0,0 +1,244 @@
+import json
+import math
+import os
+import re
+import threading
+import uuid
+from collections import Counter
+
+from app.config import BM25_K1, BM25_B
+
+# -------------------------------
+# BM25 inverted index
+# -------------------------------
+# term -> {chunk_id: term frequency}, kept next to the Chroma collection
+# so exact terms (unit codes, formula names, acronyms) are found even
+# when the dense embedding misses them. Each document is persisted as
+# its own segment (<doc_id>.jsonl, one chunk's term frequencies per
+# line), so adding or replacing a document only touches that document's
+# postings. Ingest writes the segment as chunks arrive (SegmentWriter).
+INDEX_DIR = "data/bm25"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list:
+    """
+    Lowercased terms; joined forms like "cs-101" or "h2o.2" are kept
+    whole and their parts are added as separate terms.
+    """
+    terms = []
+    for term in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(term)
+        if not term.isalnum():
+            terms.extend(t for t in re.split(r"[-_.]", term) if t)
+    return terms
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 over chunks of many documents, with per-document
+    add/remove and search restricted to a set of documents.
+    """
+
+    def __init__(self, directory: str = INDEX_DIR, k1: float = BM25_K1, b: float = BM25_B):
+        self.directory = directory
+        self.k1 = k1
+        self.b = b
+
+        self.postings = {}       # term -> {chunk_id: tf}
+        self.lengths = {}        # chunk_id -> number of terms
+        self.chunk_doc = {}      # chunk_id -> doc_id
+        self.doc_chunks = {}     # doc_id -> [chunk_id, ...]
+        self.doc_terms = {}      # doc_id -> {term, ...}
+        self.chunk_terms = {}    # chunk_id -> frozenset of terms (answer grounding)
+        self.total_length = 0
+
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    # ---- persistence ----
+    def _path(self, doc_id: str) -> str:
+        return os.path.join(self.directory, f"{doc_id}.jsonl")
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".jsonl"):
+                self._insert_segment(name[:-len(".jsonl")], os.path.join(self.directory, name))
+
+    def _insert_segment(self, doc_id: str, path: str):
+        # A document without chunks still counts as indexed
+        self.doc_chunks.setdefault(doc_id, [])
+        self.doc_terms.setdefault(doc_id, set())
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                self._insert(doc_id, {record["id"]: record["terms"]})
+
+    # ---- postings ----
+    def _insert(self, doc_id: str, chunks: dict):
+        """`chunks`: {chunk_id: {term: tf}}"""
+        ids = self.doc_chunks.setdefault(doc_id, [])
+        doc_terms = self.doc_terms.setdefault(doc_id, set())
+        for chunk_id, terms in chunks.items():
+            doc_terms.update(terms)
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[chunk_id] = tf
+            length = sum(terms.values())
+            self.lengths[chunk_id] = length
+            self.chunk_terms[chunk_id] = frozenset(terms)
+            self.chunk_doc[chunk_id] = doc_id
+            self.total_length += length
+            ids.append(chunk_id)
+
+    def _delete(self, doc_id: str):
+        ids = self.doc_chunks.pop(doc_id, [])
+        terms = self.doc_terms.pop(doc_id, set())
+        for chunk_id in ids:
+            self.total_length -= self.lengths.pop(chunk_id, 0)
+            self.chunk_terms.pop(chunk_id, None)
+            self.chunk_doc.pop(chunk_id, None)
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            for chunk_id in ids:
+                postings.pop(chunk_id, None)
+            if not postings:
+                del self.postings[term]
+
+    # ---- public API ----
+    def writer(self, doc_id: str) -> "SegmentWriter":
+        """
+        Streaming (re-)index of one document; see SegmentWriter.
+        """
+        return SegmentWriter(self, doc_id)
+
+    def add_document(self, doc_id: str, chunks):
+        """
+        Index (or re-index) one document. `chunks` are dicts with "id"
+        and "text".
+        """
+        writer = self.writer(doc_id)
+        writer.add(chunks)
+        writer.commit()
+
+    def remove_document(self, doc_id: str):
+        with self._lock:
+            self._load()
+            self._delete(doc_id)
+            path = self._path(doc_id)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def has_document(self, doc_id: str) -> bool:
+        with self._lock:
+            self._load()
+            return doc_id in self.doc_chunks
+
+    def search(self, query: str, k: int = 20, doc_ids=None) -> list:
+        """
+        [(chunk_id, score), ...] best first, optionally limited to
+        chunks of `doc_ids`.
+        """
+        terms = set(tokenize(query))
+        allowed = set(doc_ids) if doc_ids else None
+
+        with self._lock:
+            self._load()
+            n = len(self.lengths)
+            if not n or not terms:
+                return []
+            avg_length = self.total_length / n
+
+            scores = {}
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    if allowed is not None and self.chunk_doc[chunk_id] not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def term_sets(self, chunk_ids) -> dict:
+        """
+        {chunk_id: frozenset of terms} for the indexed ones among
+        `chunk_ids`, computed once at ingest.
+        """
+        with self._lock:
+            self._load()
+            return {
+                chunk_id: self.chunk_terms[chunk_id]
+                for chunk_id in chunk_ids if chunk_id in self.chunk_terms
+            }
+
+    def report(self) -> dict:
+        with self._lock:
+            self._load()
+            return {
+                "documents": len(self.doc_chunks),
+                "chunks": len(self.lengths),
+                "terms": len(self.postings)
+            }
+
+
+class SegmentWriter:
+    """
+    Writes one document's postings to a temporary segment file as its
+    chunks arrive; commit() swaps them in for the document's previous
+    postings (searches keep seeing the old version until then).
+    """
+
+    def __init__(self, index: LexicalIndex, doc_id: str):
+        self.index = index
+        self.doc_id = doc_id
+        os.makedirs(index.directory, exist_ok=True)
+        self.tmp_path = f"{index._path(doc_id)}.{uuid.uuid4().hex}.tmp"
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+
+    def add(self, chunks):
+        for chunk in chunks:
+            if chunk.get("id"):
+                terms = dict(Counter(tokenize(chunk["text"])))
+                self._file.write(json.dumps({"id": chunk["id"], "terms": terms}) + "\n")
+
+    def commit(self):
+        self._file.close()
+        index = self.index
+        with index._lock:
+            index._load()
+            index._delete(self.doc_id)
+            path = index._path(self.doc_id)
+            os.replace(self.tmp_path, path)
+            index._insert_segment(self.doc_id, path)
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60) -> list:
+    """
+    Merge ranked id lists: score(id) = sum 1 / (k + rank).
+    Returns ids best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+# Process-wide index
+lexical_index = LexicalIndex()
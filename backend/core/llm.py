@@ -1,35 +1,20 @@
-import os
-import requests
+import time
 from fastapi import HTTPException
-from dotenv import load_dotenv
 
-load_dotenv()
+from core.llm_backends import get_backend
+from core.llm_client import LLMError
 
-HF_API_URL = "https://router.huggingface.co/v1/chat/completions"
-HF_TOKEN = os.getenv("HF_TOKEN")
+SYSTEM_PROMPT = "You answer strictly from the given PDF."
 
-if not HF_TOKEN:
-    raise RuntimeError("HF_TOKEN not found in environment variables")
 
-HEADERS = {
-    "Authorization": f"Bearer {HF_TOKEN}",
-    "Content-Type": "application/json"
-}
-
-MODEL_NAME = "meta-llama/Llama-3.1-8B-Instruct:fastest"
-
-
-def llm_query(question: str, chunks: list) -> str:
+def build_messages(question: str, chunks: list, max_chunks: int = 20) -> list:
     """
-    Ask Meta-LLaMA using PDF chunks as context.
+    Chat messages for a question over PDF chunks.
     """
-    if not chunks:
-        return "No content available from the PDF."
-
     # 🔒 Limit context to avoid token overflow
     context = "\n".join(
         f"Page {c['page']}: {c['text']}"
-        for c in chunks[:20]
+        for c in chunks[:max_chunks]
     )
 
     prompt = f"""
@@ -68,102 +53,76 @@ IMPORTANT:
 - Do NOT compress answers into short phrases.
 """
 
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
 
-    payload = {
-        "model": MODEL_NAME,
-        "messages": [
-            {"role": "system", "content": "You answer strictly from the given PDF."},
-            {"role": "user", "content": prompt}
-        ],
-        "max_tokens": 300,
-        "temperature": 0.1
-    }
-
-    try:
-        response = requests.post(
-            HF_API_URL,
-            headers=HEADERS,
-            json=payload,
-            timeout=60
-        )
-
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=response.status_code,
-                detail=f"HF LLaMA API Error: {response.text}"
-            )
-
-        result = response.json()
-        return result["choices"][0]["message"]["content"].strip()
-
-    except requests.exceptions.RequestException as e:
-        return f"❌ LLM request failed: {str(e)}"
-
-
-
-# from transformers import AutoTokenizer, AutoModelForCausalLM
-# import torch
-
-# tokenizer = AutoTokenizer.from_pretrained("mistralai/Mistral-7B-Instruct-v0.2")
-# model = AutoModelForCausalLM.from_pretrained(
-#     "mistralai/Mistral-7B-Instruct-v0.2",
-#     torch_dtype=torch.float16,
-#     device_map="auto"
-# )
-
-# def generate_answer(prompt):
-#     inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
-#     outputs = model.generate(**inputs, max_new_tokens=400)
-#     return tokenizer.decode(outputs[0], skip_special_tokens=True)
 
+def _http_error(e: LLMError):
+    return HTTPException(
+        status_code=e.status_code,
+        detail=f"LLM API Error: {e.detail}"
+    )
 
-# from openai import OpenAI, RateLimitError, OpenAIError
-# import os
-# from dotenv import load_dotenv
 
-# load_dotenv()
+def llm_query(question: str, chunks: list, backend: str = None) -> str:
+    """
+    Ask the configured LLM backend using PDF chunks as context.
+    """
+    if not chunks:
+        return "No content available from the PDF."
 
-# client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    llm = get_backend(backend)
+    messages = build_messages(question, chunks, llm.max_context_chunks)
 
+    try:
+        return llm.generate(messages)
+    except LLMError as e:
+        if e.status_code in (502, 504):
+            return f"❌ LLM request failed: {e.detail}"
+        raise _http_error(e)
 
-# def llm_query(question: str, chunks: list) -> str:
-#     if not chunks:
-#         return "No content available from the PDF."
 
-#     context = "\n".join(
-#         f"Page {c['page']}: {c['text']}" for c in chunks
-#     )
+async def allm_query(question: str, chunks: list, backend: str = None,
+                     deadline: float = None) -> str:
+    """
+    Non-blocking llm_query.
+    `deadline` is an absolute time.monotonic() value (default: the
+    backend's deadline, LLM_DEADLINE unless its timeout is longer).
+    """
+    if not chunks:
+        return "No content available from the PDF."
 
-#     prompt = f"""
-# Answer the question strictly using the PDF content.
-# If the answer is not present, say:
-# "Answer not found in the document."
+    llm = get_backend(backend)
+    if deadline is None:
+        deadline = time.monotonic() + llm.deadline
 
-# PDF CONTENT:
-# {context}
+    messages = build_messages(question, chunks, llm.max_context_chunks)
 
-# QUESTION:
-# {question}
-# """
+    try:
+        return await llm.agenerate(messages, deadline=deadline)
+    except LLMError as e:
+        if e.status_code in (502, 504):
+            return f"❌ LLM request failed: {e.detail}"
+        raise _http_error(e)
 
-#     try:
-#         response = client.chat.completions.create(
-#             model="gpt-4o-mini",
-#             messages=[
-#                 {"role": "system", "content": "You answer only from the provided PDF."},
-#                 {"role": "user", "content": prompt}
-#             ],
-#             temperature=0.2,
-#             max_tokens=400
-#         )
 
-#         return response.choices[0].message.content.strip()
+async def allm_stream(question: str, chunks: list, backend: str = None,
+                      deadline: float = None):
+    """
+    Async generator of answer tokens as the backend emits them.
+    Raises LLMError on failure.
+    """
+    if not chunks:
+        yield "No content available from the PDF."
+        return
 
-#     except RateLimitError:
-#         return "❌ LLM quota exceeded. Enable billing or use a local LLM."
+    llm = get_backend(backend)
+    if deadline is None:
+        deadline = time.monotonic() + llm.deadline
 
-#     except OpenAIError as e:
-#         return f"❌ LLM error: {str(e)}"
+    messages = build_messages(question, chunks, llm.max_context_chunks)
 
-#     except Exception as e:
-#         return f"❌ Unexpected error: {str(e)}"
+    async for text in llm.astream(messages, deadline=deadline):
+        yield text
@@ -0,0 +1,465 @@
+import asyncio
+import os
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+
+from app.config import (
+    LLM_BACKENDS,
+    LLM_DEFAULT_BACKEND,
+    LLM_DEADLINE,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_RETRIES,
+    LLM_TIMEOUT,
+)
+from core.chunking import approx_token_counts
+from core.llm_client import AsyncLLMClient, LLMError, LLMDeadlineExceeded
+from core.metrics import span, count_llm_tokens
+
+load_dotenv()
+
+
+class LLMBackend:
+    """
+    One way of turning chat messages into an answer.
+
+    Every backend carries its own model, timeout, token budget and
+    batching settings, and records its own latency. `timeout` bounds one
+    attempt, `deadline` a whole question (retries included); it defaults
+    to LLM_DEADLINE but never to less than one attempt.
+    """
+
+    def __init__(self, name: str, model: str, timeout: float = LLM_TIMEOUT,
+                 max_tokens: int = 300, temperature: float = 0.1,
+                 max_context_chunks: int = 20, deadline: float = None, **_):
+        self.name = name
+        self.model = model
+        self.timeout = timeout
+        self.deadline = deadline or max(LLM_DEADLINE, timeout)
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.max_context_chunks = max_context_chunks
+
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "calls": 0, "errors": 0, "streams": 0,
+            "total_ms": 0.0, "first_token_ms": 0.0
+        }
+
+    @property
+    def cache_name(self) -> str:
+        """Identity used in cache keys."""
+        return f"{self.name}:{self.model}"
+
+    def _record(self, start: float, ok: bool, first_token: float = None):
+        with self._stats_lock:
+            self.stats["calls"] += 1
+            self.stats["total_ms"] += (time.perf_counter() - start) * 1000
+            if first_token is not None:
+                self.stats["streams"] += 1
+                self.stats["first_token_ms"] += (first_token - start) * 1000
+            if not ok:
+                self.stats["errors"] += 1
+
+    def describe(self) -> dict:
+        with self._stats_lock:
+            calls = self.stats["calls"]
+            streams = self.stats["streams"]
+            return {
+                "name": self.name,
+                "type": type(self).__name__,
+                "model": self.model,
+                "timeout": self.timeout,
+                "deadline": self.deadline,
+                "max_tokens": self.max_tokens,
+                "max_context_chunks": self.max_context_chunks,
+                "calls": calls,
+                "errors": self.stats["errors"],
+                "avg_latency_ms": round(self.stats["total_ms"] / calls, 2) if calls else None,
+                "avg_first_token_ms": (
+                    round(self.stats["first_token_ms"] / streams, 2) if streams else None
+                )
+            }
+
+    def _count_tokens(self, messages: list, answer: str, usage: dict = None):
+        """
+        Token counters for /metrics; estimated from the text when the
+        backend reported no usage.
+        """
+        if usage and "prompt_tokens" in usage:
+            count_llm_tokens(self.name, usage["prompt_tokens"], usage.get("completion_tokens", 0))
+            return
+        prompt = sum(approx_token_counts(m.get("content", "") for m in messages))
+        count_llm_tokens(self.name, prompt, approx_token_counts([answer])[0], estimated=True)
+
+    # ---- to implement ----
+    def _generate(self, messages: list, max_tokens: int, deadline: float = None) -> str:
+        """
+        Blocking generation; must give up by `deadline` (time.monotonic())
+        on its own, since a worker thread cannot be cancelled.
+        """
+        raise NotImplementedError
+
+    async def _agenerate(self, messages: list, max_tokens: int, deadline: float) -> str:
+        return await asyncio.to_thread(self._generate, messages, max_tokens, deadline)
+
+    async def _astream(self, messages: list, max_tokens: int, deadline: float):
+        yield await self._agenerate(messages, max_tokens, deadline)
+
+    # ---- public API ----
+    def _time_left(self, deadline: float) -> float:
+        """
+        Seconds the next attempt may take; raises once the deadline passed.
+        """
+        if deadline is None:
+            return self.timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMDeadlineExceeded()
+        return min(self.timeout, remaining)
+
+    def generate(self, messages: list, max_tokens: int = None) -> str:
+        start = time.perf_counter()
+        try:
+            with span("llm"):
+                answer = self._generate(messages, max_tokens or self.max_tokens)
+        except Exception:
+            self._record(start, ok=False)
+            raise
+        self._record(start, ok=True)
+        return answer
+
+    async def agenerate(self, messages: list, max_tokens: int = None, deadline: float = None) -> str:
+        start = time.perf_counter()
+        try:
+            with span("llm"):
+                answer = await self._agenerate(messages, max_tokens or self.max_tokens, deadline)
+        except asyncio.TimeoutError:
+            self._record(start, ok=False)
+            raise LLMDeadlineExceeded()
+        except Exception:
+            self._record(start, ok=False)
+            raise
+        self._record(start, ok=True)
+        return answer
+
+    async def astream(self, messages: list, max_tokens: int = None, deadline: float = None):
+        start = time.perf_counter()
+        first_token = None
+        try:
+            with span("llm"):
+                async for text in self._astream(messages, max_tokens or self.max_tokens, deadline):
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    yield text
+        except asyncio.TimeoutError:
+            self._record(start, ok=False, first_token=first_token)
+            raise LLMDeadlineExceeded()
+        except Exception:
+            self._record(start, ok=False, first_token=first_token)
+            raise
+        self._record(start, ok=True, first_token=first_token)
+
+    async def aclose(self):
+        pass
+
+
+class ChatCompletionsBackend(LLMBackend):
+    """
+    Any OpenAI-compatible /chat/completions endpoint, over a pooled
+    async client (and a keep-alive session for blocking callers).
+    """
+
+    default_url = None
+    api_key_env = None
+
+    def __init__(self, name: str, model: str, url: str = None, api_key: str = None,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_connections: int = LLM_MAX_CONNECTIONS, **settings):
+        super().__init__(name, model, **settings)
+        self.url = url or self.default_url
+        self._api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+
+        self._session = None
+        self._client = None
+
+    def _headers(self) -> dict:
+        api_key = self._api_key or (os.getenv(self.api_key_env) if self.api_key_env else None)
+        if self.api_key_env and not api_key:
+            raise LLMError(500, f"{self.api_key_env} not found in environment variables")
+
+        headers = {"Content-Type": "application/json"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        return headers
+
+    def _payload(self, messages: list, max_tokens: int) -> dict:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": self.temperature
+        }
+
+    def _async_client(self) -> AsyncLLMClient:
+        if self._client is None:
+            self._client = AsyncLLMClient(
+                self.url, self._headers(),
+                timeout=self.timeout,
+                max_concurrency=self.max_concurrency,
+                max_connections=self.max_connections,
+                max_retries=LLM_MAX_RETRIES
+            )
+        return self._client
+
+    def _generate(self, messages: list, max_tokens: int, deadline: float = None) -> str:
+        timeout = self._time_left(deadline)
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers.update(self._headers())
+
+        try:
+            response = self._session.post(
+                self.url,
+                json=self._payload(messages, max_tokens),
+                timeout=timeout
+            )
+        except requests.exceptions.Timeout:
+            raise LLMError(504, "LLM request timed out")
+        except requests.exceptions.RequestException as e:
+            raise LLMError(502, f"LLM request failed: {e}")
+
+        if response.status_code != 200:
+            raise LLMError(response.status_code, response.text)
+
+        result = response.json()
+        answer = result["choices"][0]["message"]["content"].strip()
+        self._count_tokens(messages, answer, result.get("usage"))
+        return answer
+
+    async def _agenerate(self, messages: list, max_tokens: int, deadline: float) -> str:
+        result = await self._async_client().chat(
+            self._payload(messages, max_tokens), deadline=deadline
+        )
+        answer = result["choices"][0]["message"]["content"].strip()
+        self._count_tokens(messages, answer, result.get("usage"))
+        return answer
+
+    async def _astream(self, messages: list, max_tokens: int, deadline: float):
+        parts = []
+        async for text in self._async_client().stream_chat(
+            self._payload(messages, max_tokens), deadline=deadline
+        ):
+            parts.append(text)
+            yield text
+        self._count_tokens(messages, "".join(parts))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class HFRouterBackend(ChatCompletionsBackend):
+    default_url = os.getenv("HF_API_URL", "https://router.huggingface.co/v1/chat/completions")
+    api_key_env = "HF_TOKEN"
+
+
+class OpenAIBackend(ChatCompletionsBackend):
+    default_url = os.getenv("OPENAI_API_URL", "https://api.openai.com/v1/chat/completions")
+    api_key_env = "OPENAI_API_KEY"
+
+
+class LocalCPUBackend(LLMBackend):
+    """
+    transformers causal LM on CPU, loaded on first use. One batch runs
+    at once; requests that arrive while it runs are queued and the next
+    free caller generates up to `batch_size` of them in one batch, so
+    concurrent questions (/ask-batch) share forward passes.
+    """
+
+    def __init__(self, name: str, model: str, batch_size: int = 4, **settings):
+        super().__init__(name, model, **settings)
+        self.batch_size = batch_size
+        self._tokenizer = None
+        self._model = None
+        self._lock = threading.Lock()          # held while a batch generates
+        self._queue_lock = threading.Lock()
+        self._queue = []                       # requests waiting for a batch
+
+    def _load(self):
+        if self._model is None:
+            from transformers import AutoTokenizer, AutoModelForCausalLM
+            import torch
+
+            tokenizer = AutoTokenizer.from_pretrained(self.model)
+            tokenizer.padding_side = "left"
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+
+            self._model = AutoModelForCausalLM.from_pretrained(
+                self.model, torch_dtype=torch.float32
+            )
+            self._tokenizer = tokenizer
+        return self._tokenizer, self._model
+
+    @staticmethod
+    def _merge_system(messages: list) -> list:
+        # Many local chat templates (Mistral) reject a system role
+        system = "\n".join(m["content"] for m in messages if m["role"] == "system")
+        rest = [dict(m) for m in messages if m["role"] != "system"]
+        if system and rest:
+            rest[0]["content"] = f"{system}\n\n{rest[0]['content']}"
+        return rest
+
+    def generate_batch(self, batch: list, max_tokens: int = None, deadline: float = None) -> list:
+        """
+        Answers for a list of message lists, in order. Generation stops
+        at `deadline` (default: `timeout` from now); a batch cut short
+        raises LLMDeadlineExceeded.
+        """
+        max_tokens = max_tokens or self.max_tokens
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout
+        answers = []
+
+        with self._lock:
+            for i in range(0, len(batch), self.batch_size):
+                answers.extend(
+                    self._run_batch(batch[i:i + self.batch_size], max_tokens, deadline)
+                )
+
+        return answers
+
+    def _run_batch(self, batch: list, max_tokens: int, deadline: float) -> list:
+        # Caller holds self._lock
+        tokenizer, model = self._load()
+        remaining = self._time_left(deadline)
+
+        prompts = [
+            tokenizer.apply_chat_template(
+                self._merge_system(messages),
+                tokenize=False,
+                add_generation_prompt=True
+            )
+            for messages in batch
+        ]
+        inputs = tokenizer(prompts, return_tensors="pt", padding=True)
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=max_tokens,
+            max_time=remaining,
+            do_sample=self.temperature > 0,
+            temperature=self.temperature if self.temperature > 0 else None,
+            pad_token_id=tokenizer.pad_token_id
+        )
+        new_tokens = outputs[:, inputs["input_ids"].shape[1]:]
+        count_llm_tokens(
+            self.name,
+            int(inputs["attention_mask"].sum()),
+            int((new_tokens != tokenizer.pad_token_id).sum())
+        )
+        if time.monotonic() >= deadline:
+            raise LLMDeadlineExceeded()
+
+        return [tokenizer.decode(t, skip_special_tokens=True).strip() for t in new_tokens]
+
+    def _generate(self, messages: list, max_tokens: int, deadline: float = None) -> str:
+        """
+        Queue the request; whoever holds the model next generates it
+        together with up to `batch_size - 1` other queued requests that
+        ask for the same number of tokens.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout
+        request = {"messages": messages, "max_tokens": max_tokens, "deadline": deadline,
+                   "done": False, "answer": None, "error": None}
+        with self._queue_lock:
+            self._queue.append(request)
+
+        with self._lock:
+            while not request["done"]:
+                self._serve_next_batch()
+
+        if request["error"] is not None:
+            raise request["error"]
+        return request["answer"]
+
+    def _serve_next_batch(self):
+        # Caller holds self._lock
+        with self._queue_lock:
+            if not self._queue:
+                return
+            max_tokens = self._queue[0]["max_tokens"]
+            batch = [r for r in self._queue if r["max_tokens"] == max_tokens][:self.batch_size]
+            taken = {id(r) for r in batch}
+            self._queue = [r for r in self._queue if id(r) not in taken]
+
+        now = time.monotonic()
+        live = []
+        for request in batch:
+            if request["deadline"] <= now:
+                request["error"] = LLMDeadlineExceeded()   # expired while queued
+            else:
+                live.append(request)
+
+        try:
+            if live:
+                answers = self._run_batch(
+                    [r["messages"] for r in live], max_tokens,
+                    max(r["deadline"] for r in live)
+                )
+                finished = time.monotonic()
+                for request, answer in zip(live, answers):
+                    if finished >= request["deadline"]:
+                        request["error"] = LLMDeadlineExceeded()
+                    else:
+                        request["answer"] = answer
+        except Exception as e:
+            for request in live:
+                request["error"] = e
+        finally:
+            for request in batch:
+                request["done"] = True
+
+
+# -------------------------------
+# Registry
+# -------------------------------
+BACKEND_TYPES = {
+    "hf_router": HFRouterBackend,
+    "openai": OpenAIBackend,
+    "local": LocalCPUBackend,
+}
+
+_backends = {}
+
+
+def register_backend(backend: LLMBackend):
+    _backends[backend.name] = backend
+
+
+def get_backend(name: str = None) -> LLMBackend:
+    name = name or LLM_DEFAULT_BACKEND
+    if name not in _backends:
+        raise KeyError(f"Unknown LLM backend: {name}")
+    return _backends[name]
+
+
+def list_backends() -> list:
+    return [b.describe() for b in _backends.values()]
+
+
+async def close_backends():
+    for backend in _backends.values():
+        await backend.aclose()
+
+
+for _name, _settings in LLM_BACKENDS.items():
+    _settings = dict(_settings)
+    register_backend(BACKEND_TYPES[_settings.pop("type")](_name, **_settings))
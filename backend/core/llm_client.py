@@ -0,0 +1,217 @@
+import asyncio
+import json
+import random
+import threading
+import time
+
+import httpx
+
+from app.config import (
+    LLM_TIMEOUT,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BACKOFF,
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class LLMDeadlineExceeded(LLMError):
+    def __init__(self, detail: str = "LLM deadline exceeded"):
+        super().__init__(504, detail)
+
+
+class AsyncLLMClient:
+    """
+    Pooled async client for an OpenAI-compatible chat completions API.
+
+    - one keep-alive connection pool per event loop (no TLS handshake
+      per call)
+    - a semaphore caps in-flight requests
+    - 429 / 5xx / connection errors are retried with exponential backoff
+      (honouring Retry-After), never past the request deadline
+    """
+
+    def __init__(self, url: str, headers: dict,
+                 timeout: float = LLM_TIMEOUT,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_connections: int = LLM_MAX_CONNECTIONS,
+                 max_retries: int = LLM_MAX_RETRIES,
+                 backoff: float = LLM_RETRY_BACKOFF):
+        self.url = url
+        self.headers = headers
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._clients = {}             # event loop -> (httpx.AsyncClient, Semaphore)
+        self._lock = threading.Lock()
+
+    def _ensure_client(self):
+        # Pool and semaphore bind to the loop they are first used on, so
+        # each running loop gets its own pair (e.g. a test client per
+        # request). Pairs of loops that have since closed are dropped:
+        # their sockets can no longer be closed through that loop.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for other in [l for l in self._clients if l.is_closed()]:
+                del self._clients[other]
+
+            if loop not in self._clients:
+                client = httpx.AsyncClient(
+                    headers=self.headers,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections
+                    )
+                )
+                self._clients[loop] = (client, asyncio.Semaphore(self.max_concurrency))
+            return self._clients[loop]
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+        delay = self.backoff * (2 ** attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    @staticmethod
+    def _remaining(deadline):
+        if deadline is None:
+            return None
+        return deadline - time.monotonic()
+
+    async def _sleep_before_retry(self, attempt: int, deadline, response=None):
+        delay = self._retry_delay(attempt, response)
+        remaining = self._remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            raise LLMDeadlineExceeded()
+        await asyncio.sleep(delay)
+
+    async def chat(self, payload: dict, deadline: float = None) -> dict:
+        """
+        POST a chat completion and return the decoded JSON.
+        `deadline` is an absolute time.monotonic() value.
+        """
+        client, semaphore = self._ensure_client()
+
+        async with semaphore:
+            attempt = 0
+            while True:
+                remaining = self._remaining(deadline)
+                if remaining is not None and remaining <= 0:
+                    raise LLMDeadlineExceeded()
+
+                timeout = self.timeout if remaining is None else min(self.timeout, remaining)
+
+                try:
+                    response = await client.post(self.url, json=payload, timeout=timeout)
+                except httpx.TimeoutException:
+                    remaining = self._remaining(deadline)
+                    if remaining is not None and remaining <= 0:
+                        raise LLMDeadlineExceeded()
+                    if attempt >= self.max_retries:
+                        raise LLMError(504, "LLM request timed out")
+                    await self._sleep_before_retry(attempt, deadline)
+                    attempt += 1
+                    continue
+                except httpx.TransportError as e:
+                    if attempt >= self.max_retries:
+                        raise LLMError(502, f"LLM request failed: {e}")
+                    await self._sleep_before_retry(attempt, deadline)
+                    attempt += 1
+                    continue
+
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    await self._sleep_before_retry(attempt, deadline, response)
+                    attempt += 1
+                    continue
+
+                if response.status_code != 200:
+                    raise LLMError(response.status_code, response.text)
+
+                return response.json()
+
+    async def stream_chat(self, payload: dict, deadline: float = None):
+        """
+        Async generator of content deltas from a streaming chat completion
+        (OpenAI-style SSE). Retries only happen before the first token;
+        once text has been yielded a failure is raised to the caller.
+        """
+        client, semaphore = self._ensure_client()
+        payload = {**payload, "stream": True}
+
+        async with semaphore:
+            attempt = 0
+            while True:
+                remaining = self._remaining(deadline)
+                if remaining is not None and remaining <= 0:
+                    raise LLMDeadlineExceeded()
+
+                timeout = self.timeout if remaining is None else min(self.timeout, remaining)
+
+                try:
+                    async with client.stream("POST", self.url, json=payload, timeout=timeout) as response:
+                        if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                            await response.aread()
+                            await self._sleep_before_retry(attempt, deadline, response)
+                            attempt += 1
+                            continue
+
+                        if response.status_code != 200:
+                            body = await response.aread()
+                            raise LLMError(response.status_code, body.decode("utf-8", "replace"))
+
+                        async for line in response.aiter_lines():
+                            if self._remaining(deadline) is not None and self._remaining(deadline) <= 0:
+                                raise LLMDeadlineExceeded()
+
+                            line = line.strip()
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                return
+
+                            event = json.loads(data)
+                            for choice in event.get("choices", []):
+                                text = (choice.get("delta") or {}).get("content")
+                                if text:
+                                    yield text
+                        return
+
+                except httpx.TimeoutException:
+                    raise LLMDeadlineExceeded("LLM stream timed out")
+                except httpx.TransportError as e:
+                    raise LLMError(502, f"LLM request failed: {e}")
+
+    async def aclose(self):
+        """
+        Close every pool; those of other, still running loops are closed
+        on their own loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients, self._clients = self._clients, {}
+
+        for owner, (client, _) in clients.items():
+            if owner is loop:
+                await client.aclose()
+            elif owner.is_running():
+                future = asyncio.run_coroutine_threadsafe(client.aclose(), owner)
+                await asyncio.wrap_future(future)
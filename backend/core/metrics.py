@@ -0,0 +1,272 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# -------------------------------
+# Metrics registry
+# -------------------------------
+# Prometheus text exposition (format 0.0.4) without a client library:
+# counters and histograms are updated in place, gauges that mirror
+# other modules' state (caches, ingest queue) are filled by collectors
+# right before each scrape.
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+_metrics = {}           # name -> metric, in registration order
+_collectors = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _metrics[name] = self
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labels)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_label_text(self.labels, key)} {_number(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                entry["counts"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((k, {**v, "counts": list(v["counts"])}) for k, v in self._values.items())
+
+        lines = self.header()
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["counts"]):
+                cumulative += count
+                le = _label_text(self.labels, key, f'le="{_number(float(bound))}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _label_text(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {entry['count']}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(entry['sum'])}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {entry['count']}")
+        return lines
+
+
+def register_collector(fn):
+    """
+    `fn()` runs before every scrape, typically to set gauges.
+    """
+    with _registry_lock:
+        _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    for collect in list(_collectors):
+        try:
+            collect()
+        except Exception as e:
+            print(f"⚠️ Metrics collector {collect.__name__} failed: {e}")
+    with _registry_lock:
+        metrics = list(_metrics.values())
+    return "\n".join(line for m in metrics for line in m.render()) + "\n"
+
+
+# -------------------------------
+# Built-in metrics
+# -------------------------------
+SPAN_SECONDS = Histogram(
+    "syllabus_span_seconds",
+    "Duration of instrumented operations (embed, vector_query, llm, ...).",
+    ["span"]
+)
+HTTP_SECONDS = Histogram(
+    "syllabus_http_request_seconds",
+    "HTTP request latency until the response headers are sent.",
+    ["method", "route", "status"]
+)
+LLM_TOKENS = Counter(
+    "syllabus_llm_tokens_total",
+    "LLM tokens by backend; 'estimated' when the backend reported no usage.",
+    ["backend", "kind", "source"]
+)
+
+
+def count_llm_tokens(backend: str, prompt: int, completion: int, estimated: bool = False):
+    source = "estimated" if estimated else "reported"
+    LLM_TOKENS.inc(prompt, backend=backend, kind="prompt", source=source)
+    LLM_TOKENS.inc(completion, backend=backend, kind="completion", source=source)
+
+
+# -------------------------------
+# Stage timings
+# -------------------------------
+class StageTimer:
+    """
+    Accumulates wall-clock time per pipeline stage (ingest, retrieval).
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    def report(self) -> dict:
+        """Timings in milliseconds."""
+        return {name: round(sec * 1000, 2) for name, sec in self.timings.items()}
+
+
+# -------------------------------
+# Request tracing
+# -------------------------------
+# A request gets a span list in a context variable; threadpool calls
+# and tasks started from the request share it, so every span() below
+# the request ends up in its Server-Timing header. Outside a request
+# (background ingest jobs) spans only feed the histogram.
+_trace = contextvars.ContextVar("syllabus_trace", default=None)
+
+
+@contextmanager
+def span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_SECONDS.observe(elapsed, span=name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((name, elapsed))
+
+
+def server_timing(trace: list, total: float) -> str:
+    """
+    Server-Timing value: one entry per span name (durations summed,
+    in ms), then the request total.
+    """
+    totals, counts = {}, {}
+    for name, elapsed in trace:
+        totals[name] = totals.get(name, 0.0) + elapsed
+        counts[name] = counts.get(name, 0) + 1
+
+    entries = [
+        f'{name};dur={totals[name] * 1000:.2f}'
+        + (f';desc="x{counts[name]}"' if counts[name] > 1 else "")
+        for name in totals
+    ]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware: traces each HTTP request, adds a Server-Timing
+    header and records the request latency. For streaming responses the
+    header covers the work done before the first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = []
+        token = _trace.set(trace)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(list(trace), elapsed).encode("latin-1")))
+                message = {**message, "headers": headers}
+
+                route = scope.get("route")
+                HTTP_SECONDS.observe(
+                    elapsed,
+                    method=scope["method"],
+                    route=getattr(route, "path", "other"),
+                    status=message["status"]
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _trace.reset(token)
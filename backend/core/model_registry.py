@@ -0,0 +1,167 @@
+import resource
+import threading
+import time
+
+from app.config import MODEL_RETRY_SECONDS
+
+# -------------------------------
+# Process-wide model registry
+# -------------------------------
+# Each model is registered with a loader and built once, on first
+# get_model() (or an explicit warmup), then shared by every module. A
+# failed load is remembered and re-raised without calling the loader
+# until its retry delay has passed, so e.g. a model hub that cannot be
+# reached costs one timeout per delay instead of one per request.
+# Optional models (retry_after=None) keep the error until a warmup.
+_models = {}            # name -> entry
+_registry_lock = threading.Lock()
+
+
+def current_rss_mb() -> float:
+    """
+    Resident set size of this process in MB (peak RSS where /proc is
+    not available).
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * resource.getpagesize() / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError):
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def register_model(name: str, loader, retry_after: float = MODEL_RETRY_SECONDS):
+    """
+    Register a zero-argument loader. Re-registering an unloaded model
+    replaces its loader (and forgets a failed load). `retry_after`:
+    seconds before a failed load is tried again (None: only on warmup).
+    """
+    with _registry_lock:
+        entry = _models.get(name)
+        if entry and entry["instance"] is not None:
+            return
+        _models[name] = {
+            "loader": loader,
+            "retry_after": retry_after,
+            "instance": None,
+            "lock": threading.Lock(),
+            "load_seconds": None,
+            "rss_delta_mb": None,
+            "loaded_at": None,
+            "error": None,
+            "failed_at": None
+        }
+
+
+def get_model(name: str, retry: bool = False):
+    """
+    The loaded model, built on first use. A remembered load failure is
+    re-raised until the model's retry delay has passed, or right away
+    retried with `retry`.
+    """
+    entry = _models.get(name)
+    if entry is None:
+        raise KeyError(f"Unknown model: {name}")
+
+    if entry["instance"] is None:
+        with entry["lock"]:
+            if entry["instance"] is None:
+                if entry["error"] is not None and not retry:
+                    waited = time.time() - entry["failed_at"]
+                    if entry["retry_after"] is None or waited < entry["retry_after"]:
+                        raise entry["error"]
+
+                rss_before = current_rss_mb()
+                start = time.perf_counter()
+
+                try:
+                    instance = entry["loader"]()
+                except Exception as e:
+                    entry["error"] = e
+                    entry["failed_at"] = time.time()
+                    print(f"❌ Loading {name} failed: {e}")
+                    raise
+
+                entry["load_seconds"] = round(time.perf_counter() - start, 3)
+                entry["rss_delta_mb"] = round(current_rss_mb() - rss_before, 1)
+                entry["loaded_at"] = time.time()
+                entry["error"] = None
+                entry["failed_at"] = None
+                entry["instance"] = instance
+                print(f"🧠 Loaded {name} in {entry['load_seconds']}s "
+                      f"(+{entry['rss_delta_mb']} MB)")
+
+    return entry["instance"]
+
+
+def is_loaded(name: str) -> bool:
+    entry = _models.get(name)
+    return bool(entry and entry["instance"] is not None)
+
+
+def warmup(names=None) -> dict:
+    """
+    Load the given models (all registered ones by default), retrying
+    earlier failures right away. Failed loads are listed with their
+    error in the report.
+    """
+    names = names or list(_models)
+    for name in names:
+        if name not in _models:
+            raise KeyError(f"Unknown model: {name}")
+    for name in names:
+        try:
+            get_model(name, retry=True)
+        except Exception:
+            pass
+    return report()
+
+
+def report() -> dict:
+    return {
+        "rss_mb": current_rss_mb(),
+        "models": [
+            {
+                "name": name,
+                "loaded": entry["instance"] is not None,
+                "load_seconds": entry["load_seconds"],
+                "rss_delta_mb": entry["rss_delta_mb"],
+                "loaded_at": entry["loaded_at"],
+                "error": str(entry["error"]) if entry["error"] is not None else None
+            }
+            for name, entry in _models.items()
+        ]
+    }
+
+
+# -------------------------------
+# Built-in models
+# -------------------------------
+EMBEDDER = "embedder"
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+CAPTIONER = "blip-captioner"
+CAPTION_MODEL_NAME = "Salesforce/blip-image-captioning-large"
+RERANKER = "reranker"
+RERANKER_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def _load_embedder():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def _load_captioner():
+    from transformers import BlipProcessor, BlipForConditionalGeneration
+    processor = BlipProcessor.from_pretrained(CAPTION_MODEL_NAME)
+    model = BlipForConditionalGeneration.from_pretrained(CAPTION_MODEL_NAME)
+    return processor, model
+
+
+def _load_reranker():
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(RERANKER_MODEL_NAME, max_length=512)
+
+
+register_model(EMBEDDER, _load_embedder)
+register_model(CAPTIONER, _load_captioner, retry_after=None)   # optional ingest stage
+register_model(RERANKER, _load_reranker)
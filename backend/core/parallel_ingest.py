@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+
+from app.config import INGEST_PROCESSES, SHARDS_PER_PROCESS
+from core.pdf_loader import iter_pages
+from core.hash_index import HashIndex
+from core.image_extractor import stage_page_images, IMAGE_OUTPUT_DIR
+
+# -------------------------------
+# Process pool for page extraction
+# -------------------------------
+# Workers are started from a clean forkserver (spawn where that is not
+# available), never forked from the server process: it runs threads
+# and holds the loaded models. Workers only import fitz and NumPy.
+START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def get_pool(processes: int = INGEST_PROCESSES) -> ProcessPoolExecutor:
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != processes:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context(START_METHOD)
+            )
+            _pool_size = processes
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+def page_shards(page_count: int, processes: int, shards_per_process: int = SHARDS_PER_PROCESS):
+    """
+    Split [0, page_count) into contiguous (start, end) ranges.
+    """
+    shards = max(1, min(page_count, processes * shards_per_process))
+    size, extra = divmod(page_count, shards)
+
+    ranges = []
+    start = 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def earlier_xrefs(path: str, shards: list) -> list:
+    """
+    For each (start, end) shard, the image xrefs that already appear on
+    an earlier page, from page metadata only (see stage_page_images).
+    """
+    first_page = {}
+    with fitz.open(path) as doc:
+        for page_index in range(len(doc)):
+            for img in doc.get_page_images(page_index):
+                first_page.setdefault(img[0], page_index)
+    return [
+        {xref for xref, page_index in first_page.items() if page_index < start}
+        for start, _ in shards
+    ]
+
+
+def extract_page_range(path: str, start: int, end: int, stage_dir: str,
+                       earlier: set = None) -> dict:
+    """
+    Worker: open the PDF in this process and extract text blocks and
+    filtered image candidates for pages [start, end). Candidate images
+    are capped per page and written to `stage_dir`; only their paths and
+    hashes are returned.
+    Returns {"pages": [...], "stats": {...}}.
+
+    xref and pHash dedup are local to the shard; cross-shard duplicates
+    are caught by the pHash dedup that runs in page order in the parent.
+    `earlier` (earlier_xrefs) marks images that may turn out to be such
+    duplicates.
+    """
+    pages = []
+    seen_xrefs = set()
+    seen = HashIndex()
+    stats = {"candidates": 0, "rejected_cheap": 0, "decoded": 0}
+
+    with fitz.open(path) as doc:
+        for page in iter_pages(doc, start, end):
+            page["candidates"] = stage_page_images(
+                doc, page["page"] - 1, page.pop("images"), seen, seen_xrefs, stats, stage_dir,
+                earlier
+            )
+            pages.append(page)
+
+    return {"pages": pages, "stats": stats}
+
+
+def parallel_pages(path: str, page_count: int, processes: int = INGEST_PROCESSES,
+                   stats: dict = None, output_dir: str = IMAGE_OUTPUT_DIR):
+    """
+    Yield page dicts (as iter_pages, plus "candidates") in page order
+    while shards are extracted concurrently across worker processes.
+    Worker image counters are added into `stats`.
+
+    Candidate files are staged in a scratch folder under `output_dir`
+    (keep_page_images moves the kept ones out); it is removed once the
+    pages have been consumed.
+    """
+    stage_dir = os.path.abspath(os.path.join(output_dir, f".staging-{uuid.uuid4().hex[:12]}"))
+    os.makedirs(stage_dir, exist_ok=True)
+
+    path = os.path.abspath(path)
+    shards = page_shards(page_count, processes)
+    pool = get_pool(processes)
+    futures = [
+        pool.submit(extract_page_range, path, start, end, stage_dir, earlier)
+        for (start, end), earlier in zip(shards, earlier_xrefs(path, shards))
+    ]
+
+    try:
+        for future in futures:
+            shard = future.result()
+            if stats is not None:
+                for key, value in shard["stats"].items():
+                    stats[key] = stats.get(key, 0) + value
+            for page in shard["pages"]:
+                yield page
+    finally:
+        for future in futures:
+            future.cancel()
+        for future in futures:
+            if not future.cancelled():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        shutil.rmtree(stage_dir, ignore_errors=True)
@@ -1,24 +1,55 @@
-import fitz
-from PIL import Image
-import os
-
-def extract_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    text_chunks = []
-    image_paths = []
-
-    for i, page in enumerate(doc):
-        text = page.get_text()
-        if text.strip():
-            text_chunks.append((i + 1, text))
-
-        for img_index, img in enumerate(page.get_images(full=True)):
-            xref = img[0]
-            base = doc.extract_image(xref)
-            img_bytes = base["image"]
-            img_path = f"data/images/page_{i+1}_{img_index}.png"
-            with open(img_path, "wb") as f:
-                f.write(img_bytes)
-            image_paths.append((i + 1, img_path))
-
-    return text_chunks, image_paths
+import hashlib
+
+
+def stream_digest(doc, xref: int, digests: dict) -> str:
+    """
+    SHA-1 of an object's raw (still encoded) stream, computed once per
+    xref and memoized in `digests`; images are never decoded.
+    """
+    if xref not in digests:
+        digests[xref] = hashlib.sha1(doc.xref_stream_raw(xref) or b"").hexdigest() if xref else ""
+    return digests[xref]
+
+
+def page_fingerprint(doc, text: str, images, digests: dict = None) -> str:
+    """
+    Content hash of a page: its text plus the size, format and a digest
+    of the encoded stream (and soft mask) of each image.
+    """
+    digests = {} if digests is None else digests
+    digest = hashlib.sha1(text.encode("utf-8"))
+    for img in images:
+        xref, smask = img[0], img[1]
+        digest.update(repr((
+            img[2], img[3], img[4], img[5],
+            stream_digest(doc, xref, digests), stream_digest(doc, smask, digests)
+        )).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def iter_pages(doc, start: int = 0, end: int = None):
+    """
+    Stream pages [start, end) of an open PyMuPDF document once.
+
+    Each page yields its text blocks and image candidates so chunking and
+    image filtering can both work from the same page object, plus a
+    fingerprint used to skip unchanged pages on re-ingestion.
+    """
+    end = len(doc) if end is None else min(end, len(doc))
+    digests = {}           # xref -> stream digest, shared by all pages
+    for i in range(start, end):
+        page = doc[i]
+        blocks = [
+            b[4] for b in page.get_text("blocks")
+            if b[6] == 0 and b[4].strip()
+        ]
+        text = "\n".join(blocks)
+        images = page.get_images(full=True)
+
+        yield {
+            "page": i + 1,
+            "text": text,
+            "blocks": blocks,
+            "images": images,
+            "fingerprint": page_fingerprint(doc, text, images, digests)
+        }
@@ -0,0 +1,86 @@
+import numpy as np
+
+# -------------------------------
+# Embedding quantization
+# -------------------------------
+# For L2-normalized vectors (MiniLM via core.embeddings.embed):
+#   int8    round(v * scale)        1 byte per dimension  (4x smaller)
+#   binary  sign bit, packed        1 bit per dimension   (32x smaller)
+# Components of a unit-norm 384-d vector are around ±0.1, far from ±1,
+# so the int8 scale is calibrated from the data (127 / max |component|
+# of the first vectors stored) instead of assuming the [-1, 1] range;
+# larger components seen later are clipped.
+# Quantized scores only pick candidates; the final order comes from
+# re-scoring those candidates at higher precision.
+INT8_SCALE = 127.0                 # uncalibrated default ([-1, 1] range)
+SCORE_BLOCK = 256                  # rows converted to float32 at a time (cache-sized)
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+
+
+def int8_scale(vectors) -> float:
+    """
+    Scale mapping the largest absolute component of `vectors` to 127.
+    """
+    peak = float(np.abs(np.asarray(vectors, dtype=np.float32)).max(initial=0.0))
+    return 127.0 / peak if peak > 0 else INT8_SCALE
+
+
+def quantize_int8(vectors, scale: float = INT8_SCALE) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return np.clip(np.rint(vectors * scale), -127, 127).astype(np.int8)
+
+
+def dequantize_int8(codes, scale: float = INT8_SCALE) -> np.ndarray:
+    return np.asarray(codes, dtype=np.float32) / scale
+
+
+def quantize_binary(vectors) -> np.ndarray:
+    """Sign bits packed 8 per byte: [n, ceil(dim / 8)] uint8."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return np.packbits(vectors > 0, axis=1)
+
+
+def int8_scores(codes, queries, scale: float = INT8_SCALE) -> np.ndarray:
+    """
+    [n_queries, n_rows] dot products of int8 rows with float queries.
+    Blocks of rows are converted into one reused cache-sized float32
+    buffer and scored against all queries, so the conversion is shared
+    by a batch of questions and never spans the whole matrix.
+    """
+    codes = np.asarray(codes)
+    queries_t = np.ascontiguousarray(np.atleast_2d(np.asarray(queries, dtype=np.float32)).T)
+    scores = np.empty((len(codes), queries_t.shape[1]), dtype=np.float32)
+    buffer = np.empty((min(SCORE_BLOCK, len(codes)), codes.shape[1]), dtype=np.float32)
+    for start in range(0, len(codes), SCORE_BLOCK):
+        block = codes[start:start + SCORE_BLOCK]
+        rows = buffer[:len(block)]
+        np.copyto(rows, block, casting="unsafe")
+        np.matmul(rows, queries_t, out=scores[start:start + SCORE_BLOCK])
+    return scores.T / scale
+
+
+def hamming(bits, query_bits) -> np.ndarray:
+    """
+    Hamming distance between each packed row and one packed query.
+    """
+    xor = np.bitwise_xor(bits, query_bits)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[xor].sum(axis=1, dtype=np.int32)
+
+
+def recall_at_k(found, truth) -> float:
+    """
+    Mean share of the exact top-k ids recovered, over all queries.
+    """
+    ratios = [
+        len(set(f) & set(t)) / len(t)
+        for f, t in zip(found, truth) if len(t)
+    ]
+    return float(np.mean(ratios)) if ratios else 0.0
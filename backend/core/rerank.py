@@ -0,0 +1,144 @@
+import numpy as np
+
+from app.config import (
+    RERANK_METHOD,
+    MMR_LAMBDA,
+    CONTEXT_MAX_CHUNKS,
+    CONTEXT_TOKEN_BUDGET,
+    OVERLAP_DROP_RATIO,
+)
+from core.chunking import approx_token_counts
+from core.metrics import StageTimer
+from core.model_registry import get_model, RERANKER
+
+# -------------------------------
+# Rerank + context packing
+# -------------------------------
+# Retrieval over-fetches candidates; this stage reorders them on CPU,
+# drops chunks whose text is already covered by a better one (chunk
+# overlap windows, re-ingested copies) and packs what is left into a
+# token budget, so the LLM prompt stays short.
+
+
+def mmr(query_vec, vectors, k: int, lambda_: float = MMR_LAMBDA) -> list:
+    """
+    Maximal marginal relevance: indices of up to k vectors balancing
+    similarity to the query against similarity to those already picked.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if not len(vectors):
+        return []
+
+    vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+    query = np.asarray(query_vec, dtype=np.float32)
+    query = query / (np.linalg.norm(query) + 1e-12)
+
+    relevance = vectors @ query
+    redundancy = np.full(len(vectors), -np.inf, dtype=np.float32)
+    picked = []
+
+    for _ in range(min(k, len(vectors))):
+        scores = relevance if not picked else lambda_ * relevance - (1 - lambda_) * redundancy
+        scores = scores.copy()
+        scores[picked] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+
+    return picked
+
+
+def cross_encoder_order(question: str, chunks: list) -> list:
+    """
+    Indices of chunks sorted by cross-encoder relevance to the question.
+    """
+    model = get_model(RERANKER)
+    scores = model.predict(
+        [(question, c["text"]) for c in chunks],
+        batch_size=32, show_progress_bar=False
+    )
+    return [int(i) for i in np.argsort(-np.asarray(scores), kind="stable")]
+
+
+def overlap_ratio(a: dict, b: dict) -> float:
+    """
+    Share of the shorter chunk covered by the other one (same document,
+    by character offsets; identical text counts as full overlap).
+    """
+    if a.get("doc_id") != b.get("doc_id"):
+        return 1.0 if a["text"] == b["text"] else 0.0
+    if a["text"] == b["text"]:
+        return 1.0
+    if a.get("char_start") is None or b.get("char_start") is None:
+        return 0.0
+
+    shared = min(a["char_end"], b["char_end"]) - max(a["char_start"], b["char_start"])
+    shorter = min(a["char_end"] - a["char_start"], b["char_end"] - b["char_start"])
+    return max(0, shared) / shorter if shorter > 0 else 0.0
+
+
+def drop_overlapping(chunks: list, ratio: float = OVERLAP_DROP_RATIO) -> list:
+    """
+    Keep chunks in order, skipping any that overlap a kept one by more
+    than `ratio`.
+    """
+    kept = []
+    for chunk in chunks:
+        if all(overlap_ratio(chunk, k) <= ratio for k in kept):
+            kept.append(chunk)
+    return kept
+
+
+def chunk_tokens(chunk: dict) -> int:
+    tokens = chunk.get("tokens")
+    if tokens is None:
+        tokens = approx_token_counts([chunk["text"]])[0]
+    return int(tokens)
+
+
+def pack_context(chunks: list, max_tokens: int = CONTEXT_TOKEN_BUDGET,
+                 max_chunks: int = CONTEXT_MAX_CHUNKS) -> list:
+    """
+    Best chunks, in order, whose token counts fit in `max_tokens`.
+    A chunk that does not fit is skipped so smaller ones can still go in.
+    """
+    packed = []
+    used = 0
+    for chunk in chunks:
+        if len(packed) >= max_chunks:
+            break
+        tokens = chunk_tokens(chunk)
+        if used + tokens > max_tokens:
+            continue
+        packed.append(chunk)
+        used += tokens
+    return packed
+
+
+def select_context(question: str, query_vec, candidates: list,
+                   method: str = RERANK_METHOD,
+                   max_chunks: int = CONTEXT_MAX_CHUNKS,
+                   max_tokens: int = CONTEXT_TOKEN_BUDGET,
+                   timings: dict = None) -> list:
+    """
+    Rerank over-fetched candidates and pack them into the context budget.
+    `method`: "mmr" (needs chunk["vector"]), "cross-encoder" or "none".
+    Stage latencies (ms) are added to `timings` when given.
+    """
+    timer = StageTimer()
+
+    with timer.stage("rerank"):
+        ordered = candidates
+        if method == "cross-encoder" and candidates:
+            ordered = [candidates[i] for i in cross_encoder_order(question, candidates)]
+        elif method == "mmr" and candidates and all(c.get("vector") is not None for c in candidates):
+            picked = mmr(query_vec, [c["vector"] for c in candidates], len(candidates))
+            ordered = [candidates[i] for i in picked]
+
+    with timer.stage("pack"):
+        selected = pack_context(drop_overlapping(ordered), max_tokens, max_chunks)
+
+    if timings is not None:
+        timings.update(timer.report())
+
+    return selected
@@ -1,39 +1,89 @@
 # core/vector_store.py
-# core/vector_store.py
 import os
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+
+from app.config import VECTOR_STORE, VECTOR_STORE_OPTIONS
+from core.chunking import Chunker
+from core.embedding_engine import EmbeddingEngine
+from core.model_registry import get_model, EMBEDDER, EMBEDDING_MODEL_NAME
+from core.vector_stores import open_vector_store
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CHROMA_DIR = os.path.join(BASE_DIR, "data", "chroma")
+VECTORS_DIR = os.path.join(BASE_DIR, "data", "vectors")
 
-os.makedirs(CHROMA_DIR, exist_ok=True)
+STORE_DIRS = {
+    "chroma": CHROMA_DIR,
+    "numpy": os.path.join(VECTORS_DIR, "numpy"),
+    "faiss": os.path.join(VECTORS_DIR, "faiss"),
+    "quantized": os.path.join(VECTORS_DIR, "quantized"),
+}
 
-client = chromadb.PersistentClient(
-    path=CHROMA_DIR,
-    settings=Settings(
-        anonymized_telemetry=False
-    )
+# Configured backend (chroma | numpy | faiss); all share the Chroma
+# collection API used by ingest and retrieval
+collection = open_vector_store(
+    VECTOR_STORE, STORE_DIRS[VECTOR_STORE], **VECTOR_STORE_OPTIONS.get(VECTOR_STORE, {})
 )
 
-collection = client.get_or_create_collection(name="pdf_chunks")
+# Shared MiniLM from the model registry, loaded on first use
+embedding_engine = EmbeddingEngine(lambda: get_model(EMBEDDER), EMBEDDING_MODEL_NAME)
+
+
+def encode(texts):
+    """
+    Embedder behind the embedding cache and bounded batches: repeated
+    texts skip the transformer forward pass.
+    """
+    return embedding_engine.encode(texts)
+
+
+def encode_chunks(texts):
+    """
+    Embedder for document chunks at ingest: cached on disk only, so
+    ingesting a large PDF leaves the query vectors in memory alone.
+    """
+    return embedding_engine.encode(texts, remember=False)
+
+
+def encode_sentences(texts):
+    """
+    Embedder for answer sentences (grounding): never cached, as they
+    are one-off texts that would only evict query vectors.
+    """
+    return embedding_engine.encode_uncached(texts)
+
+
+def chunker() -> Chunker:
+    """
+    Chunker sized to the embedder's tokenizer and max sequence length.
+    """
+    return Chunker.for_model(embedding_engine.model)
+
 
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+def doc_filter(doc_ids=None, pages=None):
+    """
+    `where` clause restricting results to the given documents and/or
+    (starting) pages.
+    """
+    clauses = []
+    if doc_ids:
+        doc_ids = list(doc_ids)
+        clauses.append(
+            {"doc_id": doc_ids[0]} if len(doc_ids) == 1 else {"doc_id": {"$in": doc_ids}}
+        )
+    if pages:
+        pages = [int(p) for p in pages]
+        clauses.append(
+            {"page": pages[0]} if len(pages) == 1 else {"page": {"$in": pages}}
+        )
 
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
 
-# import faiss
-# import numpy as np
 
-# class VectorDB:
-#     def __init__(self, dim):
-#         self.index = faiss.IndexFlatIP(dim)
-#         self.meta = []
+def delete_document_vectors(doc_id: str):
+    collection.delete(where={"doc_id": doc_id})
 
-#     def add(self, embeddings, metadata):
-#         self.index.add(np.array(embeddings))
-#         self.meta.extend(metadata)
 
-#     def search(self, query_emb, k):
-#         scores, idx = self.index.search(query_emb, k)
-#         return [(self.meta[i], scores[0][pos]) for pos, i in enumerate(idx[0])]
+def has_document_vectors(doc_id: str) -> bool:
+    return bool(collection.get(where={"doc_id": doc_id}, limit=1, include=[])["ids"])
@@ -0,0 +1,709 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from core.quantization import (
+    normalize,
+    int8_scale,
+    quantize_int8,
+    dequantize_int8,
+    quantize_binary,
+    int8_scores,
+    hamming,
+)
+
+# -------------------------------
+# Vector store backends
+# -------------------------------
+# Every backend speaks the subset of the Chroma collection API the app
+# uses (add / query / get / delete / count), so ingest and retrieval do
+# not care which one is configured:
+#   chroma  Chroma PersistentClient (SQLite + HNSW)
+#   numpy   memory-mapped float32 matrix, exact dot-product search
+#   faiss   the numpy store's rows searched through a FAISS index
+#           (Flat, IVF or HNSW via an index_factory string)
+#   quantized  int8 or binary codes searched first, top candidates
+#           re-scored at full precision
+# Vectors are expected to be L2-normalized (MiniLM output), so the
+# dot product is the cosine similarity; distances are 1 - similarity.
+DEFAULT_INCLUDE = ("documents", "metadatas")
+COMPACT_DEAD_RATIO = 0.25          # save() rewrites the files past this share of deleted rows
+
+
+def matches(meta: dict, where) -> bool:
+    """
+    Evaluate a Chroma-style `where` clause against one metadata dict:
+    {"field": value}, {"field": {"$in" | "$nin" | "$eq" | "$ne" | "$gt" |
+    "$gte" | "$lt" | "$lte": ...}}, {"$and": [...]}, {"$or": [...]}.
+    """
+    if not where:
+        return True
+
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches(meta, c) for c in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches(meta, c) for c in cond):
+                return False
+            continue
+
+        value = meta.get(key)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, target in cond.items():
+            if op == "$eq" and value != target:
+                return False
+            if op == "$ne" and value == target:
+                return False
+            if op == "$in" and value not in target:
+                return False
+            if op == "$nin" and value in target:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+    return True
+
+
+class VectorStore:
+    """
+    Interface shared by all backends (Chroma collection semantics).
+    """
+    name = "base"
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        raise NotImplementedError
+
+    def query(self, query_embeddings, n_results: int = 10, where=None,
+              include=DEFAULT_INCLUDE) -> dict:
+        raise NotImplementedError
+
+    def get(self, ids=None, where=None, limit: int = None,
+            include=DEFAULT_INCLUDE) -> dict:
+        raise NotImplementedError
+
+    def delete(self, ids=None, where=None):
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def save(self):
+        """Make everything added so far durable (no-op if already)."""
+
+    def describe(self) -> dict:
+        return {"backend": self.name, "vectors": self.count()}
+
+
+class ChromaStore(VectorStore):
+    """
+    Thin wrapper over a Chroma collection.
+    """
+    name = "chroma"
+
+    def __init__(self, directory: str, collection_name: str = "pdf_chunks"):
+        import chromadb
+        from chromadb.config import Settings
+
+        os.makedirs(directory, exist_ok=True)
+        self.client = chromadb.PersistentClient(
+            path=directory,
+            settings=Settings(anonymized_telemetry=False)
+        )
+        self.collection = self.client.get_or_create_collection(name=collection_name)
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        self.collection.add(
+            ids=list(ids),
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            documents=documents,
+            metadatas=metadatas
+        )
+
+    def query(self, query_embeddings, n_results: int = 10, where=None,
+              include=DEFAULT_INCLUDE) -> dict:
+        return self.collection.query(
+            query_embeddings=np.asarray(query_embeddings, dtype=np.float32).tolist(),
+            n_results=n_results, where=where, include=list(include)
+        )
+
+    def get(self, ids=None, where=None, limit: int = None,
+            include=DEFAULT_INCLUDE) -> dict:
+        return self.collection.get(ids=ids, where=where, limit=limit, include=list(include))
+
+    def delete(self, ids=None, where=None):
+        self.collection.delete(ids=ids, where=where)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+
+class NumpyFlatStore(VectorStore):
+    """
+    Exact search over a float32 matrix memory-mapped from disk.
+
+    directory/
+        vectors.f32   rows appended in insertion order
+        rows.jsonl    one line per added row or deletion (replayed on load)
+
+    Deleted rows are masked out; their tombstones in rows.jsonl are
+    durable as written. save() compacts (drops them from disk) only once
+    more than COMPACT_DEAD_RATIO of the rows are dead, so a small
+    re-ingest does not rewrite the whole store.
+    """
+    name = "numpy"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.rows_path = os.path.join(directory, "rows.jsonl")
+
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    def _reset(self):
+        self.dim = None
+        self.matrix = None                          # np.memmap [rows, dim]
+        self.ids, self.documents, self.metadatas = [], [], []
+        self.live = np.zeros(0, dtype=bool)
+        self.positions = {}                         # id -> row
+        self.doc_index = {}                         # doc_id -> code
+        self._codes = []                            # row -> doc code
+        self.doc_codes = np.zeros(0, dtype=np.int32)
+
+    # ---- persistence ----
+    def load(self):
+        with self._lock:
+            self._reset()
+            if not os.path.exists(self.rows_path):
+                return
+
+            deleted = set()
+            with open(self.rows_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    if "delete" in row:
+                        deleted.update(self.positions[i] for i in row["delete"] if i in self.positions)
+                        for i in row["delete"]:
+                            self.positions.pop(i, None)
+                        continue
+                    if "dim" in row:
+                        self.dim = row["dim"]
+                        continue
+                    self._append_row(row["id"], row.get("document"), row.get("metadata") or {})
+
+            live = np.ones(len(self.ids), dtype=bool)
+            live[list(deleted)] = False
+            self.live = live
+            self._remap()
+
+    def needs_compaction(self) -> bool:
+        dead = len(self.ids) - int(self.live.sum())
+        return dead > 0 and dead > COMPACT_DEAD_RATIO * len(self.ids)
+
+    def save(self):
+        """
+        Compact: rewrite both files with live rows only, once enough rows
+        are dead (needs_compaction).
+        """
+        with self._lock:
+            if not self.needs_compaction():
+                return
+            keep = np.flatnonzero(self.live)
+            rows = [(self.ids[i], self.documents[i], self.metadatas[i]) for i in keep]
+
+            replaced = self._compact_vectors(keep)
+            tmp_rows = self.rows_path + ".tmp"
+            with open(tmp_rows, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"dim": self.dim}) + "\n")
+                for chunk_id, document, metadata in rows:
+                    f.write(json.dumps({"id": chunk_id, "document": document, "metadata": metadata}) + "\n")
+            replaced.append((tmp_rows, self.rows_path))
+
+            self.matrix = None
+            for tmp_path, path in replaced:
+                os.replace(tmp_path, path)
+            self.load()
+
+    # ---- vector files (overridden by QuantizedStore) ----
+    def _write_vectors(self, embeddings: np.ndarray):
+        with open(self.vectors_path, "ab") as f:
+            f.write(embeddings.tobytes())
+
+    def _compact_vectors(self, keep) -> list:
+        """Write live rows to temp files; returns [(tmp_path, path)]."""
+        tmp_path = self.vectors_path + ".tmp"
+        np.asarray(self.matrix[keep] if len(keep) else np.zeros((0, self.dim or 0)),
+                   dtype=np.float32).tofile(tmp_path)
+        return [(tmp_path, self.vectors_path)]
+
+    def _vectors(self, rows) -> np.ndarray:
+        if not len(rows):
+            return np.zeros((0, self.dim or 0), np.float32)
+        return np.array(self.matrix[rows])
+
+    def _remap(self):
+        n = len(self.ids)
+        if n and self.dim:
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        else:
+            self.matrix = None
+
+    def _append_row(self, chunk_id: str, document, metadata: dict):
+        self.positions[chunk_id] = len(self.ids)
+        self.ids.append(chunk_id)
+        self.documents.append(document)
+        self.metadatas.append(metadata)
+        doc_id = metadata.get("doc_id")
+        self._codes.append(self.doc_index.setdefault(doc_id, len(self.doc_index)))
+
+    # ---- filtering ----
+    def _mask(self, where) -> np.ndarray:
+        """
+        Boolean mask of live rows matching `where`. doc_id equality and
+        $in use a NumPy code array; anything else is evaluated per row.
+        """
+        mask = self.live.copy()
+        if not where:
+            return mask
+
+        if len(self.doc_codes) != len(self.ids):
+            self.doc_codes = np.asarray(self._codes, dtype=np.int32)
+
+        rest = dict(where)
+        cond = rest.pop("doc_id", None)
+        if cond is not None:
+            wanted = cond["$in"] if isinstance(cond, dict) and "$in" in cond else (
+                [cond["$eq"]] if isinstance(cond, dict) and "$eq" in cond else
+                [cond] if not isinstance(cond, dict) else None
+            )
+            if wanted is None:
+                rest["doc_id"] = cond
+            else:
+                codes = [self.doc_index[d] for d in wanted if d in self.doc_index]
+                mask &= np.isin(self.doc_codes, codes)
+
+        if rest:
+            for i in np.flatnonzero(mask):
+                if not matches(self.metadatas[i], rest):
+                    mask[i] = False
+        return mask
+
+    def _result(self, rows, include, scores=None) -> dict:
+        result = {"ids": [self.ids[i] for i in rows]}
+        if "documents" in include:
+            result["documents"] = [self.documents[i] for i in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self.metadatas[i] for i in rows]
+        if "embeddings" in include:
+            result["embeddings"] = self._vectors(rows)
+        if scores is not None:
+            result["distances"] = [float(1.0 - s) for s in scores]
+        return result
+
+    # ---- API ----
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        ids = list(ids)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [{} for _ in ids]
+
+        with self._lock:
+            replaced = [i for i in ids if i in self.positions]
+            if replaced:
+                self.delete(ids=replaced)
+
+            lines = []
+            if self.dim is None:
+                self.dim = int(embeddings.shape[1])
+                lines.append(json.dumps({"dim": self.dim}))
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                self._append_row(chunk_id, document, metadata)
+                lines.append(json.dumps({"id": chunk_id, "document": document, "metadata": metadata}))
+
+            self._write_vectors(embeddings)
+            with open(self.rows_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+            self.live = np.concatenate([self.live, np.ones(len(ids), dtype=bool)])
+            self._remap()
+
+    def _search(self, queries: np.ndarray, n_results: int, mask: np.ndarray):
+        """
+        Exact top-n per query: ([rows], [scores]) lists.
+        """
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return [[] for _ in queries], [[] for _ in queries]
+
+        sub = self.matrix if len(candidates) == len(self.ids) else self.matrix[candidates]
+        scores = queries @ np.asarray(sub).T
+        n = min(n_results, len(candidates))
+
+        rows, top_scores = [], []
+        for q_scores in scores:
+            top = np.argpartition(-q_scores, n - 1)[:n]
+            top = top[np.argsort(-q_scores[top], kind="stable")]
+            rows.append(candidates[top].tolist())
+            top_scores.append(q_scores[top].tolist())
+        return rows, top_scores
+
+    def query(self, query_embeddings, n_results: int = 10, where=None,
+              include=DEFAULT_INCLUDE) -> dict:
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        with self._lock:
+            if not self.ids:
+                rows = [[] for _ in queries]
+                scores = [[] for _ in queries]
+            else:
+                rows, scores = self._search(queries, n_results, self._mask(where))
+
+            results = {key: [] for key in ("ids", "distances", *include)}
+            for q_rows, q_scores in zip(rows, scores):
+                for key, value in self._result(q_rows, include, q_scores).items():
+                    results[key].append(value)
+            return results
+
+    def get(self, ids=None, where=None, limit: int = None,
+            include=DEFAULT_INCLUDE) -> dict:
+        with self._lock:
+            if ids is not None:
+                rows = [self.positions[i] for i in ids if i in self.positions]
+                rows = [r for r in rows if matches(self.metadatas[r], where)]
+            else:
+                rows = np.flatnonzero(self._mask(where)).tolist()
+            if limit is not None:
+                rows = rows[:limit]
+            return self._result(rows, include)
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            if ids is not None:
+                rows = [self.positions[i] for i in ids if i in self.positions]
+                rows = [r for r in rows if matches(self.metadatas[r], where)]
+            else:
+                rows = np.flatnonzero(self._mask(where)).tolist()
+            if not rows:
+                return
+
+            removed = [self.ids[r] for r in rows]
+            self.live[rows] = False
+            for chunk_id in removed:
+                self.positions.pop(chunk_id, None)
+            with open(self.rows_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"delete": removed}) + "\n")
+            self._deleted(rows)
+
+    def _deleted(self, rows):
+        """Hook for subclasses holding a derived index."""
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self.live.sum())
+
+    def describe(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "vectors": int(self.live.sum()),
+                "dead_rows": int((~self.live).sum()),
+                "dim": self.dim,
+                "bytes": len(self.ids) * (self.dim or 0) * 4
+            }
+
+
+class FaissStore(NumpyFlatStore):
+    """
+    NumpyFlatStore rows searched through a FAISS index built from an
+    index_factory string ("Flat", "IVF256,Flat", "HNSW32", ...). The
+    index is rebuilt lazily after writes and saved next to the rows.
+    Filtered queries over-fetch and drop non-matching rows; very
+    selective filters fall back to exact search on the subset.
+    """
+    name = "faiss"
+
+    def __init__(self, directory: str, factory: str = "HNSW32", nprobe: int = 16,
+                 ef_search: int = 128, exact_below: int = 2048):
+        import faiss
+        self.faiss = faiss
+        self.factory = factory
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.exact_below = exact_below
+        self.index = None
+        self.index_rows = 0
+        super().__init__(directory)
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, "index.faiss")
+
+    def load(self):
+        super().load()
+        self.index = None
+        if os.path.exists(self.index_path):
+            index = self.faiss.read_index(self.index_path)
+            if index.ntotal == len(self.ids):
+                self.index = index
+                self.index_rows = index.ntotal
+                self._tune()
+
+    def save(self):
+        with self._lock:
+            compacted = self.needs_compaction()
+            super().save()
+            if compacted:
+                self.index = None
+            self._build()
+            if self.index is not None:
+                self.faiss.write_index(self.index, self.index_path + ".tmp")
+                os.replace(self.index_path + ".tmp", self.index_path)
+
+    def _build(self):
+        """
+        Bring the index up to date with the rows: new rows are added to
+        the existing index, which is only built (and trained) from
+        scratch when missing. Deleted rows stay in it and are masked out
+        at query time until the next compaction.
+        """
+        if self.matrix is None:
+            self.index = None
+            return
+        if self.index is not None:
+            if self.index_rows < len(self.ids):
+                self.index.add(np.ascontiguousarray(self.matrix[self.index_rows:], dtype=np.float32))
+                self.index_rows = len(self.ids)
+            return
+
+        vectors = np.ascontiguousarray(self.matrix, dtype=np.float32)
+        index = self.faiss.index_factory(self.dim, self.factory, self.faiss.METRIC_INNER_PRODUCT)
+        if not index.is_trained:
+            index.train(vectors)
+        index.add(vectors)
+        self.index = index
+        self._tune()
+        self.index_rows = len(self.ids)
+
+    def _tune(self):
+        """Search-time knobs: IVF probes, HNSW candidate list size."""
+        if hasattr(self.index, "nprobe"):
+            self.index.nprobe = self.nprobe
+        if hasattr(self.index, "hnsw"):
+            self.index.hnsw.efSearch = self.ef_search
+
+    def _search(self, queries: np.ndarray, n_results: int, mask: np.ndarray):
+        selected = int(mask.sum())
+        if selected <= self.exact_below or selected < n_results:
+            return super()._search(queries, n_results, mask)
+
+        self._build()
+        fetch = n_results
+        while True:
+            fetch = min(len(self.ids), fetch * 4)
+            scores, found = self.index.search(queries, fetch)
+
+            rows, top_scores = [], []
+            for q_found, q_scores in zip(found, scores):
+                keep = [(int(r), float(s)) for r, s in zip(q_found, q_scores) if r >= 0 and mask[r]]
+                rows.append([r for r, _ in keep[:n_results]])
+                top_scores.append([s for _, s in keep[:n_results]])
+
+            if fetch == len(self.ids) or all(len(r) >= n_results for r in rows):
+                return rows, top_scores
+
+
+class QuantizedStore(NumpyFlatStore):
+    """
+    NumpyFlatStore searched through quantized codes:
+        int8    codes.i8    one byte per dimension
+        binary  codes.bits  one bit per dimension (Hamming search);
+                codes.i8 is written too, for re-scoring
+        scale.json          int8 scale, calibrated on the first vectors
+
+    keep_float decides the disk / recall trade-off:
+        True   vectors.f32 is kept next to the codes, so the store takes
+               MORE disk than the numpy one (float32 + codes). The best
+               `rescore_factor * k` candidates are re-scored with the
+               float rows (memory-mapped; only those rows are read), so
+               recall is close to exact search while the coarse pass
+               reads 4x (int8) or 32x (binary) fewer bytes.
+        False  no float file: 4x (int8) smaller on disk. Binary
+               candidates are re-scored with the int8 codes; with int8
+               codes the coarse order is final (re-scoring with the same
+               codes changes nothing), so rescore_factor is not used and
+               recall is bounded by the int8 precision.
+    With the float rows resident in memory, NumPy's float32 matrix
+    product is as fast as the int8 pass; the codes pay off when the
+    float rows would not fit in the page cache.
+    """
+    name = "quantized"
+
+    def __init__(self, directory: str, quantization: str = "int8",
+                 keep_float: bool = True, rescore_factor: int = 4):
+        if quantization not in ("int8", "binary"):
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.quantization = quantization
+        self.keep_float = keep_float
+        self.rescore_factor = max(1, rescore_factor)
+        self.int8_path = os.path.join(directory, "codes.i8")
+        self.bits_path = os.path.join(directory, "codes.bits")
+        super().__init__(directory)
+
+    @property
+    def scale_path(self) -> str:
+        return os.path.join(self.directory, "scale.json")
+
+    def _reset(self):
+        super()._reset()
+        self.int8 = None                            # np.memmap [rows, dim] int8
+        self.bits = None                            # np.memmap [rows, dim / 8] uint8
+
+    def load(self):
+        with self._lock:
+            self.scale = None
+            if os.path.exists(self.scale_path):
+                with open(self.scale_path, "r", encoding="utf-8") as f:
+                    self.scale = json.load(f)["int8_scale"]
+            super().load()
+
+    def _paths(self) -> list:
+        paths = [(self.int8_path, np.int8, self.dim)]
+        if self.quantization == "binary":
+            paths.append((self.bits_path, np.uint8, (self.dim + 7) // 8))
+        if self.keep_float:
+            paths.append((self.vectors_path, np.float32, self.dim))
+        return paths
+
+    # ---- vector files ----
+    def _write_vectors(self, embeddings: np.ndarray):
+        embeddings = normalize(embeddings)
+        if self.scale is None:
+            self.scale = int8_scale(embeddings)
+            with open(self.scale_path, "w", encoding="utf-8") as f:
+                json.dump({"int8_scale": self.scale}, f)
+        if self.keep_float:
+            super()._write_vectors(embeddings)
+        with open(self.int8_path, "ab") as f:
+            f.write(quantize_int8(embeddings, self.scale).tobytes())
+        if self.quantization == "binary":
+            with open(self.bits_path, "ab") as f:
+                f.write(quantize_binary(embeddings).tobytes())
+
+    def _compact_vectors(self, keep) -> list:
+        replaced = []
+        for path, dtype, width in self._paths():
+            rows = np.memmap(path, dtype=dtype, mode="r", shape=(len(self.ids), width))
+            tmp_path = path + ".tmp"
+            np.asarray(rows[keep] if len(keep) else rows[:0]).tofile(tmp_path)
+            del rows
+            replaced.append((tmp_path, path))
+        return replaced
+
+    def _remap(self):
+        self.matrix = self.int8 = self.bits = None
+        n = len(self.ids)
+        if not n or not self.dim:
+            return
+        for path, dtype, width in self._paths():
+            rows = np.memmap(path, dtype=dtype, mode="r", shape=(n, width))
+            if path == self.int8_path:
+                self.int8 = rows
+            elif path == self.bits_path:
+                self.bits = rows
+            else:
+                self.matrix = rows
+
+    def _vectors(self, rows) -> np.ndarray:
+        if self.matrix is not None:
+            return super()._vectors(rows)
+        if not len(rows):
+            return np.zeros((0, self.dim or 0), np.float32)
+        return dequantize_int8(self.int8[rows], self.scale)
+
+    # ---- search ----
+    def _search(self, queries: np.ndarray, n_results: int, mask: np.ndarray):
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return [[] for _ in queries], [[] for _ in queries]
+
+        everything = len(candidates) == len(self.ids)
+        queries = normalize(queries)
+        n = min(n_results, len(candidates))
+
+        # Coarse pass over the quantized codes, all queries at once
+        if self.quantization == "binary":
+            bits = self.bits if everything else self.bits[candidates]
+            coarse = np.stack([
+                -hamming(bits, code).astype(np.float32) for code in quantize_binary(queries)
+            ])
+        else:
+            codes = self.int8 if everything else self.int8[candidates]
+            coarse = int8_scores(codes, queries, self.scale)
+
+        if self.quantization == "int8" and self.matrix is None:
+            # Nothing more precise than the codes: their order is final
+            rows, top_scores = [], []
+            for q_scores in coarse:
+                top = np.argpartition(-q_scores, n - 1)[:n]
+                top = top[np.argsort(-q_scores[top], kind="stable")]
+                rows.append(candidates[top].tolist())
+                top_scores.append(q_scores[top].tolist())
+            return rows, top_scores
+
+        fetch = min(len(candidates), n * self.rescore_factor)
+        rows, top_scores = [], []
+        for query, q_coarse in zip(queries, coarse):
+            shortlist = np.argpartition(-q_coarse, fetch - 1)[:fetch]
+            shortlist = np.sort(candidates[shortlist])
+
+            # Re-score the shortlist at higher precision
+            scores = self._vectors(shortlist) @ query
+            best = np.argsort(-scores, kind="stable")[:n]
+            rows.append(shortlist[best].tolist())
+            top_scores.append(scores[best].tolist())
+
+        return rows, top_scores
+
+    def describe(self) -> dict:
+        info = super().describe()
+        with self._lock:
+            n = len(self.ids)
+            info.update({
+                "quantization": self.quantization,
+                "keep_float": self.keep_float,
+                "rescore_factor": self.rescore_factor,
+                "int8_scale": self.scale,
+                "bytes": sum(n * width * np.dtype(dtype).itemsize for _, dtype, width in self._paths())
+                if self.dim else 0,
+                "search_bytes": n * (self.dim or 0) if self.quantization == "int8"
+                else n * (((self.dim or 0) + 7) // 8)
+            })
+        return info
+
+
+def open_vector_store(backend: str, directory: str, **options) -> VectorStore:
+    """
+    Open (or create) a store of the given backend in `directory`.
+    """
+    if backend == "chroma":
+        return ChromaStore(directory, **options)
+    if backend == "numpy":
+        return NumpyFlatStore(directory)
+    if backend == "faiss":
+        return FaissStore(directory, **options)
+    if backend == "quantized":
+        return QuantizedStore(directory, **options)
+    raise ValueError(f"Unknown vector store backend: {backend}")
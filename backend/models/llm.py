@@ -1,12 +1,4 @@
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+from core.llm_backends import get_backend
 
 SYSTEM_PROMPT = """
 You are a university professor.
@@ -16,15 +8,9 @@ If the answer is not in the syllabus, clearly say so.
 Write exam-oriented, structured answers.
 """
 
-def generate_answer(prompt: str) -> str:
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.2,
-        max_tokens=500
-    )
 
-    return response.choices[0].message.content.strip()
+def generate_answer(prompt: str, backend: str = "openai") -> str:
+    return get_backend(backend).generate([
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ])
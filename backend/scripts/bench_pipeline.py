@@ -0,0 +1,377 @@
+"""
+End-to-end benchmark of the ingest and question-answering hot paths on
+synthetic PDFs, against a local mock LLM.
+
+    python scripts/bench_pipeline.py --pages 5 50 200 --images-per-page 0 2 --json bench.json
+    python scripts/bench_pipeline.py --fake-embedder --compare bench.json
+
+Ingest runs process_pdf on every (pages, images per page) combination,
+--repeats times with fresh text, and reports each ingest stage (text
+extract, chunk, image filter, embed, vector add, ...) as p50/p95 ms.
+Questions are then answered against the last document: embed, dense and
+lexical retrieval, rerank, LLM (mock server) and confidence scoring.
+Peak RSS is sampled per phase.
+
+Everything runs on a scratch copy of backend/ (without data/) in a
+temporary directory, so the real vector store and caches are untouched.
+--fake-embedder swaps MiniLM for a hashing embedder (no model
+download; isolates pipeline overhead). --compare prints the
+change of every p50/p95 against an earlier --json report.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    "module unit lecture assessment outcome syllabus credit semester theory practical "
+    "algorithm network database compiler system design analysis structure graph tree "
+    "probability statistics calculus matrix vector signal circuit energy motion force "
+    "laboratory project report seminar quiz examination reference textbook chapter topic"
+).split()
+
+
+# -------------------------------
+# Synthetic PDFs
+# -------------------------------
+def synthetic_pdf(path: str, pages: int, images_per_page: int, seed: int = 0):
+    """
+    Syllabus-like PDF: a heading and a few paragraphs per page, plus
+    `images_per_page` distinct noise images (they pass the entropy
+    filter and never dedup against each other).
+    """
+    import fitz
+
+    rng = np.random.default_rng(seed)
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        text = [f"Unit {p + 1}: {' '.join(rng.choice(WORDS, 3)).title()}", ""]
+        for _ in range(4):
+            sentences = [
+                " ".join(rng.choice(WORDS, int(rng.integers(8, 16)))).capitalize() + "."
+                for _ in range(int(rng.integers(3, 6)))
+            ]
+            text += [" ".join(sentences), ""]
+        page.insert_textbox(fitz.Rect(50, 50, 560, 560), "\n".join(text), fontsize=9)
+
+        for i in range(images_per_page):
+            pixels = rng.integers(0, 256, (96, 128, 3), dtype=np.uint8)
+            pix = fitz.Pixmap(fitz.csRGB, 128, 96, pixels.tobytes(), False)
+            x = 50 + i * 140
+            page.insert_image(fitz.Rect(x, 580, x + 128, 676), pixmap=pix)
+
+    doc.save(path)
+    doc.close()
+
+
+class FakeEmbedder:
+    """Hashed bag of words, unit length; enough to exercise the pipeline."""
+    max_seq_length = 256
+    tokenizer = None
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False,
+               normalize_embeddings=False, **_):
+        single = isinstance(texts, str)
+        rows = []
+        for text in [texts] if single else texts:
+            v = np.zeros(self.dim, dtype=np.float32)
+            for word in text.lower().split():
+                v[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1
+            rows.append(v / (np.linalg.norm(v) or 1.0))
+        matrix = np.array(rows, dtype=np.float32)
+        return matrix[0] if single else matrix
+
+
+# -------------------------------
+# Measurement helpers
+# -------------------------------
+class PeakRSS:
+    """
+    Samples resident memory in a thread while the block runs.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        from core.model_registry import current_rss_mb
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._stop.set()
+        self._thread.join()
+
+
+def summarize(samples: dict) -> dict:
+    """{stage: [ms, ...]} -> {stage: {"p50", "p95", "mean", "n"}}"""
+    return {
+        stage: {
+            "p50": round(float(np.percentile(values, 50)), 3),
+            "p95": round(float(np.percentile(values, 95)), 3),
+            "mean": round(float(np.mean(values)), 3),
+            "n": len(values)
+        }
+        for stage, values in samples.items() if values
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# -------------------------------
+# Phases
+# -------------------------------
+def bench_ingest(routes, pdf_dir: str, pages: int, images: int, repeats: int) -> dict:
+    samples = {}
+    pages_per_sec, chunks_per_sec = [], []
+    last = None
+
+    with PeakRSS() as rss:
+        for r in range(repeats):
+            path = os.path.join(pdf_dir, f"p{pages}_i{images}_r{r}.pdf")
+            synthetic_pdf(path, pages, images, seed=r)
+            doc_id = f"bench-p{pages}-i{images}-r{r}"
+
+            start = time.perf_counter()
+            result = routes.process_pdf(
+                path, doc_id, os.path.basename(path), include_chunks=False
+            )
+            elapsed = time.perf_counter() - start
+
+            for stage, ms in result["timings"].items():
+                if stage != "processes" and not stage.endswith("_per_sec"):
+                    samples.setdefault(stage, []).append(ms)
+            samples.setdefault("process_pdf", []).append(elapsed * 1000)
+            pages_per_sec.append(pages / elapsed)
+            chunks_per_sec.append(result["chunks"] / elapsed)
+            last = {"doc_id": doc_id, "chunks": result["chunks"], "images": len(result["images"])}
+
+    return {
+        "pages": pages,
+        "images_per_page": images,
+        "chunks": last["chunks"],
+        "images_kept": last["images"],
+        "stages_ms": summarize(samples),
+        "pages_per_sec": round(float(np.median(pages_per_sec)), 2),
+        "chunks_per_sec": round(float(np.median(chunks_per_sec)), 2),
+        "peak_rss_mb": rss.peak_mb,
+        "doc_id": last["doc_id"]
+    }
+
+
+async def bench_questions(routes, doc_id: str, questions: int, concurrency: int) -> dict:
+    from core.grounding import score_answer
+    from core.lexical_index import lexical_index
+    from core.llm import allm_query
+    from core.llm_backends import get_backend
+
+    llm = get_backend()
+    rng = np.random.default_rng(7)
+    texts = [
+        f"What does the course say about {' '.join(rng.choice(WORDS, 3))}? ({i})"
+        for i in range(questions)
+    ]
+    samples = {}
+
+    with PeakRSS() as rss:
+        # Sequential: per-stage latency of one /ask
+        start = time.perf_counter()
+        for question in texts:
+            t = time.perf_counter()
+            state = routes.prepare_answer(question, [doc_id], llm)
+            samples.setdefault("prepare", []).append((time.perf_counter() - t) * 1000)
+            for stage, ms in state["timings"].items():
+                samples.setdefault(stage, []).append(ms)
+
+            t = time.perf_counter()
+            answer = await allm_query(question, state["chunks"], backend=llm.name)
+            samples.setdefault("llm", []).append((time.perf_counter() - t) * 1000)
+
+            t = time.perf_counter()
+            score_answer(answer, state["chunks"], encode=routes.encode,
+                         term_sets=lexical_index.term_sets(state["chunk_ids"]))
+            samples.setdefault("confidence", []).append((time.perf_counter() - t) * 1000)
+            samples.setdefault("ask_total", []).append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+        sequential_seconds = sum(samples["ask_total"]) / 1000
+
+        # Concurrent: same questions, batch retrieval + bounded LLM pool
+        semaphore = asyncio.Semaphore(concurrency)
+        start = time.perf_counter()
+        states = routes.prepare_answers([q + " (batch)" for q in texts], [doc_id], llm)
+
+        async def ask(question, state):
+            async with semaphore:
+                return await allm_query(question, state["chunks"], backend=llm.name)
+
+        await asyncio.gather(*(ask(q, s) for q, s in zip(texts, states)))
+        batch_seconds = time.perf_counter() - start
+
+    await llm.aclose()
+    return {
+        "questions": questions,
+        "stages_ms": summarize(samples),
+        "sequential_qps": round(questions / sequential_seconds, 2),
+        "batch_qps": round(questions / batch_seconds, 2),
+        "batch_concurrency": concurrency,
+        "peak_rss_mb": rss.peak_mb
+    }
+
+
+def compare(report: dict, baseline: dict):
+    """
+    Print p50/p95 changes against an earlier report (positive = slower).
+    """
+    def rows(r):
+        out = {}
+        for run in r.get("ingest", []):
+            key = f"ingest p{run['pages']} i{run['images_per_page']}"
+            for stage, s in run["stages_ms"].items():
+                out[f"{key} {stage}"] = s
+        for stage, s in (r.get("query") or {}).get("stages_ms", {}).items():
+            out[f"query {stage}"] = s
+        return out
+
+    old, new = rows(baseline), rows(report)
+    print(f"\n📈 Against {baseline.get('commit') or 'baseline'}:")
+    for name in sorted(set(old) & set(new)):
+        deltas = []
+        for q in ("p50", "p95"):
+            before, after = old[name][q], new[name][q]
+            change = (after - before) / before * 100 if before else 0.0
+            deltas.append(f"{q} {before:>9.2f} → {after:>9.2f}ms ({change:+6.1f}%)")
+        print(f"{name:<40} " + "  ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 50])
+    parser.add_argument("--images-per-page", type=int, nargs="+", default=[0, 2])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls in flight (batch run)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="mock LLM seconds per answer")
+    parser.add_argument("--fake-embedder", action="store_true")
+    parser.add_argument("--captions", action="store_true", help="include BLIP captioning in ingest")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--compare", help="earlier --json report to diff against")
+    args = parser.parse_args()
+
+    # Absolute paths before leaving the caller's directory
+    out_path = os.path.abspath(args.json) if args.json else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    # Stores resolve data/ next to the code, so benchmark a copy of it
+    commit = git_commit()
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    app_dir = os.path.join(workdir, "backend")
+    shutil.copytree(BACKEND_DIR, app_dir, ignore=shutil.ignore_patterns("data", "__pycache__"))
+    sys.path[:0] = [app_dir, os.path.join(app_dir, "scripts")]
+    os.chdir(app_dir)
+    os.makedirs("data/images", exist_ok=True)
+    pdf_dir = tempfile.mkdtemp(prefix="pdfs_", dir=workdir)
+
+    import mock_llm_server
+    server = mock_llm_server.serve(port=0, latency=args.llm_latency)
+    os.environ["HF_API_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    os.environ.setdefault("HF_TOKEN", "mock")
+
+    try:
+        if args.fake_embedder:
+            from core import model_registry
+            model_registry.register_model(model_registry.EMBEDDER, FakeEmbedder)
+
+        from api import routes
+        routes.IMAGE_CAPTIONS = args.captions
+
+        report = {
+            "commit": commit,
+            "created_at": time.time(),
+            "config": vars(args),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count()
+            },
+            "ingest": [],
+            "query": None
+        }
+
+        for pages in args.pages:
+            for images in args.images_per_page:
+                run = bench_ingest(routes, pdf_dir, pages, images, args.repeats)
+                report["ingest"].append(run)
+                s = run["stages_ms"]
+                print(
+                    f"📄 {pages:>4} pages x {images} img  "
+                    f"process_pdf p50 {s['process_pdf']['p50']:>9.1f}ms p95 {s['process_pdf']['p95']:>9.1f}ms  "
+                    f"{run['pages_per_sec']:>7.1f} pages/s  peak {run['peak_rss_mb']:.0f} MB"
+                )
+                print("     " + "  ".join(
+                    f"{stage} {v['p50']:.1f}" for stage, v in s.items()
+                    if stage not in ("total", "process_pdf")
+                ))
+
+        if args.questions and report["ingest"]:
+            doc_id = report["ingest"][-1]["doc_id"]
+            query = asyncio.run(bench_questions(routes, doc_id, args.questions, args.concurrency))
+            report["query"] = query
+            s = query["stages_ms"]
+            print(
+                f"❓ {args.questions} questions  ask p50 {s['ask_total']['p50']:.1f}ms "
+                f"p95 {s['ask_total']['p95']:.1f}ms  "
+                f"{query['sequential_qps']} q/s sequential, {query['batch_qps']} q/s batched  "
+                f"peak {query['peak_rss_mb']:.0f} MB"
+            )
+            print("     " + "  ".join(
+                f"{stage} {v['p50']:.2f}" for stage, v in s.items() if stage != "ask_total"
+            ))
+
+        report["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+        if out_path:
+            with open(out_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        if baseline_path:
+            with open(baseline_path, "r", encoding="utf-8") as f:
+                compare(report, json.load(f))
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Recall@k, query latency and storage of quantized embedding stores
+against the full-precision (float32, exact) baseline.
+
+    python scripts/bench_quantization.py --pdf data/pdf/<doc_id>.pdf
+    python scripts/bench_quantization.py --synthetic 50000
+
+With --pdf, chunks are embedded with the normalized MiniLM vectors of
+core.embeddings.embed and queried with the opening words of sampled
+chunks; --synthetic uses clustered random unit vectors instead (no
+model download needed).
+
+Both keep_float modes are measured: "float" keeps vectors.f32 next to
+the codes (more disk than numpy, float re-scoring), "codes" stores the
+codes only (int8: 4x less disk, and the int8 order is final, so it is
+run once rather than per rescore factor). The disk column is relative
+to the float32 numpy store.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.quantization import normalize, recall_at_k  # noqa: E402
+from core.vector_stores import open_vector_store  # noqa: E402
+
+
+def pdf_corpus(path: str, queries: int, seed: int = 0):
+    import fitz
+    from core.chunking import Chunker
+    from core.embeddings import embed
+    from core.pdf_loader import iter_pages
+
+    with fitz.open(path) as doc:
+        texts = [c["text"] for c in Chunker().chunk_pages(iter_pages(doc))]
+
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(texts), size=min(queries, len(texts)), replace=False)
+    questions = [" ".join(texts[i].split()[:12]) for i in sample]
+
+    return normalize(embed(texts)), normalize(embed(questions))
+
+
+def synthetic_corpus(n: int, dim: int, queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 500), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)]
+    vectors = vectors + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    q = centers[rng.integers(0, len(centers), queries)]
+    q = q + 0.6 * rng.standard_normal((queries, dim)).astype(np.float32)
+    return normalize(vectors), normalize(q)
+
+
+def run(backend, options, vectors, queries, k, batch=1024):
+    directory = tempfile.mkdtemp(prefix="bench_quant_")
+    try:
+        store = open_vector_store(backend, directory, **options)
+        for i in range(0, len(vectors), batch):
+            store.add(
+                ids=[str(j) for j in range(i, min(i + batch, len(vectors)))],
+                embeddings=vectors[i:i + batch]
+            )
+
+        found, latencies = [], []
+        for q in queries:
+            t = time.perf_counter()
+            hits = store.query(query_embeddings=[q], n_results=k, include=())
+            latencies.append(time.perf_counter() - t)
+            found.append([int(i) for i in hits["ids"][0]])
+
+        # All questions in one call, as retrieve_batch does
+        t = time.perf_counter()
+        store.query(query_embeddings=queries, n_results=k, include=())
+        batch_seconds = time.perf_counter() - t
+
+        return store.describe(), found, latencies, batch_seconds
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf", help="embed this PDF's chunks with MiniLM")
+    parser.add_argument("--synthetic", type=int, default=20000, help="random vectors when no --pdf")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factors", type=int, nargs="+", default=[1, 4, 10])
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    if args.pdf:
+        vectors, queries = pdf_corpus(args.pdf, args.queries)
+    else:
+        vectors, queries = synthetic_corpus(args.synthetic, args.dim, args.queries)
+
+    print(f"📊 {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k].tolist()
+
+    configs = [("numpy", {})]
+    for quantization in ("int8", "binary"):
+        for keep_float in (True, False):
+            # int8 codes without float rows are never re-scored
+            factors = args.rescore_factors
+            if quantization == "int8" and not keep_float:
+                factors = factors[:1]
+            for factor in factors:
+                configs.append(("quantized", {
+                    "quantization": quantization,
+                    "rescore_factor": factor,
+                    "keep_float": keep_float
+                }))
+
+    report = []
+    baseline_bytes = None
+    for backend, options in configs:
+        info, found, latencies, batch_seconds = run(backend, options, vectors, queries, args.k)
+        row = {
+            "backend": backend,
+            **options,
+            "recall_at_k": round(recall_at_k(found, truth), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+            "batch_ms_per_query": round(batch_seconds / len(queries) * 1000, 3),
+            "disk_bytes": info["bytes"],
+            "search_bytes": info.get("search_bytes", info["bytes"]),
+            "int8_scale": info.get("int8_scale")
+        }
+        baseline_bytes = baseline_bytes or row["disk_bytes"]
+        row["disk_vs_float"] = round(row["disk_bytes"] / baseline_bytes, 3)
+        report.append(row)
+
+        if backend == "numpy":
+            label = "numpy (float32 exact)"
+        elif options["quantization"] == "int8" and not options["keep_float"]:
+            label = "  int8 codes, no rescore"
+        else:
+            label = (
+                f"{options['quantization']:>6} {'float' if options['keep_float'] else 'codes'} "
+                f"rescore x{options['rescore_factor']}"
+            )
+        print(
+            f"{label:<26} recall@{args.k} {row['recall_at_k']:.4f}  "
+            f"p50 {row['p50_ms']:>7.3f}ms  p95 {row['p95_ms']:>7.3f}ms  "
+            f"batch {row['batch_ms_per_query']:>6.3f}ms/q  search {row['search_bytes'] / 1e6:>7.2f}MB  "
+            f"disk {row['disk_bytes'] / 1e6:>7.2f}MB ({row['disk_vs_float']:.2f}x)"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Compare vector store backends on synthetic normalized embeddings:
+build time, query latency (p50/p95, unfiltered and filtered by
+document) and recall@k against exact search.
+
+    python scripts/bench_vector_stores.py --vectors 20000 --dim 384
+    python scripts/bench_vector_stores.py --backends numpy faiss --faiss-factory IVF256,Flat
+
+Each backend is built in a temporary directory; nothing under data/ is
+touched.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.vector_stores import open_vector_store  # noqa: E402
+
+
+def synthetic_corpus(n: int, dim: int, documents: int, seed: int = 0):
+    """
+    Clustered unit vectors (one cluster per document) so filtered and
+    approximate search behave like real chunk embeddings.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((documents, dim)).astype(np.float32)
+    doc_of = rng.integers(0, documents, n)
+    vectors = centers[doc_of] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    metadatas = [
+        {"doc_id": f"doc{d}", "page": int(i % 50) + 1}
+        for i, d in enumerate(doc_of)
+    ]
+    return vectors, metadatas
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def bench_backend(backend, vectors, metadatas, queries, k, batch, options):
+    directory = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+    try:
+        store = open_vector_store(backend, directory, **options)
+
+        start = time.perf_counter()
+        for i in range(0, len(vectors), batch):
+            store.add(
+                ids=[str(j) for j in range(i, min(i + batch, len(vectors)))],
+                embeddings=vectors[i:i + batch],
+                documents=[f"chunk {j}" for j in range(i, min(i + batch, len(vectors)))],
+                metadatas=metadatas[i:i + batch]
+            )
+        store.save()
+        build_seconds = time.perf_counter() - start
+
+        # First query pays for lazy index builds; keep it out of the numbers
+        store.query(query_embeddings=queries[:1], n_results=k)
+
+        results = {}
+        for label, where in (("unfiltered", None), ("filtered", {"doc_id": "doc0"})):
+            latencies, found = [], []
+            for q in queries:
+                t = time.perf_counter()
+                hits = store.query(query_embeddings=[q], n_results=k, where=where)
+                latencies.append(time.perf_counter() - t)
+                found.append([int(i) for i in hits["ids"][0]])
+            results[label] = {
+                "p50_ms": percentile_ms(latencies, 50),
+                "p95_ms": percentile_ms(latencies, 95),
+                "qps": round(len(queries) / sum(latencies), 1),
+                "ids": found
+            }
+
+        return {
+            "backend": backend,
+            "build_seconds": round(build_seconds, 3),
+            "vectors_per_sec": round(len(vectors) / build_seconds, 1),
+            **{label: r for label, r in results.items()}
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def exact_ids(vectors, metadatas, queries, k, doc_id=None):
+    rows = np.arange(len(vectors))
+    if doc_id is not None:
+        rows = np.array([i for i, m in enumerate(metadatas) if m["doc_id"] == doc_id])
+    scores = queries @ vectors[rows].T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return [set(rows[t].tolist()) for t in top]
+
+
+def recall(found, truth, k):
+    return round(float(np.mean([len(set(f) & t) / min(k, len(t)) for f, t in zip(found, truth)])), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy", "faiss"])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--faiss-factory", default="HNSW32")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    vectors, metadatas = synthetic_corpus(args.vectors, args.dim, args.documents)
+    queries, _ = synthetic_corpus(args.queries, args.dim, args.documents, seed=1)
+
+    truth = {
+        "unfiltered": exact_ids(vectors, metadatas, queries, args.k),
+        "filtered": exact_ids(vectors, metadatas, queries, args.k, doc_id="doc0"),
+    }
+    options = {"faiss": {"factory": args.faiss_factory}}
+
+    report = []
+    for backend in args.backends:
+        try:
+            result = bench_backend(
+                backend, vectors, metadatas, queries, args.k, args.batch,
+                options.get(backend, {})
+            )
+        except ImportError as e:
+            print(f"⚠️ Skipping {backend}: {e}")
+            continue
+
+        for label in ("unfiltered", "filtered"):
+            result[label]["recall_at_k"] = recall(result[label].pop("ids"), truth[label], args.k)
+        report.append(result)
+
+        print(
+            f"{backend:>7}  build {result['build_seconds']:>7.2f}s  "
+            f"query p50 {result['unfiltered']['p50_ms']:>7.3f}ms  "
+            f"p95 {result['unfiltered']['p95_ms']:>7.3f}ms  "
+            f"filtered p50 {result['filtered']['p50_ms']:>7.3f}ms  "
+            f"recall@{args.k} {result['unfiltered']['recall_at_k']:.3f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
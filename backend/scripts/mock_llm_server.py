@@ -0,0 +1,159 @@
+"""
+Local OpenAI-compatible chat completions server for exercising the LLM
+client without a network or an API key.
+
+    python scripts/mock_llm_server.py --port 8001 --latency 0.2 --fail-first 2
+    HF_API_URL=http://127.0.0.1:8001/v1/chat/completions uvicorn app.main:app
+
+--fail-first N answers the first N requests with 429 so retry/backoff
+can be observed. Requests with "stream": true get SSE deltas, one word
+every --token-delay seconds.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = "• This is a mock answer generated from the provided PDF content."
+
+
+class MockState:
+    def __init__(self, latency: float, fail_first: int, fail_status: int,
+                 token_delay: float = 0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def next_request(self) -> int:
+        with self.lock:
+            self.requests += 1
+            return self.requests
+
+
+def make_handler(state: MockState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, body: dict, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            try:
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                pass    # client gave up (deadline) before we answered
+
+        def _send_stream(self, n: int, payload: dict):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(data: str):
+                raw = data.encode("utf-8")
+                self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+                self.wfile.flush()
+
+            try:
+                for i, word in enumerate(ANSWER.split(" ")):
+                    event = {
+                        "id": f"mock-{n}",
+                        "object": "chat.completion.chunk",
+                        "model": payload.get("model", "mock"),
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": word if i == 0 else " " + word},
+                            "finish_reason": None
+                        }]
+                    }
+                    write(f"data: {json.dumps(event)}\n\n")
+                    time.sleep(state.token_delay)
+                write("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            n = state.next_request()
+
+            if n <= state.fail_first:
+                self._send_json(
+                    state.fail_status,
+                    {"error": "mock failure"},
+                    {"Retry-After": "0.05"}
+                )
+                return
+
+            time.sleep(state.latency)
+
+            if payload.get("stream"):
+                self._send_stream(n, payload)
+                return
+
+            self._send_json(200, {
+                "id": f"mock-{n}",
+                "object": "chat.completion",
+                "model": payload.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": ANSWER},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": sum(
+                        len(m.get("content", "").split()) for m in payload.get("messages", [])
+                    ),
+                    "completion_tokens": len(ANSWER.split()),
+                }
+            })
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8001, latency: float = 0.0,
+          fail_first: int = 0, fail_status: int = 429, token_delay: float = 0.0):
+    """
+    Start the mock server in a daemon thread; returns the server object
+    (call .shutdown() to stop it).
+    """
+    state = MockState(latency, fail_first, fail_status, token_delay)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per answer")
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--fail-status", type=int, default=429)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds per streamed word")
+    args = parser.parse_args()
+
+    server = serve(
+        args.host, args.port, args.latency,
+        args.fail_first, args.fail_status, args.token_delay
+    )
+    print(f"🤖 Mock LLM listening on http://{args.host}:{args.port}/v1/chat/completions")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,56 @@
+from io import BytesIO
+
+import fitz
+import numpy as np
+from PIL import Image
+
+from core.image_extractor import MIN_IMAGE_BYTES, page_image_candidates, stream_size
+
+
+def noisy_jpeg(side: int = 200) -> bytes:
+    pixels = (np.random.default_rng(0).random((side, side, 3)) * 255).astype("uint8")
+    buffer = BytesIO()
+    Image.fromarray(pixels).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def pdf_with_image(length: str = None):
+    """
+    One-page PDF with a high-entropy JPEG; `length` replaces the image
+    stream's /Length with an indirect reference to an object holding it.
+    """
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_image(fitz.Rect(0, 0, 200, 200), stream=noisy_jpeg())
+    xref = page.get_images(full=True)[0][0]
+    raw_size = len(doc.xref_stream_raw(xref))
+
+    if length is not None:
+        ref = doc.get_new_xref()
+        doc.update_object(ref, length.format(size=raw_size))
+        doc.xref_set_key(xref, "Length", f"{ref} 0 R")
+    return doc, page, xref, raw_size
+
+
+def test_stream_size_follows_indirect_length():
+    doc, _, xref, raw_size = pdf_with_image(length="{size}")
+    assert doc.xref_get_key(xref, "Length")[0] == "xref"
+    assert stream_size(doc, xref) == raw_size
+
+
+def test_stream_size_falls_back_to_raw_stream():
+    doc, _, xref, raw_size = pdf_with_image(length="null")
+    assert stream_size(doc, xref) == raw_size
+
+
+def test_indirect_length_image_is_kept():
+    doc, page, _, raw_size = pdf_with_image(length="{size}")
+    assert raw_size >= MIN_IMAGE_BYTES
+
+    stats = {"candidates": 0, "rejected_cheap": 0, "decoded": 0}
+    candidates = list(page_image_candidates(
+        doc, page.number, page.get_images(full=True), set(), stats
+    ))
+
+    assert len(candidates) == 1
+    assert stats["rejected_cheap"] == 0
@@ -1,5 +1,26 @@
 const BASE_URL = "http://localhost:8000";
 
+// "embed;dur=1.2, llm;dur=95.1, total;dur=99.0" -> { embed: 1.2, llm: 95.1, total: 99.0 } (ms)
+export function parseServerTiming(header) {
+    const timings = {};
+    if (!header) return timings;
+
+    for (const entry of header.split(",")) {
+        const [name, ...params] = entry.trim().split(";");
+        const dur = params.find((p) => p.trim().startsWith("dur="));
+        if (name && dur) {
+            timings[name.trim()] = parseFloat(dur.trim().slice(4));
+        }
+    }
+    return timings;
+}
+
+async function withServerTiming(res) {
+    const data = await res.json();
+    data.serverTiming = parseServerTiming(res.headers.get("Server-Timing"));
+    return data;
+}
+
 export async function uploadPDF(file) {
     const formData = new FormData();
     formData.append("file", file);
@@ -9,7 +30,7 @@ export async function uploadPDF(file) {
         body: formData
     });
 
-    return res.json();
+    return withServerTiming(res);
 }
 
 export async function askQuestion(question, imageFile = null) {
@@ -29,7 +50,68 @@ export async function askQuestion(question, imageFile = null) {
         throw new Error("Ask failed");
     }
 
-    return res.json();
+    return withServerTiming(res);
 }
 
 
+
+export async function askQuestionStream(question, imageFile = null, onEvent = () => {}) {
+    const formData = new FormData();
+    formData.append("question", question);
+
+    if (imageFile) {
+        formData.append("image", imageFile);
+    }
+
+    const res = await fetch(`${BASE_URL}/ask-stream`, {
+        method: "POST",
+        body: formData
+    });
+
+    if (!res.ok || !res.body) {
+        throw new Error("Ask failed");
+    }
+
+    // Headers arrive before the body: time spent before the first event
+    onEvent({ type: "timing", serverTiming: parseServerTiming(res.headers.get("Server-Timing")) });
+    await readNDJSON(res, onEvent);
+}
+
+export async function askQuestionBatch(questions, onEvent = () => {}) {
+    const formData = new FormData();
+    formData.append("questions", JSON.stringify(questions));
+
+    const res = await fetch(`${BASE_URL}/ask-batch`, {
+        method: "POST",
+        body: formData
+    });
+
+    if (!res.ok || !res.body) {
+        throw new Error("Batch ask failed");
+    }
+
+    // One {"type": "answer", "index", ...} per question, as each finishes
+    await readNDJSON(res, onEvent);
+}
+
+async function readNDJSON(res, onEvent) {
+    // NDJSON: one event per line
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+
+        for (const line of lines) {
+            if (line.trim()) onEvent(JSON.parse(line));
+        }
+    }
+
+    if (buffer.trim()) onEvent(JSON.parse(buffer));
+}